@@ -0,0 +1,90 @@
+# Compares the compiled tagger against the original per-pattern scan.
+# Run from backend/: python -m benchmarks.tagger_benchmark [pages]
+import random
+import sys
+import timeit
+from crawler import PageInfo
+from tagger import TAG_PATTERNS, assign_tags
+from urllib.parse import urlparse
+
+SECTIONS = ['', 'main', 'docs', 'api', 'api-reference', 'guides', 'getting-started', 'quickstart',
+            'blog', 'examples', 'sdk', 'cli', 'reference', 'intro', 'changelog', 'security', 'Start-Here']
+WORDS = sorted({pattern.strip('/') for patterns in TAG_PATTERNS.values() for pattern in patterns} |
+               {'pricing', 'product', 'features', 'team', 'v2', 'overview', 'install', 'client', 'apis'})
+
+def legacy_assign_tags(page: PageInfo, section_name: str = "") -> list[str]:
+    parsed_url = urlparse(page.url)
+    url_path = parsed_url.path
+
+    text = f"{url_path} {page.title}".lower()
+    matched_tags = []
+
+    for tag, patterns in TAG_PATTERNS.items():
+        if any(pattern in text for pattern in patterns):
+            matched_tags.append(tag)
+
+    content_tags = [t for t in matched_tags if t in ['API', 'Guide', 'Quickstart',
+                                                       'Reference', 'Example', 'SDK',
+                                                       'CLI', 'Blog', 'Changelog']]
+    complexity_tags = [t for t in matched_tags if t in ['Beginner', 'Advanced']]
+    topic_tags = [t for t in matched_tags if t not in content_tags + complexity_tags]
+
+    section_lower = section_name.lower()
+    filtered_content = []
+
+    for tag in content_tags:
+        tag_lower = tag.lower()
+        if tag_lower == 'api' and 'api' in section_lower:
+            continue
+        if tag_lower in ['guide', 'quickstart'] and any(x in section_lower for x in ['getting-started', 'guide', 'quickstart', 'start']):
+            continue
+        if tag_lower == 'example' and 'example' in section_lower:
+            continue
+        if tag_lower == 'blog' and 'blog' in section_lower:
+            continue
+        if tag_lower == 'reference' and any(x in section_lower for x in ['reference', 'docs', 'documentation']):
+            continue
+        if tag_lower == 'sdk' and 'sdk' in section_lower:
+            continue
+        if tag_lower == 'cli' and 'cli' in section_lower:
+            continue
+
+        filtered_content.append(tag)
+
+    filtered_complexity = []
+    for tag in complexity_tags:
+        if tag == 'Beginner' and any(x in section_lower for x in ['getting-started', 'quickstart', 'start', 'intro']):
+            continue
+        filtered_complexity.append(tag)
+
+    result = filtered_complexity[:1] + topic_tags[:2]
+
+    if len(result) < 3 and filtered_content:
+        result += filtered_content[:3-len(result)]
+
+    return result[:3]
+
+def sample_pages(count: int, seed: int = 0) -> list[tuple[PageInfo, str]]:
+    rng = random.Random(seed)
+    samples = []
+    for _ in range(count):
+        section = rng.choice(SECTIONS)
+        path = '/'.join(rng.choice(WORDS).replace(' ', '-') for _ in range(rng.randint(1, 4)))
+        title = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(0, 5))).title()
+        samples.append((PageInfo(f"https://example.com/{section}/{path}", title, "", ""), section))
+    return samples
+
+def main(count: int = 20000):
+    samples = sample_pages(count)
+    mismatches = sum(legacy_assign_tags(page, section) != assign_tags(page, section) for page, section in samples)
+
+    legacy = min(timeit.repeat(lambda: [legacy_assign_tags(p, s) for p, s in samples], number=1, repeat=5))
+    compiled = min(timeit.repeat(lambda: [assign_tags(p, s) for p, s in samples], number=1, repeat=5))
+
+    print(f"{count} pages, {mismatches} mismatches")
+    print(f"legacy:   {legacy * 1000:.1f} ms ({legacy / count * 1e6:.2f} us/page)")
+    print(f"compiled: {compiled * 1000:.1f} ms ({compiled / count * 1e6:.2f} us/page)")
+    print(f"speedup:  {legacy / compiled:.2f}x")
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
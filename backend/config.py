@@ -15,12 +15,39 @@ class Settings(BaseSettings):
     brightdata_enabled: bool = True
     brightdata_zone: str = "scraping_browser1"
     brightdata_password: str | None = None
+    brightdata_max_tabs: int = 4
+    brightdata_ready_timeout_ms: int = 3000
+    brightdata_block_resources: bool = True
+    browser_escalation_threshold: int = 3
+    crawl_concurrency: int = 1
+    crawl_per_host_limit: int = 4
+    html_parser: str = "lxml"
+    parse_workers: int = 0
+    page_cache_dir: str | None = None
+    page_cache_max_bytes: int = 50_000_000
+    incremental_recrawl_enabled: bool = True
+    md_probe_per_host_limit: int = 4
+    md_probe_miss_threshold: int = 5
+    md_probe_cache_path: str | None = None
+    md_probe_ttl_seconds: int = 604800
+    llms_full_enabled: bool = False
+    llms_full_memory_bytes: int = 16_000_000
     openrouter_api_key: str | None = None
     openrouter_model: str = "x-ai/grok-4.1-fast:free"
     llm_enhancement_enabled: bool = False
     llm_timeout_seconds: float = 30.0
     llm_max_retries: int = 3
     llm_temperature: float = 0.3
+    llm_requests_per_minute: int = 20
+    llm_rate_burst: int = 5
+    llm_max_in_flight: int = 20
+    llm_streaming_enabled: bool = False
+    llm_shard_min_links: int = 60
+    llm_shard_max_links: int = 40
+    llm_delta_enabled: bool = True
+    llm_cache_dir: str | None = None
+    llm_cache_max_bytes: int = 20_000_000
+    llm_cache_ttl_seconds: int = 2_592_000
 
     class Config:
         env_file = ".env"
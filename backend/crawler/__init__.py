@@ -1,4 +1,8 @@
 from .llm_crawler import LLMCrawler, PageInfo
 from .scraping_browser_client import has_meaningful_content, ScrapingBrowserClient
+from .executor import get_parse_executor, shutdown_parse_executor
+from .page_cache import PageCache, FilePageCache, get_page_cache
+from .full_text import FullTextStore
 
-__all__ = ['LLMCrawler', 'PageInfo', 'has_meaningful_content', 'ScrapingBrowserClient']
+__all__ = ['LLMCrawler', 'PageInfo', 'has_meaningful_content', 'ScrapingBrowserClient',
+           'get_parse_executor', 'shutdown_parse_executor', 'PageCache', 'FilePageCache', 'get_page_cache', 'FullTextStore']
@@ -0,0 +1,32 @@
+from dataclasses import dataclass
+from .parser import parse_html
+from .scout import extract_links
+from .text import extract_title, extract_description, extract_text
+from .scraping_browser_client import has_meaningful_content
+
+@dataclass
+class PageAnalysis:
+    meaningful: bool
+    title: str
+    description: str
+    text: str
+    links: list[str]
+
+def analyze_html(html: str, url: str) -> PageAnalysis:
+    soup = parse_html(html)
+
+    # extract_text decomposes nav/header/footer, so everything that reads the
+    # full document has to run before it.
+    meaningful = len(html.strip()) >= 100 and has_meaningful_content(soup)
+    title = extract_title(soup)
+    description = extract_description(soup)
+    links = extract_links(soup, url)
+    text = extract_text(soup)
+
+    return PageAnalysis(
+        meaningful=meaningful,
+        title=title,
+        description=description,
+        text=text,
+        links=links
+    )
@@ -0,0 +1,23 @@
+from concurrent.futures import ProcessPoolExecutor
+
+_parse_executor: ProcessPoolExecutor | None = None
+
+def get_parse_executor(workers: int) -> ProcessPoolExecutor | None:
+    global _parse_executor
+    if workers <= 0:
+        return None
+    if _parse_executor is None:
+        _parse_executor = ProcessPoolExecutor(max_workers=workers)
+    return _parse_executor
+
+def discard_parse_executor(executor: ProcessPoolExecutor):
+    global _parse_executor
+    executor.shutdown(wait=False, cancel_futures=True)
+    if _parse_executor is executor:
+        _parse_executor = None
+
+def shutdown_parse_executor():
+    global _parse_executor
+    if _parse_executor is not None:
+        _parse_executor.shutdown(wait=True, cancel_futures=True)
+        _parse_executor = None
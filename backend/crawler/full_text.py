@@ -0,0 +1,44 @@
+import tempfile
+
+class FullTextStore:
+    # Extracted page text for llms-full.txt. Kept in memory up to max_memory_bytes,
+    # after which the spooled file rolls over to disk; only offsets stay in memory.
+    def __init__(self, max_memory_bytes: int = 16_000_000):
+        self.max_memory_bytes = max_memory_bytes
+        self._file = tempfile.SpooledTemporaryFile(max_size=max_memory_bytes, mode='w+b')
+        self._index: dict[str, tuple[int, int]] = {}
+        self._end = 0
+
+    def __enter__(self) -> "FullTextStore":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add(self, url: str, text: str):
+        data = text.encode()
+        self._file.seek(self._end)
+        self._file.write(data)
+        self._index[url] = (self._end, len(data))
+        self._end += len(data)
+
+    def get(self, url: str) -> str | None:
+        if url not in self._index:
+            return None
+        offset, length = self._index[url]
+        self._file.seek(offset)
+        return self._file.read(length).decode()
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    @property
+    def spilled(self) -> bool:
+        # SpooledTemporaryFile rolls over once a write takes it past max_size
+        return self._end > self.max_memory_bytes
+
+    def close(self):
+        self._file.close()
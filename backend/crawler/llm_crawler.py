@@ -1,11 +1,24 @@
+import asyncio
+from concurrent.futures import Executor
+from concurrent.futures.process import BrokenProcessPool
 from dataclasses import dataclass
 from typing import Callable
+from urllib.parse import urlparse
 import httpx
-from bs4 import BeautifulSoup
 from .state import CrawlState
-from .scout import normalize_url, extract_links, parse_sitemap
-from .text import extract_title, extract_description, extract_text, create_snippet
-from .scraping_browser_client import has_meaningful_content, ScrapingBrowserClient
+from .scout import normalize_url, filter_sitemap_page
+from .text import create_snippet
+from .analysis import PageAnalysis, analyze_html
+from .scraping_browser_client import ScrapingBrowserClient
+from .executor import discard_parse_executor
+from .page_cache import PageCache, CachedPage
+from .full_text import FullTextStore
+from sitemap_utils import SitemapPage, SitemapDiscovery, discover_sitemap
+
+HTTPX_STRATEGY = 'httpx'
+BROWSER_STRATEGY = 'browser'
+BLOCKED_STATUS_CODES = {403, 429, 503}
+SITEMAP_OVERSAMPLE = 4
 
 @dataclass
 class PageInfo:
@@ -17,110 +30,297 @@ class PageInfo:
 class LLMCrawler:
     def __init__(self, base_url: str, max_pages: int, desc_length: int, log_callback: Callable,
                  brightdata_api_key: str | None = None, brightdata_enabled: bool = True,
-                 brightdata_zone: str = "scraping_browser1", brightdata_password: str | None = None):
+                 brightdata_zone: str = "scraping_browser1", brightdata_password: str | None = None,
+                 concurrency: int = 1, per_host_limit: int = 4, executor: Executor | None = None,
+                 brightdata_max_tabs: int = 4, brightdata_ready_timeout_ms: int = 3000,
+                 brightdata_block_resources: bool = True, fetch_profile: dict[str, str] | None = None,
+                 escalation_threshold: int = 3, page_cache: PageCache | None = None,
+                 sitemap: SitemapDiscovery | None = None, on_page: Callable[[PageInfo], None] | None = None,
+                 full_text: FullTextStore | None = None):
         self.state = CrawlState(base_url=normalize_url(base_url), max_pages=max_pages)
         self.desc_length = desc_length
         self.log = log_callback
-        self.state.queue.append(self.state.base_url)
+        self.state.queue.push(self.state.base_url)
+        self.concurrency = max(1, concurrency)
+        self.per_host_limit = max(1, per_host_limit)
+        self._host_semaphores: dict[str, asyncio.Semaphore] = {}
+        self.executor = executor
+        self.fetch_profile: dict[str, str] = dict(fetch_profile or {})
+        self.escalation_threshold = max(1, escalation_threshold)
+        self._httpx_failures: dict[str, int] = {}
+        self.page_cache = page_cache
+        self.cache_hits = 0
+        self.sitemap = sitemap
+        self.on_page = on_page
+        self.full_text = full_text
 
         self.brightdata_client = None
         if brightdata_enabled and brightdata_api_key:
-            self.brightdata_client = ScrapingBrowserClient(brightdata_api_key, brightdata_enabled, brightdata_zone, brightdata_password)
-
-    async def _try_sitemap(self, client: httpx.AsyncClient) -> list[str]:
-        for path in ['/sitemap.xml', '/sitemap_index.xml']:
-            try:
-                resp = await client.get(f"{self.state.base_url}{path}")
-                if resp.status_code == 200:
-                    return parse_sitemap(resp.text, self.state.base_url)
-            except:
-                continue
-        return []
+            self.brightdata_client = ScrapingBrowserClient(brightdata_api_key, brightdata_enabled, brightdata_zone, brightdata_password,
+                                                           max_tabs=brightdata_max_tabs,
+                                                           ready_timeout_ms=brightdata_ready_timeout_ms,
+                                                           block_resources=brightdata_block_resources)
+
+    @property
+    def discovered_sitemap_url(self) -> str | None:
+        return self.sitemap.sitemap_url if self.sitemap else None
+
+    async def _try_sitemap(self, client: httpx.AsyncClient, limit: int) -> list[SitemapPage]:
+        # Reuse a discovery handed in by the caller; otherwise discover once and keep it
+        if self.sitemap is None:
+            self.sitemap = await discover_sitemap(client, self.state.base_url, limit=limit)
 
-    async def run(self) -> list[PageInfo]:
         pages = []
-        max_attempts = self.state.max_pages * 3  # Try up to 3x the target to handle failures
-        attempts = 0
+        for record in self.sitemap.pages:
+            page = filter_sitemap_page(record, self.state.base_url)
+            if page:
+                pages.append(page)
+        return pages
 
-        async with httpx.AsyncClient(timeout=10.0, follow_redirects=True) as client:
-            sitemap_urls = await self._try_sitemap(client)
-            if sitemap_urls:
-                await self.log(f"Using sitemap: found {len(sitemap_urls)} URLs")
-                self.state.queue.clear()
-                self.state.queue.append(self.state.base_url)
-                for url in sitemap_urls[:max_attempts]:  # Load more URLs to handle failures
-                    if url != self.state.base_url:
-                        self.state.queue.append(url)
+    def _host_semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).netloc
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(self.per_host_limit)
+        return self._host_semaphores[host]
+
+    async def _analyze(self, html: str, url: str) -> PageAnalysis:
+        # Several workers can see the same pool break; only the first discards it
+        executor = self.executor
+        if executor is None:
+            return analyze_html(html, url)
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(executor, analyze_html, html, url)
+        except BrokenProcessPool:
+            if self.executor is executor:
+                await self.log("  ✗ Parse worker pool crashed, parsing in-process")
+                discard_parse_executor(executor)
+                self.executor = None
+            return analyze_html(html, url)
+
+    def _conditional_headers(self, cached: CachedPage | None) -> dict[str, str]:
+        headers = {}
+        if cached is not None:
+            if cached.etag:
+                headers['If-None-Match'] = cached.etag
+            if cached.last_modified:
+                headers['If-Modified-Since'] = cached.last_modified
+        return headers
+
+    def _cache_response(self, url: str, response: httpx.Response, analysis: PageAnalysis):
+        if self.page_cache is None:
+            return
+        etag = response.headers.get('etag')
+        last_modified = response.headers.get('last-modified')
+        if etag or last_modified:
+            self.page_cache.put(CachedPage(url=url, etag=etag, last_modified=last_modified, analysis=analysis))
+
+    async def _try_httpx(self, client: httpx.AsyncClient, url: str) -> tuple[PageAnalysis | None, bool]:
+        try:
+            await self.log(f"  → Trying httpx...")
+            cached = self.page_cache.get(url) if self.page_cache else None
+            async with self._host_semaphore(url):
+                response = await client.get(url, headers=self._conditional_headers(cached))
+            if response.status_code == 304 and cached is not None:
+                await self.log(f"  ✓ Not modified, reusing cached page")
+                self.cache_hits += 1
+                return cached.analysis, False
+            if response.status_code in BLOCKED_STATUS_CODES:
+                await self.log(f"  ✗ httpx blocked with status {response.status_code}")
+                return None, True
+            response.raise_for_status()
+            httpx_page = await self._analyze(response.text, url)
+
+            if httpx_page.meaningful:
+                await self.log(f"  ✓ httpx succeeded")
+                self._cache_response(url, response, httpx_page)
             else:
-                await self.log("No sitemap found, using BFS crawl")
+                await self.log(f"  ✗ httpx returned empty/blocked content")
+            return httpx_page, not httpx_page.meaningful
+        except Exception as httpx_error:
+            await self.log(f"  ✗ httpx failed: {str(httpx_error)}")
+            return None, False
 
-            while (self.state.queue and
-                   len(pages) < self.state.max_pages and
-                   attempts < max_attempts):
-                attempts += 1
-                url = self.state.queue.popleft()
+    async def _try_browser(self, url: str, message: str) -> PageAnalysis | None:
+        try:
+            await self.log(message)
+            html = await self.brightdata_client.fetch(url)
+            page = await self._analyze(html, url)
+            await self.log(f"  ✓ Scraping Browser succeeded")
+            return page
+        except Exception as brightdata_error:
+            await self.log(f"  ✗ Scraping Browser failed: {str(brightdata_error)}")
+            return None
 
-                if url in self.state.visited:
-                    continue
+    async def _record_httpx_result(self, host: str, succeeded: bool, blocked: bool):
+        if succeeded:
+            self._httpx_failures[host] = 0
+            if self.fetch_profile.get(host) == BROWSER_STRATEGY:
+                self.fetch_profile[host] = HTTPX_STRATEGY
+            return
+        if not blocked:
+            return
 
-                try:
-                    await self.log(f"Visiting: {url}")
-                    html = None
-                    httpx_html = None
-
-                    try:
-                        await self.log(f"  → Trying httpx...")
-                        response = await client.get(url)
-                        response.raise_for_status()
-                        httpx_html = response.text
-
-                        if has_meaningful_content(httpx_html):
-                            await self.log(f"  ✓ httpx succeeded")
-                            html = httpx_html
-                        else:
-                            await self.log(f"  ✗ httpx returned empty/blocked content")
-                    except Exception as httpx_error:
-                        await self.log(f"  ✗ httpx failed: {str(httpx_error)}")
-
-                    if html is None and self.brightdata_client is not None:
-                        try:
-                            await self.log(f"  → Escalating to Bright Data Scraping Browser...")
-                            html = await self.brightdata_client.fetch(url)
-                            await self.log(f"  ✓ Scraping Browser succeeded")
-                        except Exception as brightdata_error:
-                            await self.log(f"  ✗ Scraping Browser failed: {str(brightdata_error)}")
-                            if httpx_html is not None:
-                                await self.log(f"  → Falling back to httpx result")
-                                html = httpx_html
-
-                    if html is None:
-                        raise ValueError("Failed to fetch content")
-
-                    soup = BeautifulSoup(html, 'html.parser')
-
-                    title = extract_title(soup)
-                    description = extract_description(soup)
-                    text = extract_text(soup)
-                    snippet = create_snippet(text, self.desc_length)
-
-                    pages.append(PageInfo(
-                        url=url,
-                        title=title,
-                        description=description,
-                        snippet=snippet
-                    ))
+        self._httpx_failures[host] = self._httpx_failures.get(host, 0) + 1
+        if (self._httpx_failures[host] >= self.escalation_threshold and
+                self.fetch_profile.get(host) != BROWSER_STRATEGY):
+            self.fetch_profile[host] = BROWSER_STRATEGY
+            await self.log(f"  → {host} needs a browser after {self._httpx_failures[host]} blocked httpx "
+                           f"attempts, skipping httpx for the rest of the crawl")
 
-                    self.state.visited.add(url)
+    async def _fetch_page(self, client: httpx.AsyncClient, url: str) -> PageAnalysis:
+        host = urlparse(url).netloc
+        page = None
+        browser_tried = False
+
+        if self.brightdata_client is not None and self.fetch_profile.get(host) == BROWSER_STRATEGY:
+            browser_tried = True
+            page = await self._try_browser(url, f"  → Using Bright Data Scraping Browser (learned for {host})...")
+            if page is not None:
+                return page
+
+        httpx_page, blocked = await self._try_httpx(client, url)
+        if httpx_page is not None and httpx_page.meaningful:
+            page = httpx_page
+        # Also recorded after a learned-browser miss, so an httpx success moves the host back
+        await self._record_httpx_result(host, page is not None, blocked)
+
+        if page is None and self.brightdata_client is not None and not browser_tried:
+            browser_tried = True
+            page = await self._try_browser(url, f"  → Escalating to Bright Data Scraping Browser...")
+
+        if page is None and browser_tried and httpx_page is not None:
+            await self.log(f"  → Falling back to httpx result")
+            page = httpx_page
+
+        if page is None:
+            raise ValueError("Failed to fetch content")
+
+        return page
 
-                    links = extract_links(html, url)
-                    for link in links:
-                        if link not in self.state.visited:
-                            self.state.queue.append(link)
+    async def _crawl_url(self, client: httpx.AsyncClient, url: str) -> tuple[PageInfo, list[str]]:
+        await self.log(f"Visiting: {url}")
+        analysis = await self._fetch_page(client, url)
+
+        page = PageInfo(
+            url=url,
+            title=analysis.title,
+            description=analysis.description,
+            snippet=create_snippet(analysis.text, self.desc_length)
+        )
+        if self.full_text is not None:
+            self.full_text.add(url, analysis.text)
+        return page, analysis.links
+
+    async def _crawl_queue(self, client: httpx.AsyncClient, max_pages: int, max_attempts: int,
+                           follow_links: bool = True) -> list[PageInfo]:
+        # Pages are keyed by the order their URL was claimed so the output order
+        # matches a sequential crawl (homepage first) regardless of which fetch
+        # finishes first.
+        results: dict[int, PageInfo] = {}
+        in_flight = 0
+        attempts = 0
+        changed = asyncio.Condition()
+
+        async def worker():
+            nonlocal in_flight, attempts
+            while True:
+                async with changed:
+                    while True:
+                        if len(results) >= max_pages or attempts >= max_attempts:
+                            return
+                        if self.state.queue and len(results) + in_flight < max_pages:
+                            break
+                        if not self.state.queue and in_flight == 0:
+                            return
+                        await changed.wait()
+
+                    attempts += 1
+                    order = attempts
+                    url = self.state.queue.pop()
+                    if url in self.state.visited:
+                        continue
+                    self.state.visited.add(url)
+                    in_flight += 1
 
+                page = None
+                links = []
+                try:
+                    page, links = await self._crawl_url(client, url)
                 except Exception as e:
                     await self.log(f"Error crawling {url}: {str(e)}")
-                    self.state.visited.add(url)
 
+                async with changed:
+                    in_flight -= 1
+                    if page is not None:
+                        results[order] = page
+                        if self.on_page:
+                            self.on_page(page)
+                    if page is not None and follow_links:
+                        depth = self.state.queue.depth(url) + 1
+                        for link in links:
+                            if link not in self.state.visited:
+                                self.state.queue.push(link, depth=depth)
+                    changed.notify_all()
+
+        await asyncio.gather(*[worker() for _ in range(self.concurrency)])
+        return [results[order] for order in sorted(results)][:max_pages]
+
+    async def _crawl(self, client: httpx.AsyncClient, max_attempts: int) -> list[PageInfo]:
+        # Read several times the attempt budget so the frontier still has a choice
+        sitemap_pages = await self._try_sitemap(client, max_attempts * SITEMAP_OVERSAMPLE)
+        if sitemap_pages:
+            await self.log(f"Using sitemap: found {len(sitemap_pages)} URLs")
+            self.state.queue.clear()
+            self.state.queue.push(self.state.base_url)
+            # The frontier orders the whole sitemap; max_attempts still bounds how many are tried.
+            # Sitemap entries are one hop from the homepage, like its own links, so priority
+            # (then path depth) decides between them rather than how nested the URL is
+            for sitemap_page in sitemap_pages:
+                if sitemap_page.url != self.state.base_url:
+                    self.state.queue.push(sitemap_page.url, depth=1,
+                                          priority=sitemap_page.priority, lastmod=sitemap_page.lastmod)
+        else:
+            await self.log("No sitemap found, using BFS crawl")
+
+        if self.concurrency > 1:
+            await self.log(f"Crawling with {self.concurrency} workers ({self.per_host_limit} per host)")
+
+        return await self._crawl_queue(client, self.state.max_pages, max_attempts)
+
+    async def _with_client(self, crawl: Callable) -> list[PageInfo]:
+        try:
+            async with httpx.AsyncClient(timeout=10.0, follow_redirects=True) as client:
+                return await crawl(client)
+        finally:
+            if self.brightdata_client:
+                await self.brightdata_client.close()
+
+    async def crawl_urls(self, urls: list[str]) -> list[PageInfo]:
+        self.state.queue.clear()
+        for url in urls:
+            self.state.queue.push(url)
+
+        pages = await self._with_client(
+            lambda client: self._crawl_queue(client, len(urls), len(urls), follow_links=False)
+        )
+        await self._log_usage()
+        await self.log(f"Fetched {len(pages)} of {len(urls)} pages")
+        return pages
+
+    async def run(self) -> list[PageInfo]:
+        max_attempts = self.state.max_pages * 3  # Try up to 3x the target to handle failures
+
+        pages = await self._with_client(lambda client: self._crawl(client, max_attempts))
+        await self._log_usage()
+
+        if len(pages) < self.state.max_pages:
+            await self.log(f"Warning: Only found {len(pages)} pages (requested {self.state.max_pages})")
+
+        await self.log(f"Crawl complete: {len(pages)} pages")
+        return pages
+
+    async def _log_usage(self):
         if self.brightdata_client:
             stats = self.brightdata_client.get_usage_stats()
             if stats['requests'] > 0:
@@ -128,11 +328,10 @@ class LLMCrawler:
                 await self.log(
                     f"Scraping Browser usage: {stats['requests']} requests, "
                     f"{stats['successful']} successful ({success_rate:.0f}%), "
-                    f"~${stats['estimated_cost_usd']} estimated cost"
+                    f"~${stats['estimated_cost_usd']} estimated cost, "
+                    f"{stats['avg_latency_seconds']}s avg per page, "
+                    f"{stats['blocked_requests']} resource requests blocked"
                 )
 
-        if len(pages) < self.state.max_pages:
-            await self.log(f"Warning: Only found {len(pages)} pages (requested {self.state.max_pages})")
-
-        await self.log(f"Crawl complete: {len(pages)} pages")
-        return pages
+        if self.cache_hits:
+            await self.log(f"Page cache: {self.cache_hits} pages not modified since last crawl")
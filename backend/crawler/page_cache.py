@@ -0,0 +1,57 @@
+import json
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, asdict
+from .analysis import PageAnalysis
+from file_cache import FileLRUStore
+
+@dataclass
+class CachedPage:
+    url: str
+    etag: str | None
+    last_modified: str | None
+    analysis: PageAnalysis
+
+class PageCache(ABC):
+    @abstractmethod
+    def get(self, url: str) -> CachedPage | None:
+        ...
+
+    @abstractmethod
+    def put(self, page: CachedPage):
+        ...
+
+class FilePageCache(PageCache):
+    def __init__(self, directory: str, max_bytes: int = 50_000_000):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._store = FileLRUStore(directory, max_bytes)
+
+    def get(self, url: str) -> CachedPage | None:
+        body = self._store.get(url)
+        if body is None:
+            return None
+        try:
+            data = json.loads(body)
+            return CachedPage(
+                url=data['url'],
+                etag=data.get('etag'),
+                last_modified=data.get('last_modified'),
+                analysis=PageAnalysis(**data['analysis'])
+            )
+        except Exception as e:
+            print(f"Error reading page cache for {url}: {e}")
+            self._store.remove(url)
+            return None
+
+    def put(self, page: CachedPage):
+        self._store.put(page.url, json.dumps(asdict(page)))
+
+_page_cache: PageCache | None = None
+
+def get_page_cache(directory: str | None, max_bytes: int) -> PageCache | None:
+    global _page_cache
+    if not directory:
+        return None
+    if _page_cache is None:
+        _page_cache = FilePageCache(directory, max_bytes)
+    return _page_cache
@@ -0,0 +1,25 @@
+from bs4 import BeautifulSoup, FeatureNotFound
+from config import settings
+
+FALLBACK_PARSER = 'html.parser'
+
+_resolved_parser: str | None = None
+
+def resolve_parser(name: str) -> str:
+    if name == FALLBACK_PARSER:
+        return name
+    try:
+        BeautifulSoup("", name)
+        return name
+    except FeatureNotFound:
+        print(f"HTML parser '{name}' is not installed, falling back to {FALLBACK_PARSER}")
+        return FALLBACK_PARSER
+
+def get_parser() -> str:
+    global _resolved_parser
+    if _resolved_parser is None:
+        _resolved_parser = resolve_parser(settings.html_parser)
+    return _resolved_parser
+
+def parse_html(html: str) -> BeautifulSoup:
+    return BeautifulSoup(html, get_parser())
@@ -1,6 +1,8 @@
+from dataclasses import replace
 from urllib.parse import urljoin, urlparse
 from bs4 import BeautifulSoup
-import xml.etree.ElementTree as ET
+from .parser import parse_html
+from sitemap_utils import SitemapPage, parse_sitemap_content
 
 SKIP_PATTERNS = ['/logout', '/login', '/admin', '/api/', '/jobs/', '/sitemap', '/_metadata',
                  '.pdf', '.zip', '.jpg', '.png', '.gif', '.xml', '/feed', '/rss', '.atom']
@@ -18,22 +20,29 @@ def should_skip(url: str) -> bool:
         return True
     return any(pattern in url for pattern in SKIP_PATTERNS)
 
-def parse_sitemap(xml_content: str, base_url: str) -> list[str]:
+def filter_sitemap_page(page: SitemapPage, base_url: str) -> SitemapPage | None:
+    if not same_domain(page.url, base_url) or should_skip(page.url):
+        return None
+    return replace(page, url=normalize_url(page.url))
+
+def parse_sitemap_pages(xml_content: str | bytes, base_url: str) -> list[SitemapPage]:
     try:
-        root = ET.fromstring(xml_content)
-        ns = {'ns': 'http://www.sitemaps.org/schemas/sitemap/0.9'}
-        urls = [loc.text for loc in root.findall('.//ns:loc', ns) if loc.text]
-        if not urls:
-            urls = [loc.text for loc in root.findall('.//loc') if loc.text]
-
-        filtered = [normalize_url(url) for url in urls
-                   if same_domain(url, base_url) and not should_skip(url)]
-        return filtered
+        content = xml_content.encode() if isinstance(xml_content, str) else xml_content
+        pages = []
+        for record in parse_sitemap_content(content):
+            if isinstance(record, SitemapPage):
+                page = filter_sitemap_page(record, base_url)
+                if page:
+                    pages.append(page)
+        return pages
     except:
         return []
 
-def extract_links(html: str, base_url: str) -> list[str]:
-    soup = BeautifulSoup(html, 'html.parser')
+def parse_sitemap(xml_content: str, base_url: str) -> list[str]:
+    return [page.url for page in parse_sitemap_pages(xml_content, base_url)]
+
+def extract_links(html: str | BeautifulSoup, base_url: str) -> list[str]:
+    soup = html if isinstance(html, BeautifulSoup) else parse_html(html)
     links = []
 
     for tag in soup.find_all('a', href=True):
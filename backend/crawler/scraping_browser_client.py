@@ -1,12 +1,15 @@
-from playwright.async_api import async_playwright
+import asyncio
+import time
+from playwright.async_api import async_playwright, Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError
 from bs4 import BeautifulSoup
+from .parser import parse_html
 
-def has_meaningful_content(html: str) -> bool:
-    if not html or len(html.strip()) < 100:
+def has_meaningful_content(html: str | BeautifulSoup) -> bool:
+    if not isinstance(html, BeautifulSoup) and (not html or len(html.strip()) < 100):
         return False
 
     try:
-        soup = BeautifulSoup(html, 'html.parser')
+        soup = html if isinstance(html, BeautifulSoup) else parse_html(html)
         text = soup.get_text(separator=' ', strip=True)
 
         blocking_indicators = [
@@ -25,8 +28,13 @@ def has_meaningful_content(html: str) -> bool:
     except Exception:
         return False
 
+BLOCKED_RESOURCE_TYPES = {'image', 'font', 'media', 'stylesheet'}
+MIN_READY_TEXT_LENGTH = 200
+READY_PREDICATE = "minLength => !!document.body && document.body.innerText.trim().length >= minLength"
+
 class ScrapingBrowserClient:
-    def __init__(self, api_key: str, enabled: bool = True, zone: str = "scraping_browser1", password: str | None = None):
+    def __init__(self, api_key: str, enabled: bool = True, zone: str = "scraping_browser1", password: str | None = None,
+                 max_tabs: int = 4, ready_timeout_ms: int = 3000, block_resources: bool = True):
         self.api_key = api_key
         self.enabled = enabled
         self.zone = zone
@@ -34,40 +42,133 @@ class ScrapingBrowserClient:
         self.request_count = 0
         self.success_count = 0
         self.total_cost_estimate = 0.0
+        self.connect_count = 0
+        self.blocked_count = 0
+        self.total_latency = 0.0
+        self.ready_timeout_ms = ready_timeout_ms
+        self.block_resources = block_resources
 
         auth_string = f"brd-customer-{api_key}-zone-{zone}"
         if password:
             auth_string += f":{password}"
         self.ws_endpoint = f"wss://{auth_string}@brd.superproxy.io:9222"
 
-    async def fetch(self, url: str, wait_for_network: bool = False, timeout: int = 120000) -> str:
+        self._playwright = None
+        self._browser = None
+        self._generation = 0
+        self._idle_pages: list[tuple[int, object]] = []
+        self._connect_lock = asyncio.Lock()
+        self._tab_slots = asyncio.Semaphore(max(1, max_tabs))
+
+    def _is_connected(self) -> bool:
+        return self._browser is not None and self._browser.is_connected()
+
+    async def _connect(self):
+        async with self._connect_lock:
+            if self._is_connected():
+                return
+            await self._close_browser()
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.connect_over_cdp(self.ws_endpoint)
+            self._generation += 1
+            self.connect_count += 1
+
+    async def _close_browser(self):
+        browser, self._browser = self._browser, None
+        self._idle_pages = []
+        if browser is not None:
+            try:
+                await browser.close()
+            except Exception:
+                pass
+
+    async def _acquire_page(self):
+        await self._connect()
+        while self._idle_pages:
+            generation, page = self._idle_pages.pop()
+            if generation == self._generation and not page.is_closed():
+                return generation, page
+        page = await self._browser.new_page()
+        if self.block_resources:
+            await page.route("**/*", self._route_request)
+        return self._generation, page
+
+    async def _route_request(self, route):
+        if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+            self.blocked_count += 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def _wait_until_ready(self, page, ready_selector: str | None):
+        # Stop as soon as the page has rendered real content; the timeout is only a cap.
+        try:
+            if ready_selector:
+                await page.wait_for_selector(ready_selector, timeout=self.ready_timeout_ms)
+            else:
+                await page.wait_for_function(READY_PREDICATE, arg=MIN_READY_TEXT_LENGTH,
+                                             timeout=self.ready_timeout_ms)
+        except PlaywrightTimeoutError:
+            pass
+
+    async def _release_page(self, generation: int, page, reusable: bool):
+        if reusable and generation == self._generation and self._is_connected() and not page.is_closed():
+            self._idle_pages.append((generation, page))
+            return
+        try:
+            await page.close()
+        except Exception:
+            pass
+
+    async def fetch(self, url: str, wait_for_network: bool = False, timeout: int = 120000,
+                    ready_selector: str | None = None) -> str:
         if not self.enabled or not self.api_key:
             raise ValueError("Scraping Browser not enabled or API key missing")
 
-        async with async_playwright() as p:
-            browser = await p.chromium.connect_over_cdp(self.ws_endpoint)
-
-            try:
-                page = await browser.new_page()
-                await page.goto(url, wait_until='networkidle' if wait_for_network else 'domcontentloaded', timeout=timeout)
-                await page.wait_for_timeout(3000)
-
-                html = await page.content()
+        async with self._tab_slots:
+            started = time.monotonic()
+            for attempt in range(2):
+                generation, page = await self._acquire_page()
+                reusable = False
+                try:
+                    await page.goto(url, wait_until='networkidle' if wait_for_network else 'domcontentloaded', timeout=timeout)
+                    await self._wait_until_ready(page, ready_selector)
+
+                    html = await page.content()
+                    reusable = True
+                except PlaywrightError:
+                    # A dropped CDP connection surfaces as a page error; reconnect once and retry.
+                    if attempt == 0 and not self._is_connected():
+                        continue
+                    raise
+                finally:
+                    await self._release_page(generation, page, reusable)
 
                 self.request_count += 1
                 self.total_cost_estimate += 0.02
+                self.total_latency += time.monotonic() - started
 
                 if has_meaningful_content(html):
                     self.success_count += 1
 
                 return html
 
-            finally:
-                await browser.close()
+    async def close(self):
+        async with self._connect_lock:
+            await self._close_browser()
+            if self._playwright is not None:
+                playwright, self._playwright = self._playwright, None
+                await playwright.stop()
 
     def get_usage_stats(self) -> dict:
+        per_page = self.request_count or 1
         return {
             "requests": self.request_count,
             "successful": self.success_count,
-            "estimated_cost_usd": round(self.total_cost_estimate, 2)
+            "estimated_cost_usd": round(self.total_cost_estimate, 2),
+            "connections": self.connect_count,
+            "avg_latency_seconds": round(self.total_latency / per_page, 2),
+            "cost_per_page_usd": round(self.total_cost_estimate / per_page, 4),
+            "blocked_requests": self.blocked_count
         }
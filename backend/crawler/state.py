@@ -1,10 +1,82 @@
+import heapq
+import itertools
 from dataclasses import dataclass, field
-from collections import deque
-from typing import Set, Deque
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+from typing import Set
+
+DEFAULT_SITEMAP_PRIORITY = 0.5
+
+def url_depth(url: str) -> int:
+    return len([part for part in urlparse(url).path.split('/') if part])
+
+def url_section(url: str) -> str:
+    parts = [part for part in urlparse(url).path.split('/') if part]
+    return parts[0] if parts else ""
+
+def _lastmod_timestamp(lastmod: datetime | None) -> float:
+    if lastmod is None:
+        return 0.0
+    if lastmod.tzinfo is None:
+        lastmod = lastmod.replace(tzinfo=timezone.utc)
+    return lastmod.timestamp()
+
+# Priority queue of URLs to crawl; each URL is only ever enqueued once.
+# Lower hop depth wins, then higher sitemap priority, then shallower paths, then
+# sections that have had fewer URLs enqueued so far (so a small budget spreads
+# across the site), then the most recently modified page.
+class Frontier:
+    def __init__(self):
+        self._heap: list[tuple] = []
+        self._enqueued: Set[str] = set()
+        self._depths: dict[str, int] = {}
+        self._section_counts: dict[str, int] = {}
+        self._counter = itertools.count()
+
+    def push(self, url: str, depth: int = 0, priority: float | None = None,
+             lastmod: datetime | None = None) -> bool:
+        if url in self._enqueued:
+            return False
+        self._enqueued.add(url)
+        self._depths[url] = depth
+
+        section = url_section(url)
+        section_rank = self._section_counts.get(section, 0)
+        self._section_counts[section] = section_rank + 1
+
+        score = (
+            depth,
+            -(priority if priority is not None else DEFAULT_SITEMAP_PRIORITY),
+            url_depth(url),
+            section_rank,
+            -_lastmod_timestamp(lastmod),
+            next(self._counter),
+        )
+        heapq.heappush(self._heap, (score, url))
+        return True
+
+    def pop(self) -> str:
+        _, url = heapq.heappop(self._heap)
+        return url
+
+    def depth(self, url: str) -> int:
+        return self._depths.get(url, 0)
+
+    def clear(self):
+        self._heap.clear()
+        self._enqueued.clear()
+        self._depths.clear()
+        self._section_counts.clear()
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._enqueued
+
+    def __len__(self) -> int:
+        return len(self._heap)
 
 @dataclass
 class CrawlState:
     base_url: str
     max_pages: int
     visited: Set[str] = field(default_factory=set)
-    queue: Deque[str] = field(default_factory=deque)
+    queue: Frontier = field(default_factory=Frontier)
@@ -19,6 +19,11 @@ class CrawlSite:
     sitemap_newest_lastmod: datetime | None
     avg_change_interval_minutes: float | None
     webhook_secret: str | None
+    fetch_profile: dict | None = None
+    page_snapshot: list | None = None
+    sitemap_validators: dict | None = None
+    section_hashes: dict | None = None
+    llms_full: bool | None = None
 
 def get_supabase_client() -> Client | None:
     if not settings.supabase_url or not settings.supabase_key:
@@ -32,7 +37,12 @@ async def save_site_metadata(
     desc_length: int,
     latest_llms_hash: str,
     latest_llms_url: str,
-    sentinel_url: str | None = None
+    sentinel_url: str | None = None,
+    fetch_profile: dict | None = None,
+    page_snapshot: list | None = None,
+    sitemap_newest_lastmod: datetime | None = None,
+    section_hashes: dict | None = None,
+    llms_full: bool | None = None
 ) -> bool:
     client = get_supabase_client()
     if not client:
@@ -55,6 +65,21 @@ async def save_site_metadata(
             "updated_at": now.isoformat()
         }
 
+        if fetch_profile:
+            data["fetch_profile"] = fetch_profile
+
+        if page_snapshot is not None:
+            data["page_snapshot"] = page_snapshot
+
+        if sitemap_newest_lastmod:
+            data["sitemap_newest_lastmod"] = sitemap_newest_lastmod.isoformat()
+
+        if section_hashes is not None:
+            data["section_hashes"] = section_hashes
+
+        if llms_full is not None:
+            data["llms_full"] = llms_full
+
         client.table("crawl_sites").upsert(data, on_conflict="base_url").execute()
         return True
     except Exception as e:
@@ -94,7 +119,12 @@ async def get_due_sites() -> list[CrawlSite]:
                 sentinel_url=row.get("sentinel_url"),
                 sitemap_newest_lastmod=parse_datetime(row.get("sitemap_newest_lastmod")),
                 avg_change_interval_minutes=row.get("avg_change_interval_minutes"),
-                webhook_secret=row.get("webhook_secret")
+                webhook_secret=row.get("webhook_secret"),
+                fetch_profile=row.get("fetch_profile"),
+                page_snapshot=row.get("page_snapshot"),
+                sitemap_validators=row.get("sitemap_validators"),
+                section_hashes=row.get("section_hashes"),
+                llms_full=row.get("llms_full")
             ))
 
         return sites
@@ -105,7 +135,8 @@ async def get_due_sites() -> list[CrawlSite]:
 async def update_scheduling_only(
     site_id: str,
     next_crawl_at: datetime,
-    sitemap_newest_lastmod: datetime | None
+    sitemap_newest_lastmod: datetime | None,
+    sitemap_validators: dict | None = None
 ) -> bool:
     client = get_supabase_client()
     if not client:
@@ -122,6 +153,9 @@ async def update_scheduling_only(
         if sitemap_newest_lastmod:
             update_data["sitemap_newest_lastmod"] = sitemap_newest_lastmod.isoformat()
 
+        if sitemap_validators is not None:
+            update_data["sitemap_validators"] = sitemap_validators
+
         client.table("crawl_sites").update(update_data).eq("id", site_id).execute()
         return True
     except Exception as e:
@@ -135,7 +169,12 @@ async def update_crawl_result(
     next_crawl_at: datetime,
     last_changed_at: datetime | None,
     sitemap_newest_lastmod: datetime | None,
-    avg_change_interval_minutes: float | None
+    avg_change_interval_minutes: float | None,
+    fetch_profile: dict | None = None,
+    page_snapshot: list | None = None,
+    sitemap_validators: dict | None = None,
+    sentinel_url: str | None = None,
+    section_hashes: dict | None = None
 ) -> bool:
     client = get_supabase_client()
     if not client:
@@ -156,6 +195,21 @@ async def update_crawl_result(
         if sitemap_newest_lastmod:
             update_data["sitemap_newest_lastmod"] = sitemap_newest_lastmod.isoformat()
 
+        if fetch_profile is not None:
+            update_data["fetch_profile"] = fetch_profile
+
+        if page_snapshot is not None:
+            update_data["page_snapshot"] = page_snapshot
+
+        if sitemap_validators is not None:
+            update_data["sitemap_validators"] = sitemap_validators
+
+        if section_hashes is not None:
+            update_data["section_hashes"] = section_hashes
+
+        if sentinel_url:
+            update_data["sentinel_url"] = sentinel_url
+
         client.table("crawl_sites").update(update_data).eq("id", site_id).execute()
         return True
     except Exception as e:
@@ -0,0 +1,71 @@
+import hashlib
+import os
+
+class FileLRUStore:
+    # One file per key under a directory, bounded by total size. Reads touch the
+    # file's mtime and the least recently used files are evicted first; the index
+    # is rebuilt from disk so the bound survives restarts.
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+        # path -> (size, last access)
+        self._index: dict[str, tuple[int, float]] = {}
+        for name in os.listdir(directory):
+            if name.endswith('.json'):
+                stat = os.stat(os.path.join(directory, name))
+                self._index[os.path.join(directory, name)] = (stat.st_size, stat.st_mtime)
+        self._total_bytes = sum(size for size, _ in self._index.values())
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{hashlib.sha256(key.encode()).hexdigest()}.json")
+
+    def get(self, key: str) -> str | None:
+        path = self._path(key)
+        if path not in self._index:
+            return None
+        try:
+            with open(path) as f:
+                body = f.read()
+            os.utime(path)
+            self._index[path] = (self._index[path][0], os.stat(path).st_mtime)
+            return body
+        except Exception as e:
+            print(f"Error reading cache file {path}: {e}")
+            self._remove(path)
+            return None
+
+    def put(self, key: str, body: str):
+        path = self._path(key)
+        try:
+            self._remove(path)
+            with open(path, 'w') as f:
+                f.write(body)
+            stat = os.stat(path)
+            self._index[path] = (stat.st_size, stat.st_mtime)
+            self._total_bytes += stat.st_size
+            self._evict()
+        except Exception as e:
+            print(f"Error writing cache file {path}: {e}")
+
+    def remove(self, key: str):
+        self._remove(self._path(key))
+
+    def _remove(self, path: str):
+        if path in self._index:
+            size, _ = self._index.pop(path)
+            self._total_bytes -= size
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        if self._total_bytes <= self.max_bytes:
+            return
+        for path, _ in sorted(self._index.items(), key=lambda item: item[1][1]):
+            if self._total_bytes <= self.max_bytes:
+                break
+            self._remove(path)
@@ -1,8 +1,13 @@
 from crawler import PageInfo
 from urllib.parse import urlparse, urlunparse
+import asyncio
+import hashlib
 import httpx
-from typing import Dict
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator
 from tagger import assign_tags, format_description_with_tags
+from md_cache import MdProbeCache, MISSING
 
 SECONDARY_PATH_PATTERNS = [
     '/privacy', '/terms', '/legal', '/cookie', '/disclaimer',
@@ -13,6 +18,8 @@ SECONDARY_PATH_PATTERNS = [
     '/archive', '/old', '/legacy', '/deprecated',
 ]
 
+MD_CONTENT_TYPES = ['text/markdown', 'text/plain', 'text/x-markdown', 'application/octet-stream']
+
 def clean_url(url: str) -> str:
     parsed = urlparse(url)
     return urlunparse((parsed.scheme, parsed.netloc, parsed.path, '', '', ''))
@@ -39,30 +46,72 @@ async def check_md_exists(url: str, timeout: float = 5.0) -> bool:
     except:
         return False
 
-async def get_md_url_map(pages: list[PageInfo]) -> Dict[str, str]:
-    md_map = {}
-
-    async with httpx.AsyncClient(timeout=5.0) as client:
-        async def check_url(page: PageInfo) -> tuple[str, str]:
-            clean = clean_url(page.url)
+class MdProber:
+    # Probes .md alternates one URL at a time so callers can start as soon as a
+    # page is known. Per-host semaphores bound the sockets; once the first few
+    # probes on a host (cached or live) all miss, the rest of that host is
+    # skipped, since sites either publish .md versions or they don't.
+    def __init__(self, client: httpx.AsyncClient, cache: MdProbeCache | None = None,
+                 per_host_limit: int = 4, miss_threshold: int = 5):
+        self.client = client
+        self.cache = cache
+        self.per_host_limit = max(1, per_host_limit)
+        self.miss_threshold = miss_threshold
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+        self._hits: dict[str, int] = {}
+        self._misses: dict[str, int] = {}
+
+    def _record(self, host: str, found: bool):
+        counts = self._hits if found else self._misses
+        counts[host] = counts.get(host, 0) + 1
+
+    def _host_exhausted(self, host: str) -> bool:
+        return (self.miss_threshold > 0 and not self._hits.get(host) and
+                self._misses.get(host, 0) >= self.miss_threshold)
+
+    async def probe(self, clean: str) -> str:
+        host = urlparse(clean).netloc
+        cached = self.cache.get(clean) if self.cache else MISSING
+        if cached is not MISSING:
+            self._record(host, bool(cached))
+            return cached or clean
+
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.per_host_limit)
+        async with self._semaphores[host]:
+            if self._host_exhausted(host):
+                return clean
             md_url = get_md_url(clean)
             try:
-                response = await client.head(md_url, follow_redirects=True)
-                if response.status_code == 200:
-                    content_type = response.headers.get('content-type', '').lower()
-                    if any(ct in content_type for ct in ['text/markdown', 'text/plain', 'text/x-markdown', 'application/octet-stream']):
-                        return (clean, md_url)
+                response = await self.client.head(md_url, follow_redirects=True)
             except:
-                pass
-            return (clean, clean)
+                self._record(host, False)
+                return clean
+
+            content_type = response.headers.get('content-type', '').lower()
+            found = response.status_code == 200 and any(ct in content_type for ct in MD_CONTENT_TYPES)
+            self._record(host, found)
+            if self.cache:
+                self.cache.put(clean, md_url if found else None)
+            return md_url if found else clean
 
-        import asyncio
-        results = await asyncio.gather(*[check_url(page) for page in pages], return_exceptions=True)
+    def save(self):
+        if self.cache:
+            self.cache.save()
+
+async def get_md_url_map(pages: list[PageInfo], cache: MdProbeCache | None = None,
+                         per_host_limit: int = 4, miss_threshold: int = 5) -> Dict[str, str]:
+    urls = list(dict.fromkeys(clean_url(page.url) for page in pages))
+    md_map = {url: url for url in urls}
+
+    async with httpx.AsyncClient(timeout=5.0) as client:
+        prober = MdProber(client, cache, per_host_limit, miss_threshold)
+        results = await asyncio.gather(*[prober.probe(url) for url in urls], return_exceptions=True)
+        prober.save()
 
-        for result in results:
-            if isinstance(result, tuple):
-                original, md_or_original = result
-                md_map[original] = md_or_original
+    for url, result in zip(urls, results):
+        if isinstance(result, str):
+            md_map[url] = result
 
     return md_map
 
@@ -106,70 +155,174 @@ def is_secondary_section(section_name: str) -> bool:
     section_lower = section_name.lower()
     return any(pattern.strip('/') in section_lower for pattern in SECONDARY_PATH_PATTERNS)
 
-def format_llms_txt(base_url: str, pages: list[PageInfo], md_url_map: Dict[str, str] = None) -> str:
+def page_section(base_url: str, clean: str) -> str:
+    path_parts = clean.replace(base_url, "").strip("/").split("/")
+    return path_parts[0] if path_parts and path_parts[0] else "main"
+
+def format_page_link(page: PageInfo, section: str, output_url: str) -> str:
+    tags = assign_tags(page, section_name=section)
+    desc = truncate(page.description, 150) if page.description else ""
+    desc_with_tags = format_description_with_tags(desc, tags)
+
+    link_text = f"[{page.title}]({output_url})"
+    return f"- {link_text}: {desc_with_tags}" if desc_with_tags else f"- {link_text}"
+
+HEADER_SECTION = '#'
+
+@dataclass
+class RenderedSection:
+    digest: str
+    # Link lines, each prefixed with a newline, ready to drop under a heading
+    body: str
+
+class SectionRenderCache:
+    # Rendered section bodies keyed by the digest of their inputs, shared across
+    # crawls so an unchanged section is never re-tagged or re-formatted.
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._bodies: OrderedDict[str, str] = OrderedDict()
+
+    def get(self, digest: str) -> str | None:
+        body = self._bodies.get(digest)
+        if body is not None:
+            self._bodies.move_to_end(digest)
+        return body
+
+    def put(self, digest: str, body: str):
+        self._bodies[digest] = body
+        self._bodies.move_to_end(digest)
+        while len(self._bodies) > self.max_entries:
+            self._bodies.popitem(last=False)
+
+_section_cache: SectionRenderCache | None = None
+
+def get_section_cache() -> SectionRenderCache:
+    global _section_cache
+    if _section_cache is None:
+        _section_cache = SectionRenderCache()
+    return _section_cache
+
+def section_digest(section: str, entries: list[tuple[PageInfo, str]]) -> str:
+    # Covers everything format_page_link reads, so equal digests render identically
+    digest = hashlib.sha256(section.encode())
+    for page, output_url in entries:
+        for value in (page.url, page.title, page.description, output_url):
+            digest.update(b'\0')
+            digest.update((value or '').encode())
+    return digest.hexdigest()
+
+def build_llms_txt(base_url: str, pages: list[PageInfo], md_url_map: Dict[str, str] = None,
+                   cache: SectionRenderCache | None = None,
+                   format_link: Callable[[PageInfo, str, str], str] = format_page_link) -> "LlmsTxtDocument":
     if not pages:
-        domain = urlparse(base_url).netloc
-        return f"# {domain}\n\n> No content available"
-
-    homepage = pages[0]
-
-    lines = [
-        f"# {get_site_title(homepage, base_url)}",
-        "",
-        f"> {get_summary(homepage)}",
-        ""
-    ]
+        return LlmsTxtDocument(base_url, None, {})
 
-    sections = {}
+    grouped = {}
     for page in pages[1:]:
         clean = clean_url(page.url)
-        path_parts = clean.replace(base_url, "").strip("/").split("/")
-        section = path_parts[0] if path_parts and path_parts[0] else "main"
-
-        if section not in sections:
-            sections[section] = []
-
         output_url = md_url_map.get(clean, clean) if md_url_map else clean
+        grouped.setdefault(page_section(base_url, clean), []).append((page, output_url))
 
-        tags = assign_tags(page, section_name=section)
-        desc = truncate(page.description, 150) if page.description else ""
-        desc_with_tags = format_description_with_tags(desc, tags)
-
-        link_text = f"[{page.title}]({output_url})"
-        full_link = f"- {link_text}: {desc_with_tags}" if desc_with_tags else f"- {link_text}"
-
-        sections[section].append(full_link)
+    sections = {}
+    for section, entries in grouped.items():
+        digest = section_digest(section, entries)
+        body = cache.get(digest) if cache else None
+        if body is None:
+            body = "".join("\n" + format_link(page, section, output_url) for page, output_url in entries)
+            if cache:
+                cache.put(digest, body)
+        sections[section] = RenderedSection(digest, body)
+
+    return LlmsTxtDocument(base_url, pages[0], sections)
+
+def format_llms_txt(base_url: str, pages: list[PageInfo], md_url_map: Dict[str, str] = None,
+                    cache: SectionRenderCache | None = None) -> str:
+    return build_llms_txt(base_url, pages, md_url_map, cache).text()
+
+def iter_llms_txt(base_url: str, homepage: PageInfo | None, sections: dict[str, RenderedSection]) -> Iterator[str]:
+    # Yields the header and then one chunk per section; the chunks concatenate to
+    # exactly what joining all lines with newlines would give.
+    if homepage is None:
+        domain = urlparse(base_url).netloc
+        yield f"# {domain}\n\n> No content available"
+        return
 
-    if not sections:
-        return "\n".join(lines)
+    yield llms_txt_header(base_url, homepage)
 
     primary = {}
     secondary = {}
 
-    for section_name, links in sections.items():
+    for section_name, section in sections.items():
         if is_secondary_section(section_name):
-            secondary[section_name] = links
+            secondary[section_name] = section
         else:
-            primary[section_name] = links
+            primary[section_name] = section
 
     for section_name in sorted(primary.keys()):
-        clean_name = clean_section_name(section_name)
-        lines.extend([
-            f"## {clean_name}",
-            "",
-            *primary[section_name],
-            ""
-        ])
+        yield f"\n## {clean_section_name(section_name)}\n{primary[section_name].body}\n"
 
     if secondary:
-        lines.extend([
-            "## Optional",
-            "",
-        ])
+        yield "\n## Optional\n" + "".join(secondary[name].body for name in sorted(secondary.keys())) + "\n"
 
-        for section_name in sorted(secondary.keys()):
-            lines.extend(secondary[section_name])
-
-        lines.append("")
-
-    return "\n".join(lines)
+def llms_txt_header(base_url: str, homepage: PageInfo) -> str:
+    return "\n".join([
+        f"# {get_site_title(homepage, base_url)}",
+        "",
+        f"> {get_summary(homepage)}",
+        ""
+    ])
+
+class LlmsTxtDocument:
+    # Holds rendered section bodies rather than the joined text, so the output
+    # can be streamed (hashed, sent, uploaded) chunk by chunk, as often as
+    # needed, without a full copy in memory.
+    def __init__(self, base_url: str, homepage: PageInfo | None, sections: dict[str, RenderedSection]):
+        self.base_url = base_url
+        self.homepage = homepage
+        self.sections = sections
+
+    def chunks(self) -> Iterator[str]:
+        return iter_llms_txt(self.base_url, self.homepage, self.sections)
+
+    def text(self) -> str:
+        return "".join(self.chunks())
+
+    def section_hashes(self) -> dict[str, str]:
+        header = llms_txt_header(self.base_url, self.homepage) if self.homepage else ""
+        hashes = {HEADER_SECTION: hashlib.sha256(header.encode()).hexdigest()}
+        hashes.update((name, section.digest) for name, section in self.sections.items())
+        return hashes
+
+def changed_sections(previous: dict[str, str] | None, current: dict[str, str]) -> list[str]:
+    # Sections added, removed or re-rendered since the stored hashes; None means nothing is known
+    if previous is None:
+        return sorted(current)
+    return sorted(name for name in previous.keys() | current.keys() if previous.get(name) != current.get(name))
+
+def iter_llms_full_txt(base_url: str, pages: list[PageInfo],
+                       text_for: Callable[[str], str | None]) -> Iterator[str]:
+    # llms-full.txt: the same header, then every page's extracted text under its title.
+    # Pages whose text is unknown are left out rather than refetched.
+    if not pages:
+        yield from iter_llms_txt(base_url, None, {})
+        return
+
+    yield llms_txt_header(base_url, pages[0])
+    for page in pages:
+        text = text_for(page.url)
+        if text:
+            yield f"\n## {page.title}\n\nSource: {clean_url(page.url)}\n\n{text}\n"
+
+def llms_txt_chunks(content: str | LlmsTxtDocument) -> Iterator[str]:
+    return iter([content]) if isinstance(content, str) else content.chunks()
+
+def llms_txt_sha256(content: str | LlmsTxtDocument, full_chunks: Iterable[str] | None = None) -> str:
+    digest = hashlib.sha256()
+    for chunk in llms_txt_chunks(content):
+        digest.update(chunk.encode())
+    # Sites with llms-full.txt hash both, so a text-only change still counts as a change
+    if full_chunks is not None:
+        digest.update(b'\0')
+        for chunk in full_chunks:
+            digest.update(chunk.encode())
+    return digest.hexdigest()
@@ -0,0 +1,93 @@
+from dataclasses import dataclass, asdict, fields
+from datetime import datetime
+from crawler import PageInfo
+from crawler.scout import normalize_url, same_domain, should_skip
+from sitemap_utils import SitemapPage
+
+@dataclass
+class IncrementalPlan:
+    kept: list[PageInfo]
+    refetch: list[str]
+    removed: list[str]
+
+_PAGE_FIELDS = {f.name for f in fields(PageInfo)}
+
+def pages_to_snapshot(pages: list[PageInfo], sitemap_pages: list[SitemapPage] | None = None) -> list[dict]:
+    # Sitemap membership is recorded so the next recrawl can tell a page dropped
+    # from the sitemap apart from one that was only ever reached through links
+    sitemap_urls = {normalize_url(page.url) for page in sitemap_pages or []}
+    rows = []
+    for page in pages:
+        row = asdict(page)
+        if page.url in sitemap_urls:
+            row['in_sitemap'] = True
+        rows.append(row)
+    return rows
+
+def pages_from_snapshot(snapshot: list[dict] | None) -> list[PageInfo]:
+    return [PageInfo(**{key: value for key, value in row.items() if key in _PAGE_FIELDS})
+            for row in snapshot or []]
+
+def sitemap_urls_from_snapshot(snapshot: list[dict] | None) -> set[str]:
+    return {row['url'] for row in snapshot or [] if row.get('in_sitemap')}
+
+def _naive(value: datetime) -> datetime:
+    return value.replace(tzinfo=None) if value.tzinfo else value
+
+def plan_incremental_crawl(base_url: str, previous: list[PageInfo], sitemap_pages: list[SitemapPage],
+                           last_crawled_at: datetime, max_pages: int,
+                           previous_sitemap_urls: set[str] | None = None) -> IncrementalPlan:
+    base_url = normalize_url(base_url)
+    last_crawled = _naive(last_crawled_at)
+
+    lastmods: dict[str, datetime | None] = {}
+    for sitemap_page in sitemap_pages:
+        url = normalize_url(sitemap_page.url)
+        if same_domain(url, base_url) and not should_skip(url):
+            lastmods[url] = sitemap_page.lastmod
+
+    previous_sitemap_urls = previous_sitemap_urls or set()
+    kept, refetch, removed = [], [], []
+    previous_urls = set()
+    for page in previous:
+        previous_urls.add(page.url)
+        if page.url != base_url and page.url not in lastmods:
+            # Only a page that left the sitemap is known to be gone; one found through
+            # links has no lastmod to go on, so it is fetched again
+            if page.url in previous_sitemap_urls:
+                removed.append(page.url)
+            else:
+                refetch.append(page.url)
+            continue
+
+        lastmod = lastmods.get(page.url)
+        if page.url in lastmods and (lastmod is None or _naive(lastmod) > last_crawled):
+            refetch.append(page.url)
+        else:
+            kept.append(page)
+
+    # New sitemap URLs fill whatever budget the previous crawl left, newest first
+    budget = max_pages - len(kept) - len(refetch)
+    new_urls = [url for url in lastmods if url not in previous_urls]
+    new_urls.sort(key=lambda url: _naive(lastmods[url]) if lastmods[url] else datetime.min, reverse=True)
+    refetch.extend(new_urls[:max(0, budget)])
+
+    return IncrementalPlan(kept=kept, refetch=refetch, removed=removed)
+
+def merge_pages(previous: list[PageInfo], plan: IncrementalPlan, fetched: list[PageInfo]) -> list[PageInfo]:
+    fetched_by_url = {page.url: page for page in fetched}
+    kept_urls = {page.url for page in plan.kept}
+    removed = set(plan.removed)
+
+    merged = []
+    for page in previous:
+        if page.url in removed:
+            continue
+        if page.url in fetched_by_url:
+            merged.append(fetched_by_url.pop(page.url))
+        elif page.url in kept_urls or page.url in plan.refetch:
+            # A failed refetch keeps the previous version rather than dropping the page
+            merged.append(page)
+
+    merged.extend(page for page in fetched if page.url in fetched_by_url)
+    return merged
@@ -0,0 +1,60 @@
+import hashlib
+import json
+import time
+from abc import ABC, abstractmethod
+from file_cache import FileLRUStore
+from .prompts import PROMPT_VERSION
+
+def result_cache_key(messages: list[dict], model: str, temperature: float) -> str:
+    payload = json.dumps([PROMPT_VERSION, model, temperature, messages], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def state_cache_key(site_key: str, model: str) -> str:
+    # Last (formatted input, enhanced output) pair for a site, used by delta enhancement
+    payload = json.dumps(['state', PROMPT_VERSION, model, site_key])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class ResultCache(ABC):
+    @abstractmethod
+    def get(self, key: str) -> str | None:
+        ...
+
+    @abstractmethod
+    def put(self, key: str, output: str):
+        ...
+
+class FileResultCache(ResultCache):
+    def __init__(self, directory: str, max_bytes: int = 20_000_000, ttl_seconds: float = 2_592_000.0):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._store = FileLRUStore(directory, max_bytes)
+
+    def get(self, key: str) -> str | None:
+        body = self._store.get(key)
+        if body is None:
+            return None
+        try:
+            data = json.loads(body)
+            # Access time drives eviction, so the TTL is measured from the stored write time
+            if time.time() - data['created_at'] > self.ttl_seconds:
+                self._store.remove(key)
+                return None
+            return data['output']
+        except Exception as e:
+            print(f"Error reading LLM result cache {key}: {e}")
+            self._store.remove(key)
+            return None
+
+    def put(self, key: str, output: str):
+        self._store.put(key, json.dumps({'output': output, 'created_at': time.time()}))
+
+_result_cache: ResultCache | None = None
+
+def get_result_cache(directory: str | None, max_bytes: int, ttl_seconds: float) -> ResultCache | None:
+    global _result_cache
+    if not directory:
+        return None
+    if _result_cache is None:
+        _result_cache = FileResultCache(directory, max_bytes, ttl_seconds)
+    return _result_cache
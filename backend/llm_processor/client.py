@@ -1,13 +1,107 @@
 import httpx
 import asyncio
-from typing import Callable
+import json
+import time
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable
 
 class RateLimitError(Exception):
     pass
 
+class StreamAbortedError(Exception):
+    # Raised when a streamed completion is already invalid; the request is cancelled
+    pass
+
+class TokenBucket:
+    def __init__(self, requests_per_minute: int = 20, burst: int = 5):
+        self.rate = requests_per_minute / 60
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        # A 429 retry-after pauses every caller, not just the one that was throttled
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def block_for(self, seconds: float):
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        # Waiters queue on the lock, so tokens are handed out in arrival order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    await asyncio.sleep(self._blocked_until - now)
+                    continue
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+class OpenRouterPool:
+    def __init__(self, requests_per_minute: int = 20, burst: int = 5, max_in_flight: int = 20,
+                 transport: httpx.AsyncBaseTransport | None = None):
+        self.limiter = TokenBucket(requests_per_minute, burst)
+        self.max_in_flight = max_in_flight
+        self._in_flight_semaphore = asyncio.Semaphore(max_in_flight)
+        self._transport = transport
+        self._client: httpx.AsyncClient | None = None
+        self.queued = 0
+        self.in_flight = 0
+        self.throttled = 0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                transport=self._transport,
+                limits=httpx.Limits(max_connections=self.max_in_flight, max_keepalive_connections=self.max_in_flight)
+            )
+        return self._client
+
+    def stats(self) -> dict:
+        return {"queued": self.queued, "in_flight": self.in_flight, "throttled": self.throttled}
+
+    def throttle(self, retry_after: float):
+        self.throttled += 1
+        self.limiter.block_for(retry_after)
+
+    @asynccontextmanager
+    async def _slot(self):
+        self.queued += 1
+        try:
+            await self.limiter.acquire()
+            await self._in_flight_semaphore.acquire()
+        finally:
+            self.queued -= 1
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._in_flight_semaphore.release()
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        async with self._slot():
+            return await self.client.post(url, **kwargs)
+
+    @asynccontextmanager
+    async def stream(self, url: str, **kwargs):
+        async with self._slot():
+            async with self.client.stream("POST", url, **kwargs) as response:
+                yield response
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
 class OpenRouterClient:
     def __init__(self, api_key: str, model: str, timeout: float = 30.0,
-                 max_retries: int = 3, temperature: float = 0.3, log_fn: Callable[[str], None] | None = None):
+                 max_retries: int = 3, temperature: float = 0.3, log_fn: Callable[[str], None] | None = None,
+                 pool: OpenRouterPool | None = None):
         self.api_key = api_key
         self.model = model
         self.timeout = timeout
@@ -15,89 +109,162 @@ class OpenRouterClient:
         self.temperature = temperature
         self.log = log_fn or (lambda x: None)
         self.base_url = "https://openrouter.ai/api/v1"
-        self._rate_limit_semaphore = asyncio.Semaphore(20)
-        self._last_request_times: list[float] = []
-
-    async def _wait_for_rate_limit(self):
-        import time
-        now = time.time()
-        self._last_request_times = [t for t in self._last_request_times if now - t < 60]
-
-        if len(self._last_request_times) >= 20:
-            oldest = self._last_request_times[0]
-            wait_time = 60 - (now - oldest) + 1
-            if wait_time > 0:
-                self.log(f"Rate limit: waiting {wait_time:.1f}s")
-                await asyncio.sleep(wait_time)
+        self.pool = pool or get_openrouter_pool()
+
+    def _headers(self) -> dict:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+            "HTTP-Referer": "https://llmstxt.org",
+            "X-Title": "llmstxt Generator"
+        }
 
-        self._last_request_times.append(now)
+    @staticmethod
+    def _strip_fences(completion: str) -> str:
+        completion = completion.strip()
+        if completion.startswith('```markdown'):
+            completion = completion[len('```markdown'):].strip()
+        if completion.startswith('```'):
+            completion = completion[3:].strip()
+        if completion.endswith('```'):
+            completion = completion[:-3].strip()
+        return completion
 
     async def complete(self, messages: list[dict]) -> str:
-        async with self._rate_limit_semaphore:
-            await self._wait_for_rate_limit()
-
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json",
-                "HTTP-Referer": "https://llmstxt.org",
-                "X-Title": "llmstxt Generator"
-            }
-
-            payload = {
-                "model": self.model,
-                "messages": messages,
-                "temperature": self.temperature
-            }
-
-            last_exception = None
-            for attempt in range(self.max_retries):
-                try:
-                    async with httpx.AsyncClient(timeout=self.timeout) as client:
-                        response = await client.post(
-                            f"{self.base_url}/chat/completions",
-                            json=payload,
-                            headers=headers
-                        )
-
-                        if response.status_code == 429:
-                            retry_after = int(response.headers.get('retry-after', 60))
-                            if attempt < self.max_retries - 1:
-                                self.log(f"Rate limited, retrying after {retry_after}s")
-                                await asyncio.sleep(retry_after)
-                                continue
-                            else:
-                                raise RateLimitError("Rate limit exceeded")
-
-                        response.raise_for_status()
-                        data = response.json()
-                        completion = data['choices'][0]['message']['content'].strip()
-
-                        if completion.startswith('```markdown'):
-                            completion = completion[len('```markdown'):].strip()
-                        if completion.startswith('```'):
-                            completion = completion[3:].strip()
-                        if completion.endswith('```'):
-                            completion = completion[:-3].strip()
-
-                        return completion
-
-                except httpx.TimeoutException as e:
-                    last_exception = e
-                    if attempt < self.max_retries - 1:
-                        wait_time = 2 ** attempt
-                        self.log(f"Timeout, retrying in {wait_time}s (attempt {attempt + 1}/{self.max_retries})")
-                        await asyncio.sleep(wait_time)
-                    continue
+        headers = self._headers()
 
-                except httpx.HTTPError as e:
-                    last_exception = e
-                    if hasattr(e, 'response') and e.response and 400 <= e.response.status_code < 500:
-                        if e.response.status_code != 429:
-                            raise
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": self.temperature
+        }
+
+        last_exception = None
+        for attempt in range(self.max_retries):
+            try:
+                response = await self.pool.post(
+                    f"{self.base_url}/chat/completions",
+                    json=payload,
+                    headers=headers,
+                    timeout=self.timeout
+                )
+
+                if response.status_code == 429:
+                    retry_after = int(response.headers.get('retry-after', 60))
+                    self.pool.throttle(retry_after)
                     if attempt < self.max_retries - 1:
-                        wait_time = 2 ** attempt
-                        self.log(f"API error, retrying in {wait_time}s: {str(e)}")
-                        await asyncio.sleep(wait_time)
-                    continue
+                        # The next attempt waits in the shared limiter until retry-after has passed
+                        self.log(f"Rate limited, retrying after {retry_after}s")
+                        continue
+                    else:
+                        raise RateLimitError("Rate limit exceeded")
+
+                response.raise_for_status()
+                data = response.json()
+                return self._strip_fences(data['choices'][0]['message']['content'])
+
+            except httpx.TimeoutException as e:
+                last_exception = e
+                if attempt < self.max_retries - 1:
+                    wait_time = 2 ** attempt
+                    self.log(f"Timeout, retrying in {wait_time}s (attempt {attempt + 1}/{self.max_retries})")
+                    await asyncio.sleep(wait_time)
+                continue
+
+            except httpx.HTTPError as e:
+                last_exception = e
+                if hasattr(e, 'response') and e.response and 400 <= e.response.status_code < 500:
+                    if e.response.status_code != 429:
+                        raise
+                if attempt < self.max_retries - 1:
+                    wait_time = 2 ** attempt
+                    self.log(f"API error, retrying in {wait_time}s: {str(e)}")
+                    await asyncio.sleep(wait_time)
+                continue
+
+        raise last_exception or Exception("Unknown error in OpenRouter client")
+
+    async def complete_streaming(self, messages: list[dict], on_line: Callable[[str], Awaitable[str | None]]) -> str:
+        # on_line sees each completed line as it arrives and returns an error to cancel the request
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": self.temperature,
+            "stream": True
+        }
+
+        last_exception = None
+        for attempt in range(self.max_retries):
+            lines: list[str] = []
+            try:
+                async with self.pool.stream(
+                    f"{self.base_url}/chat/completions",
+                    json=payload,
+                    headers=self._headers(),
+                    timeout=self.timeout
+                ) as response:
+                    if response.status_code == 429:
+                        retry_after = int(response.headers.get('retry-after', 60))
+                        self.pool.throttle(retry_after)
+                        if attempt < self.max_retries - 1:
+                            self.log(f"Rate limited, retrying after {retry_after}s")
+                            continue
+                        raise RateLimitError("Rate limit exceeded")
+
+                    response.raise_for_status()
+                    buffer = ''
+                    async for event in response.aiter_lines():
+                        # SSE comments (": OPENROUTER PROCESSING") keep the connection alive
+                        if not event.startswith('data: '):
+                            continue
+                        data = event[len('data: '):].strip()
+                        if data == '[DONE]':
+                            break
+                        try:
+                            chunk = json.loads(data)
+                        except json.JSONDecodeError as e:
+                            raise httpx.HTTPError(f"Malformed stream event: {data[:60]}") from e
+                        if 'error' in chunk:
+                            raise httpx.HTTPError(chunk['error'].get('message', 'Stream error'))
+                        buffer += chunk['choices'][0].get('delta', {}).get('content') or ''
+                        *complete_lines, buffer = buffer.split('\n')
+                        for line in complete_lines:
+                            lines.append(line)
+                            error = await on_line(line)
+                            if error:
+                                raise StreamAbortedError(error)
+
+                    if buffer:
+                        lines.append(buffer)
+                        error = await on_line(buffer)
+                        if error:
+                            raise StreamAbortedError(error)
+
+                return self._strip_fences('\n'.join(lines))
+
+            except httpx.HTTPError as e:
+                last_exception = e
+                if isinstance(e, httpx.HTTPStatusError) and 400 <= e.response.status_code < 500:
+                    raise
+                # Lines already handed to on_line cannot be taken back, so only retry clean failures
+                if lines or attempt == self.max_retries - 1:
+                    raise
+                wait_time = 2 ** attempt
+                self.log(f"API error, retrying in {wait_time}s: {str(e)}")
+                await asyncio.sleep(wait_time)
+
+        raise last_exception or Exception("Unknown error in OpenRouter client")
+
+_openrouter_pool: OpenRouterPool | None = None
+
+def get_openrouter_pool(requests_per_minute: int = 20, burst: int = 5, max_in_flight: int = 20) -> OpenRouterPool:
+    global _openrouter_pool
+    if _openrouter_pool is None:
+        _openrouter_pool = OpenRouterPool(requests_per_minute, burst, max_in_flight)
+    return _openrouter_pool
 
-            raise last_exception or Exception("Unknown error in OpenRouter client")
+async def close_openrouter_pool():
+    global _openrouter_pool
+    if _openrouter_pool is not None:
+        await _openrouter_pool.aclose()
+        _openrouter_pool = None
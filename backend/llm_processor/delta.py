@@ -0,0 +1,116 @@
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+
+_LINK_URL = re.compile(r'^- \[[^\]]+\]\(([^\)]+)\)')
+
+@dataclass
+class Entry:
+    heading: str
+    line: str
+
+@dataclass
+class DeltaPlan:
+    # url -> line carried over from the previous enhanced output
+    reused: dict[str, str] = field(default_factory=dict)
+    # enhanced heading (or new formatted heading) -> formatted lines to rewrite
+    groups: dict[str, list[str]] = field(default_factory=dict)
+    header_changed: bool = False
+
+def _entry_url(line: str) -> str | None:
+    match = _LINK_URL.match(line)
+    return match.group(1) if match else None
+
+def link_lines(text: str) -> dict[str, str]:
+    lines = {}
+    for line in text.split('\n'):
+        url = _entry_url(line)
+        if url:
+            lines.setdefault(url, line)
+    return lines
+
+def split_header(llms_txt: str) -> tuple[str, list[tuple[str, list[str]]]]:
+    header, sections = [], []
+    for line in llms_txt.split('\n'):
+        if line.startswith('## '):
+            sections.append((line, []))
+        elif sections:
+            if line.strip():
+                sections[-1][1].append(line)
+        else:
+            header.append(line)
+    return '\n'.join(header).strip(), sections
+
+def parse_entries(llms_txt: str) -> dict[str, Entry]:
+    entries = {}
+    for heading, lines in split_header(llms_txt)[1]:
+        for line in lines:
+            url = _entry_url(line)
+            if url and url not in entries:
+                entries[url] = Entry(heading, line)
+    return entries
+
+def plan_delta(previous_formatted: str, previous_enhanced: str, formatted: str) -> DeltaPlan:
+    old_entries = parse_entries(previous_formatted)
+    enhanced_entries = parse_entries(previous_enhanced)
+    new_entries = parse_entries(formatted)
+
+    plan = DeltaPlan(header_changed=split_header(previous_formatted)[0] != split_header(formatted)[0])
+    # Where the model moved each formatted section's unchanged entries last time
+    placement: dict[str, Counter] = {}
+    changed = []
+    for url, entry in new_entries.items():
+        old = old_entries.get(url)
+        if old is not None and old.line == entry.line and url in enhanced_entries:
+            plan.reused[url] = enhanced_entries[url].line
+            placement.setdefault(entry.heading, Counter())[enhanced_entries[url].heading] += 1
+        else:
+            changed.append((url, entry))
+
+    for url, entry in changed:
+        if url in enhanced_entries:
+            target = enhanced_entries[url].heading
+        elif entry.heading in placement:
+            target = placement[entry.heading].most_common(1)[0][0]
+        else:
+            target = entry.heading
+        plan.groups.setdefault(target, []).append(entry.line)
+
+    return plan
+
+def apply_delta(previous_enhanced: str, plan: DeltaPlan, rewritten: dict[str, str], header: str) -> str | None:
+    # rewritten should hold the final line for every url in plan.groups; None if one is missing
+    _, sections = split_header(previous_enhanced)
+    placed = set()
+    blocks = []
+    for heading, lines in sections:
+        body = []
+        for line in lines:
+            url = _entry_url(line)
+            if url in plan.reused:
+                body.append(plan.reused[url])
+            elif url in rewritten:
+                body.append(rewritten[url])
+            else:
+                continue
+            placed.add(url)
+        blocks.append((heading, body))
+
+    known = {heading for heading, _ in blocks}
+    for heading, lines in plan.groups.items():
+        if heading not in known:
+            # New sections go before Optional, which must stay last
+            index = next((i for i, (h, _) in enumerate(blocks) if h == '## Optional'), len(blocks))
+            blocks.insert(index, (heading, []))
+            known.add(heading)
+        body = next(body for h, body in blocks if h == heading)
+        for line in lines:
+            url = _entry_url(line)
+            if url not in placed:
+                if url not in rewritten:
+                    return None
+                body.append(rewritten[url])
+                placed.add(url)
+
+    parts = [header] + ['\n'.join([heading, ''] + body) for heading, body in blocks if body]
+    return '\n\n'.join(parts) + '\n'
@@ -1,17 +1,27 @@
+import json
 import time
 import asyncio
 import inspect
-from typing import Callable
+from typing import Awaitable, Callable
 from .models import ProcessingResult
-from .client import OpenRouterClient, RateLimitError
-from .prompts import build_messages
-from .validator import extract_urls, validate_llms_txt, truncate_descriptions
+from .client import OpenRouterClient, RateLimitError, StreamAbortedError, get_openrouter_pool
+from .prompts import build_messages, build_section_messages, build_header_messages
+from .cache import ResultCache, get_result_cache, result_cache_key, state_cache_key
+from .delta import plan_delta, apply_delta, split_header, link_lines
+from .sharding import Shard, split_document, merge_shards
+from .validator import IncrementalValidator, extract_urls, validate_llms_txt, truncate_descriptions
 from config import settings
 
 class LLMProcessor:
-    def __init__(self, log_fn: Callable[[str], None] | None = None):
+    def __init__(self, log_fn: Callable[[str], None] | None = None, cache: ResultCache | None = None,
+                 partial_fn: Callable[[str], Awaitable[None]] | None = None):
         self._log_fn = log_fn or (lambda x: None)
         self._is_async_log = inspect.iscoroutinefunction(log_fn) if log_fn else False
+        # Receives validated lines of a streamed single-call completion as they arrive
+        self._partial_fn = partial_fn
+        self.cache = cache or get_result_cache(settings.llm_cache_dir, settings.llm_cache_max_bytes, settings.llm_cache_ttl_seconds)
+        self._cache_hits = 0
+        self._cache_misses = 0
 
     async def log(self, message: str):
         if self._is_async_log:
@@ -19,8 +29,53 @@ class LLMProcessor:
         else:
             self._log_fn(message)
 
-    async def process(self, llms_txt: str) -> ProcessingResult:
+    def _cache_key(self, messages: list[dict]) -> str:
+        return result_cache_key(messages, settings.openrouter_model, settings.llm_temperature)
+
+    def _cache_get(self, key: str) -> str | None:
+        if self.cache is None:
+            return None
+        output = self.cache.get(key)
+        if output is None:
+            self._cache_misses += 1
+        else:
+            self._cache_hits += 1
+        return output
+
+    def _cache_put(self, key: str, output: str):
+        if self.cache is not None:
+            self.cache.put(key, output)
+
+    def _load_state(self, site_key: str | None) -> dict | None:
+        if not site_key or self.cache is None or not settings.llm_delta_enabled:
+            return None
+        state = self.cache.get(state_cache_key(site_key, settings.openrouter_model))
+        return json.loads(state) if state else None
+
+    def _save_state(self, site_key: str, formatted: str, enhanced: str):
+        if self.cache is not None:
+            state = json.dumps({'formatted': formatted, 'enhanced': enhanced})
+            self.cache.put(state_cache_key(site_key, settings.openrouter_model), state)
+
+    async def _complete(self, client: OpenRouterClient, messages: list[dict], urls: set[str],
+                        require_header: bool = True, forward_partial: bool = False) -> str:
+        if not settings.llm_streaming_enabled:
+            return await client.complete(messages)
+
+        validator = IncrementalValidator(urls, require_header)
+
+        async def on_line(line: str) -> str | None:
+            error = validator.feed(line)
+            if error is None and forward_partial and self._partial_fn and not line.startswith('```'):
+                await self._partial_fn(line)
+            return error
+
+        return await client.complete_streaming(messages, on_line)
+
+    async def process(self, llms_txt: str, site_key: str | None = None) -> ProcessingResult:
         start_time = time.time()
+        self._cache_hits = 0
+        self._cache_misses = 0
 
         if not settings.openrouter_api_key:
             return ProcessingResult.failure_result(llms_txt, "OpenRouter API key not configured")
@@ -34,13 +89,48 @@ class LLMProcessor:
             timeout=settings.llm_timeout_seconds,
             max_retries=settings.llm_max_retries,
             temperature=settings.llm_temperature,
-            log_fn=self._log_fn if not self._is_async_log else (lambda x: None)
+            log_fn=self._log_fn if not self._is_async_log else (lambda x: None),
+            pool=get_openrouter_pool(settings.llm_requests_per_minute, settings.llm_rate_burst, settings.llm_max_in_flight)
         )
 
         try:
-            messages = build_messages(llms_txt)
+            result = None
+            previous = self._load_state(site_key)
+            if previous is not None:
+                result = await self._process_delta(client, llms_txt, original_urls, previous, start_time)
+            if result is None and settings.llm_shard_min_links > 0 and len(original_urls) >= settings.llm_shard_min_links:
+                result = await self._process_sharded(client, llms_txt, original_urls, start_time)
+            if result is None:
+                result = await self._process_single(client, llms_txt, original_urls, start_time)
+
+            if result.success and site_key:
+                self._save_state(site_key, llms_txt, result.output)
+            return result
+
+        except RateLimitError as e:
+            return ProcessingResult.failure_result(llms_txt, f"Rate limit exceeded: {str(e)}")
+
+        except Exception as e:
+            error_msg = f"LLM processing error: {str(e)}"
+            await self.log(error_msg)
+            return ProcessingResult.failure_result(llms_txt, error_msg)
+
+    async def _process_single(self, client: OpenRouterClient, llms_txt: str, original_urls: set[str], start_time: float) -> ProcessingResult:
+        messages = build_messages(llms_txt)
+        cache_key = self._cache_key(messages)
+        enhanced_content = self._cache_get(cache_key)
+
+        if enhanced_content is not None:
+            await self.log("Using cached enhancement")
+        else:
             await self.log(f"Calling OpenRouter API with model {settings.openrouter_model}...")
-            enhanced_content = await client.complete(messages)
+            try:
+                enhanced_content = await self._complete(client, messages, original_urls, forward_partial=True)
+            except StreamAbortedError as e:
+                error_msg = f"Validation failed: {e}"
+                await self.log("LLM output invalid while streaming, cancelled and using original")
+                await self.log(error_msg)
+                return ProcessingResult.failure_result(llms_txt, error_msg)
 
             is_valid, errors = validate_llms_txt(enhanced_content, original_urls)
 
@@ -51,23 +141,166 @@ class LLMProcessor:
                 return ProcessingResult.failure_result(llms_txt, error_msg)
 
             enhanced_content = truncate_descriptions(enhanced_content)
+            self._cache_put(cache_key, enhanced_content)
 
-            elapsed_time = time.time() - start_time
-            stats = {
-                "model": settings.openrouter_model,
-                "time_seconds": round(elapsed_time, 2),
-                "original_length": len(llms_txt),
-                "enhanced_length": len(enhanced_content),
-                "url_count": len(original_urls)
-            }
+        elapsed_time = time.time() - start_time
+        stats = {
+            "model": settings.openrouter_model,
+            "time_seconds": round(elapsed_time, 2),
+            "original_length": len(llms_txt),
+            "enhanced_length": len(enhanced_content),
+            "url_count": len(original_urls),
+            "cache_hits": self._cache_hits,
+            "cache_misses": self._cache_misses,
+            "limiter": client.pool.stats()
+        }
 
-            await self.log(f"Enhancement successful in {stats['time_seconds']}s")
-            return ProcessingResult.success_result(enhanced_content, stats)
+        await self.log(f"Enhancement successful in {stats['time_seconds']}s")
+        return ProcessingResult.success_result(enhanced_content, stats)
 
-        except RateLimitError as e:
-            return ProcessingResult.failure_result(llms_txt, f"Rate limit exceeded: {str(e)}")
+    async def _enhance_shard(self, client: OpenRouterClient, shard: Shard, site_title: str, section_names: list[str]) -> str | None:
+        if shard.heading is None:
+            messages = build_header_messages(shard.text, section_names)
+        else:
+            messages = build_section_messages(site_title, shard.text)
+        cache_key = self._cache_key(messages)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
 
-        except Exception as e:
-            error_msg = f"LLM processing error: {str(e)}"
+        try:
+            output = (await self._complete(client, messages, shard.urls, require_header=shard.heading is None)).strip()
+        except StreamAbortedError as e:
+            await self.log(f"Shard {shard.heading or 'header'} cancelled while streaming, keeping original: {e}")
+            return None
+
+        is_valid, errors = validate_llms_txt(output, shard.urls, require_header=shard.heading is None)
+        if not is_valid:
+            await self.log(f"Shard {shard.heading or 'header'} failed validation, keeping original: {errors[0]}")
+            return None
+
+        # The Optional section has special meaning in the spec; never rename it
+        if shard.heading == '## Optional':
+            lines = output.split('\n')
+            lines[0] = shard.heading
+            output = '\n'.join(lines)
+        self._cache_put(cache_key, output)
+        return output
+
+    async def _process_sharded(self, client: OpenRouterClient, llms_txt: str, original_urls: set[str], start_time: float) -> ProcessingResult:
+        shards = split_document(llms_txt, settings.llm_shard_max_links)
+        site_title = next((line[2:] for line in llms_txt.split('\n') if line.startswith('# ')), '')
+        section_names = list(dict.fromkeys(shard.heading[3:] for shard in shards if shard.heading))
+
+        await self.log(f"Enhancing {len(shards)} shards with model {settings.openrouter_model}...")
+        # All shards share one client, so its limiter bounds the concurrency
+        results = await asyncio.gather(
+            *(self._enhance_shard(client, shard, site_title, section_names) for shard in shards),
+            return_exceptions=True
+        )
+
+        outputs = []
+        shards_failed = 0
+        for shard, result in zip(shards, results):
+            if isinstance(result, BaseException):
+                await self.log(f"Shard {shard.heading or 'header'} failed, keeping original: {result}")
+            if isinstance(result, str):
+                outputs.append(result)
+            else:
+                outputs.append(shard.text)
+                shards_failed += 1
+
+        if shards_failed == len(shards):
+            return ProcessingResult.failure_result(llms_txt, "All shards failed enhancement")
+
+        enhanced_content = truncate_descriptions(merge_shards(shards, outputs))
+
+        is_valid, errors = validate_llms_txt(enhanced_content, original_urls)
+        if not is_valid:
+            error_msg = f"Validation failed: {'; '.join(errors[:3])}"
+            await self.log("Merged output validation failed, using original")
             await self.log(error_msg)
             return ProcessingResult.failure_result(llms_txt, error_msg)
+
+        elapsed_time = time.time() - start_time
+        stats = {
+            "model": settings.openrouter_model,
+            "time_seconds": round(elapsed_time, 2),
+            "original_length": len(llms_txt),
+            "enhanced_length": len(enhanced_content),
+            "url_count": len(original_urls),
+            "shards": len(shards),
+            "shards_failed": shards_failed,
+            "cache_hits": self._cache_hits,
+            "cache_misses": self._cache_misses,
+            "limiter": client.pool.stats()
+        }
+
+        await self.log(f"Enhancement successful in {stats['time_seconds']}s ({shards_failed}/{len(shards)} shards kept original)")
+        return ProcessingResult.success_result(enhanced_content, stats)
+
+    async def _process_delta(self, client: OpenRouterClient, llms_txt: str, original_urls: set[str], previous: dict, start_time: float) -> ProcessingResult | None:
+        # Returns None when the previous output cannot be reused, so the caller does a full pass
+        plan = plan_delta(previous['formatted'], previous['enhanced'], llms_txt)
+        if not plan.reused:
+            return None
+
+        header = split_header(previous['enhanced'])[0]
+        site_title = next((line[2:] for line in header.split('\n') if line.startswith('# ')), '')
+        shards = [Shard(heading=heading, text='\n'.join([heading, ''] + lines), urls=extract_urls('\n'.join(lines)))
+                  for heading, lines in plan.groups.items()]
+        if plan.header_changed:
+            new_header = split_header(llms_txt)[0]
+            shards.insert(0, Shard(heading=None, text=new_header, urls=set()))
+        section_names = list(dict.fromkeys(line[3:] for line in previous['enhanced'].split('\n') if line.startswith('## ')))
+
+        entries_sent = sum(len(lines) for lines in plan.groups.values())
+        await self.log(f"Delta enhancement: {entries_sent} changed entries, {len(plan.reused)} reused")
+        results = await asyncio.gather(
+            *(self._enhance_shard(client, shard, site_title, section_names) for shard in shards),
+            return_exceptions=True
+        )
+
+        rewritten: dict[str, str] = {}
+        shards_failed = 0
+        for shard, result in zip(shards, results):
+            if isinstance(result, BaseException):
+                await self.log(f"Shard {shard.heading or 'header'} failed, keeping original: {result}")
+            if not isinstance(result, str):
+                result = shard.text
+                shards_failed += 1
+            if shard.heading is None:
+                header = result
+            else:
+                rewritten.update((url, line) for url, line in link_lines(result).items() if url in shard.urls)
+
+        merged = apply_delta(previous['enhanced'], plan, rewritten, header)
+        if merged is None:
+            await self.log("Delta output is missing rewritten entries, falling back to a full pass")
+            return None
+        enhanced_content = truncate_descriptions(merged)
+
+        is_valid, errors = validate_llms_txt(enhanced_content, original_urls)
+        if not is_valid:
+            await self.log(f"Delta output validation failed, falling back to a full pass: {errors[0]}")
+            return None
+
+        elapsed_time = time.time() - start_time
+        stats = {
+            "model": settings.openrouter_model,
+            "time_seconds": round(elapsed_time, 2),
+            "original_length": len(llms_txt),
+            "enhanced_length": len(enhanced_content),
+            "url_count": len(original_urls),
+            "mode": "delta",
+            "entries_sent": entries_sent,
+            "entries_reused": len(plan.reused),
+            "shards": len(shards),
+            "shards_failed": shards_failed,
+            "cache_hits": self._cache_hits,
+            "cache_misses": self._cache_misses,
+            "limiter": client.pool.stats()
+        }
+
+        await self.log(f"Delta enhancement successful in {stats['time_seconds']}s")
+        return ProcessingResult.success_result(enhanced_content, stats)
@@ -1,3 +1,6 @@
+# Bump whenever prompts or output post-processing change so cached results are not reused
+PROMPT_VERSION = 1
+
 SYSTEM_PROMPT = """You are an expert at organizing and improving llms.txt files. Your job is to take a basic llms.txt file and improve it while STRICTLY following these rules:
 
 CRITICAL RULES - NEVER VIOLATE:
@@ -193,3 +196,56 @@ def build_messages(llms_txt: str) -> list[dict]:
         {"role": "system", "content": SYSTEM_PROMPT},
         {"role": "user", "content": build_user_prompt(llms_txt)}
     ]
+
+SECTION_SYSTEM_PROMPT = """You are an expert at improving one section of an llms.txt file. You receive a single `## ` section and improve it while STRICTLY following these rules:
+
+CRITICAL RULES - NEVER VIOLATE:
+1. NEVER modify, add, or remove URLs. Every URL in the input MUST appear exactly once in the output.
+2. NEVER hallucinate content, pages, or links that don't exist in the input.
+3. Output exactly one section: a single `## ` heading followed by its links. No H1, no blockquote, no other headings.
+4. If the heading is `## Optional`, keep it unchanged.
+
+FORMAT: links use `- [Link Text](url): Description under 150 chars [TAG: Optional]`
+
+IMPROVE: the section name (clear, descriptive, not just a URL path), the descriptions (clear and informative) and the ordering (most important first).
+
+Output only the improved section. Do not add explanations or comments."""
+
+HEADER_SYSTEM_PROMPT = """You are an expert at writing llms.txt headers. You receive the H1 title and blockquote summary of an llms.txt file, plus the names of its sections, and improve them.
+
+RULES:
+1. Output exactly two lines separated by a blank line: `# Title` and `> Summary`.
+2. The summary must be under 200 characters and describe the site's purpose.
+3. Do not add links, sections or any other content.
+
+Output only the header. Do not add explanations or comments."""
+
+def build_section_messages(site_title: str, section: str) -> list[dict]:
+    return [
+        {"role": "system", "content": SECTION_SYSTEM_PROMPT},
+        {"role": "user", "content": f"""Site: {site_title}
+
+INPUT:
+```markdown
+{section}
+```
+
+OUTPUT:
+```markdown"""}
+    ]
+
+def build_header_messages(header: str, section_names: list[str]) -> list[dict]:
+    sections = '\n'.join(f"- {name}" for name in section_names)
+    return [
+        {"role": "system", "content": HEADER_SYSTEM_PROMPT},
+        {"role": "user", "content": f"""Sections:
+{sections}
+
+INPUT:
+```markdown
+{header}
+```
+
+OUTPUT:
+```markdown"""}
+    ]
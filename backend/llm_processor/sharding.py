@@ -0,0 +1,49 @@
+from dataclasses import dataclass
+from .validator import extract_urls
+
+@dataclass
+class Shard:
+    # heading is None for the document header (H1 + blockquote)
+    heading: str | None
+    text: str
+    urls: set[str]
+
+def split_document(llms_txt: str, max_links: int = 40) -> list[Shard]:
+    # Header first, then one shard per "## " section; sections with more than
+    # max_links entries are cut into parts that each repeat the heading.
+    groups: list[list[str]] = [[]]
+    for line in llms_txt.split('\n'):
+        if line.startswith('## '):
+            groups.append([])
+        groups[-1].append(line)
+
+    shards = []
+    header = '\n'.join(groups[0]).strip()
+    if header:
+        shards.append(Shard(heading=None, text=header, urls=extract_urls(header)))
+
+    for group in groups[1:]:
+        heading, body = group[0], [line for line in group[1:] if line.strip()]
+        links = [line for line in body if line.startswith('- [')]
+        parts = [body]
+        if max_links > 0 and len(links) > max_links:
+            parts = [body[i:i + max_links] for i in range(0, len(body), max_links)]
+        for part in parts:
+            text = '\n'.join([heading, ''] + part)
+            shards.append(Shard(heading=heading, text=text, urls=extract_urls(text)))
+
+    return shards
+
+def merge_shards(shards: list[Shard], outputs: list[str]) -> str:
+    # Parts of one section are re-joined under the heading of the first part
+    blocks: list[list[str]] = []
+    previous_heading = None
+    for shard, output in zip(shards, outputs):
+        lines = output.strip().split('\n')
+        if shard.heading is not None and shard.heading == previous_heading:
+            blocks[-1].extend(line for line in lines[1:] if line.strip())
+        else:
+            blocks.append(lines)
+        previous_heading = shard.heading
+
+    return '\n\n'.join('\n'.join(block).strip() for block in blocks) + '\n'
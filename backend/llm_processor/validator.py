@@ -6,24 +6,35 @@ def extract_urls(content: str) -> Set[str]:
     matches = re.findall(pattern, content)
     return {url for text, url in matches}
 
-def validate_llms_txt(content: str, original_urls: Set[str]) -> Tuple[bool, List[str]]:
+def validate_llms_txt(content: str, original_urls: Set[str], require_header: bool = True) -> Tuple[bool, List[str]]:
+    # require_header=False validates a single "## " section on its own, which
+    # must not bring its own H1 or blockquote
     errors = []
     lines = content.split('\n')
 
     h1_lines = [line for line in lines if line.startswith('# ') and not line.startswith('## ')]
-    if len(h1_lines) == 0:
-        errors.append("Missing H1 title (must start with '# ')")
-    elif len(h1_lines) > 1:
-        errors.append(f"Multiple H1 titles found ({len(h1_lines)}), must have exactly one")
-
     blockquote_lines = [line for line in lines if line.startswith('> ')]
-    if len(blockquote_lines) == 0:
-        errors.append("Missing blockquote summary (must start with '> ')")
+
+    if not require_header:
+        if not lines or not lines[0].startswith('## '):
+            errors.append("Section must start with an H2 heading ('## ')")
+        if h1_lines:
+            errors.append(f"Unexpected H1 title in section: {h1_lines[0][:60]}")
+        if blockquote_lines:
+            errors.append(f"Unexpected blockquote in section: {blockquote_lines[0][:60]}")
     else:
-        for bq in blockquote_lines:
-            bq_text = bq[2:].strip()
-            if len(bq_text) > 200:
-                errors.append(f"Blockquote too long ({len(bq_text)} chars, max 200): {bq_text[:50]}...")
+        if len(h1_lines) == 0:
+            errors.append("Missing H1 title (must start with '# ')")
+        elif len(h1_lines) > 1:
+            errors.append(f"Multiple H1 titles found ({len(h1_lines)}), must have exactly one")
+
+        if len(blockquote_lines) == 0:
+            errors.append("Missing blockquote summary (must start with '> ')")
+        else:
+            for bq in blockquote_lines:
+                bq_text = bq[2:].strip()
+                if len(bq_text) > 200:
+                    errors.append(f"Blockquote too long ({len(bq_text)} chars, max 200): {bq_text[:50]}...")
 
     invalid_headers = [line for line in lines if line.startswith('### ') or line.startswith('#### ')]
     if invalid_headers:
@@ -46,6 +57,48 @@ def validate_llms_txt(content: str, original_urls: Set[str]) -> Tuple[bool, List
 
     return (len(errors) == 0, errors)
 
+class IncrementalValidator:
+    # Line-level checks that can fail while a completion is still streaming;
+    # validate_llms_txt still runs on the complete output
+    def __init__(self, original_urls: Set[str], require_header: bool = True):
+        self.original_urls = original_urls
+        self.require_header = require_header
+        self._h1_count = 0
+        self._line_number = 0
+        self._started = False
+
+    def feed(self, line: str) -> str | None:
+        self._line_number += 1
+        if not line.strip() or line.startswith('```'):
+            return None
+
+        if not self._started:
+            self._started = True
+            if not self.require_header and not line.startswith('## '):
+                return "Section must start with an H2 heading ('## ')"
+
+        if line.startswith('### ') or line.startswith('#### '):
+            return f"Invalid header level found (use H2 only): {line[:60]}"
+
+        if line.startswith('# '):
+            if not self.require_header:
+                return f"Unexpected H1 title in section: {line[:60]}"
+            self._h1_count += 1
+            if self._h1_count > 1:
+                return "Multiple H1 titles found, must have exactly one"
+
+        if line.startswith('> ') and not self.require_header:
+            return f"Unexpected blockquote in section: {line[:60]}"
+
+        if line.startswith('- [') and not re.match(r'^- \[.+\]\(.+\):[ ].+$', line):
+            return f"Line {self._line_number}: Invalid link format (should be '- [Text](url): Description'): {line[:60]}"
+
+        added_urls = extract_urls(line) - self.original_urls
+        if added_urls:
+            return f"New URLs added (hallucination): {list(added_urls)[:3]}"
+
+        return None
+
 def truncate_descriptions(content: str, max_length: int = 150) -> str:
     lines = content.split('\n')
     result_lines = []
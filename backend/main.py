@@ -1,18 +1,30 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Header, HTTPException, Request, Body, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 import json
 import hashlib
-import httpx
-from crawler import LLMCrawler, PageInfo
+from crawler import LLMCrawler, FullTextStore, get_parse_executor, shutdown_parse_executor, get_page_cache
 from storage import save_llms_txt
 from config import settings
 from database import save_site_metadata, get_supabase_client
+from sitemap_utils import has_sitemap_changed
 from recrawl import recrawl_due_sites
-from formatter import format_llms_txt, get_md_url_map
+from pipeline import LlmsTxtPipeline
+from formatter import llms_txt_chunks, iter_llms_full_txt, get_section_cache
+from md_cache import get_md_probe_cache
+from incremental import pages_to_snapshot
 from jwt_auth import generate_token, validate_token
+from llm_processor.client import close_openrouter_pool
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    get_parse_executor(settings.parse_workers)
+    yield
+    shutdown_parse_executor()
+    await close_openrouter_pool()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -102,6 +114,7 @@ async def websocket_crawl(websocket: WebSocket):
 
     await websocket.accept()
 
+    full_text = None
     try:
         data = await websocket.receive_text()
         payload = json.loads(data)
@@ -110,37 +123,63 @@ async def websocket_crawl(websocket: WebSocket):
         max_pages = payload.get('maxPages', 50)
         desc_length = payload.get('descLength', 500)
         use_brightdata = payload.get('useBrightdata', settings.brightdata_enabled)
+        llms_full = payload.get('llmsFull', settings.llms_full_enabled)
+        stream_result = payload.get('streamResult', False)
 
         async def log(message: str):
             await websocket.send_json({"type": "log", "content": message})
 
-        crawler = LLMCrawler(
+        full_text = FullTextStore(settings.llms_full_memory_bytes) if llms_full else None
+        pipeline = LlmsTxtPipeline(
             url,
-            max_pages,
-            desc_length,
-            log,
-            brightdata_api_key=settings.brightdata_api_key,
-            brightdata_enabled=use_brightdata,
-            brightdata_zone=settings.brightdata_zone,
-            brightdata_password=settings.brightdata_password
+            cache=get_md_probe_cache(settings.md_probe_cache_path, settings.md_probe_ttl_seconds),
+            per_host_limit=settings.md_probe_per_host_limit,
+            miss_threshold=settings.md_probe_miss_threshold,
+            section_cache=get_section_cache()
         )
-        pages = await crawler.run()
+        async with pipeline:
+            crawler = LLMCrawler(
+                url,
+                max_pages,
+                desc_length,
+                log,
+                brightdata_api_key=settings.brightdata_api_key,
+                brightdata_enabled=use_brightdata,
+                brightdata_zone=settings.brightdata_zone,
+                brightdata_password=settings.brightdata_password,
+                brightdata_max_tabs=settings.brightdata_max_tabs,
+                brightdata_ready_timeout_ms=settings.brightdata_ready_timeout_ms,
+                brightdata_block_resources=settings.brightdata_block_resources,
+                escalation_threshold=settings.browser_escalation_threshold,
+                page_cache=get_page_cache(settings.page_cache_dir, settings.page_cache_max_bytes),
+                concurrency=settings.crawl_concurrency,
+                per_host_limit=settings.crawl_per_host_limit,
+                executor=get_parse_executor(settings.parse_workers),
+                on_page=pipeline.add,
+                full_text=full_text
+            )
+            pages = await crawler.run()
+
+            # Probes started as pages arrived; this only waits on the stragglers
+            await log("Checking for .md versions of pages...")
+            llms_txt, md_url_map = await pipeline.finish(pages)
+        section_hashes = llms_txt.section_hashes()
 
-        await log("Checking for .md versions of pages...")
-        md_url_map = await get_md_url_map(pages)
         md_count = sum(1 for orig, md in md_url_map.items() if orig != md)
         if md_count > 0:
             await log(f"Found {md_count} pages with .md versions")
 
-        llms_txt = format_llms_txt(url, pages, md_url_map)
-
         llm_enhance = payload.get('llmEnhance', False)
         if llm_enhance and settings.llm_enhancement_enabled:
             try:
                 await log("Enhancing with LLM...")
                 from llm_processor import LLMProcessor
-                processor = LLMProcessor(log)
-                result = await processor.process(llms_txt)
+
+                async def partial(line: str):
+                    await websocket.send_json({"type": "partial", "content": line})
+
+                processor = LLMProcessor(log, partial_fn=partial if payload.get('llmPartial', False) else None)
+                result = await processor.process(llms_txt.text(), site_key=url)
 
                 if result.success:
                     llms_txt = result.output
@@ -150,9 +189,32 @@ async def websocket_crawl(websocket: WebSocket):
             except Exception as e:
                 await log(f"LLM enhancement error: {e}")
 
-        await websocket.send_json({"type": "result", "content": llms_txt})
-
-        hosted_url = await save_llms_txt(url, llms_txt, log)
+        # Hashed section by section on the way out; clients that opt in also get the sections
+        # as result_chunk messages. Everyone gets one final result. The upload re-renders the chunks.
+        digest = hashlib.sha256()
+        result_parts = []
+        for chunk in llms_txt_chunks(llms_txt):
+            digest.update(chunk.encode())
+            if stream_result:
+                await websocket.send_json({"type": "result_chunk", "content": chunk})
+            result_parts.append(chunk)
+        await websocket.send_json({"type": "result", "content": "".join(result_parts)})
+
+        full_chunks = None
+        if full_text is not None:
+            # Same hashing as llms_txt_sha256, so recrawls compare like with like
+            def iter_full():
+                return iter_llms_full_txt(url, pages, full_text.get)
+
+            full_chunks = iter_full
+            digest.update(b'\0')
+            for chunk in full_chunks():
+                digest.update(chunk.encode())
+            await log(f"llms-full.txt: text of {len(full_text)} pages")
+        llms_hash = digest.hexdigest()
+
+        hosted_url = await save_llms_txt(url, llms_txt_chunks(llms_txt), log,
+                                         full_content=full_chunks() if full_chunks else None)
         if hosted_url:
             await websocket.send_json({"type": "url", "content": hosted_url})
 
@@ -160,23 +222,11 @@ async def websocket_crawl(websocket: WebSocket):
             recrawl_interval = payload.get('recrawlIntervalMinutes', 10080)
 
             if enable_auto_update:
-                llms_hash = hashlib.sha256(llms_txt.encode()).hexdigest()
-
-                # Detect sentinel URL
-                sentinel_url = None
-                if hasattr(crawler, 'discovered_sitemap_url'):
-                    sentinel_url = crawler.discovered_sitemap_url
-                else:
-                    # Try to find sitemap
-                    async with httpx.AsyncClient(timeout=5.0) as client:
-                        for path in ['/sitemap.xml', '/sitemap_index.xml']:
-                            try:
-                                resp = await client.head(f"{url}{path}")
-                                if resp.status_code == 200:
-                                    sentinel_url = f"{url}{path}"
-                                    break
-                            except:
-                                continue
+                # The crawl stopped reading the sitemap at its page budget; scan it all once for lastmod
+                sitemap_newest_lastmod = None
+                if crawler.discovered_sitemap_url:
+                    check = await has_sitemap_changed(crawler.discovered_sitemap_url, None)
+                    sitemap_newest_lastmod = check.newest_lastmod
 
                 await save_site_metadata(
                     base_url=url,
@@ -185,7 +235,12 @@ async def websocket_crawl(websocket: WebSocket):
                     desc_length=desc_length,
                     latest_llms_hash=llms_hash,
                     latest_llms_url=hosted_url,
-                    sentinel_url=sentinel_url
+                    sentinel_url=crawler.discovered_sitemap_url,
+                    fetch_profile=crawler.fetch_profile,
+                    page_snapshot=pages_to_snapshot(pages, crawler.sitemap.pages if crawler.sitemap else None),
+                    sitemap_newest_lastmod=sitemap_newest_lastmod,
+                    section_hashes=section_hashes,
+                    llms_full=llms_full
                 )
                 await log("Auto-update enabled for this site")
 
@@ -194,4 +249,6 @@ async def websocket_crawl(websocket: WebSocket):
     except Exception as e:
         await websocket.send_json({"type": "error", "content": str(e)})
     finally:
+        if full_text is not None:
+            full_text.close()
         await websocket.close()
\ No newline at end of file
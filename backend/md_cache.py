@@ -0,0 +1,59 @@
+import json
+import os
+import time
+
+# Sentinel for "no fresh entry"; a cached miss is stored as None
+MISSING = object()
+
+class MdProbeCache:
+    def __init__(self, path: str, ttl_seconds: float = 604800.0):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        # url -> (md url or None, checked at)
+        self._entries: dict[str, tuple[str | None, float]] = {}
+        self._dirty = False
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            self._entries = {url: (entry[0], entry[1]) for url, entry in data.items()}
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error reading md probe cache {path}: {e}")
+
+    def get(self, url: str):
+        entry = self._entries.get(url)
+        if entry is None or time.time() - entry[1] > self.ttl_seconds:
+            return MISSING
+        return entry[0]
+
+    def put(self, url: str, md_url: str | None):
+        self._entries[url] = (md_url, time.time())
+        self._dirty = True
+
+    def save(self):
+        if not self._dirty:
+            return
+        now = time.time()
+        fresh = {url: list(entry) for url, entry in self._entries.items() if now - entry[1] <= self.ttl_seconds}
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(fresh, f)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+        except Exception as e:
+            print(f"Error writing md probe cache {self.path}: {e}")
+
+_md_probe_cache: MdProbeCache | None = None
+
+def get_md_probe_cache(path: str | None, ttl_seconds: float) -> MdProbeCache | None:
+    global _md_probe_cache
+    if not path:
+        return None
+    if _md_probe_cache is None:
+        _md_probe_cache = MdProbeCache(path, ttl_seconds)
+    return _md_probe_cache
@@ -0,0 +1,6 @@
+-- Remember which fetch strategy works for each host of a site
+-- e.g. {"docs.example.com": "browser"} skips httpx for JS-rendered hosts on recrawl
+ALTER TABLE crawl_sites
+  ADD COLUMN IF NOT EXISTS fetch_profile JSONB;
+
+COMMENT ON COLUMN crawl_sites.fetch_profile IS 'Per-host fetch strategy learned during the last crawl (httpx or browser)';
@@ -0,0 +1,5 @@
+-- Store the pages extracted by the last crawl so recrawls can refetch only what changed
+ALTER TABLE crawl_sites
+  ADD COLUMN IF NOT EXISTS page_snapshot JSONB;
+
+COMMENT ON COLUMN crawl_sites.page_snapshot IS 'PageInfo entries (url, title, description, snippet) from the last crawl, homepage first';
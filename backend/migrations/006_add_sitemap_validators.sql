@@ -0,0 +1,7 @@
+-- Conditional-request validators for the sentinel sitemap and its children
+-- e.g. {"https://example.com/sitemap.xml": {"etag": "\"abc\"", "last_modified": "Mon, 01 Jan 2024 00:00:00 GMT"}}
+-- Only saved once a recrawl has finished, so an interrupted crawl is retried
+ALTER TABLE crawl_sites
+  ADD COLUMN IF NOT EXISTS sitemap_validators JSONB;
+
+COMMENT ON COLUMN crawl_sites.sitemap_validators IS 'ETag / Last-Modified per sitemap URL used by the sentinel check';
@@ -0,0 +1,7 @@
+-- Per-section digests of the last rendered llms.txt, keyed by section name ("#" is the header)
+-- e.g. {"#": "9f86d0...", "docs": "2c26b4...", "blog": "fcde2b..."}
+-- Lets a recrawl see which sections changed without diffing the documents
+ALTER TABLE crawl_sites
+  ADD COLUMN IF NOT EXISTS section_hashes JSONB;
+
+COMMENT ON COLUMN crawl_sites.section_hashes IS 'SHA-256 of each rendered llms.txt section, used to detect changed sections';
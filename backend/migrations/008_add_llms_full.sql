@@ -0,0 +1,6 @@
+-- Whether the site opted in to llms-full.txt, so recrawls keep producing it
+-- NULL (rows saved before this column existed) falls back to LLMS_FULL_ENABLED
+ALTER TABLE crawl_sites
+  ADD COLUMN IF NOT EXISTS llms_full BOOLEAN;
+
+COMMENT ON COLUMN crawl_sites.llms_full IS 'Build llms-full.txt on recrawl; NULL uses the server default';
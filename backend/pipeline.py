@@ -0,0 +1,66 @@
+import asyncio
+import httpx
+from crawler import PageInfo
+from formatter import (MdProber, LlmsTxtDocument, SectionRenderCache, build_llms_txt, clean_url, page_section,
+                       format_page_link)
+from md_cache import MdProbeCache
+
+class LlmsTxtPipeline:
+    # Takes pages as the crawler extracts them. Each page's .md probe, tagging
+    # and section bucketing run while the remaining fetches continue, so
+    # finish() only waits on whatever probes are still in flight.
+    def __init__(self, base_url: str, cache: MdProbeCache | None = None,
+                 per_host_limit: int = 4, miss_threshold: int = 5,
+                 section_cache: SectionRenderCache | None = None):
+        self.base_url = base_url
+        self.cache = cache
+        self.section_cache = section_cache
+        self.per_host_limit = per_host_limit
+        self.miss_threshold = miss_threshold
+        self._client: httpx.AsyncClient | None = None
+        self._prober: MdProber | None = None
+        # clean url -> (page, output url, formatted link)
+        self._entries: dict[str, asyncio.Task] = {}
+
+    async def __aenter__(self) -> "LlmsTxtPipeline":
+        self._client = httpx.AsyncClient(timeout=5.0)
+        await self._client.__aenter__()
+        self._prober = MdProber(self._client, self.cache, self.per_host_limit, self.miss_threshold)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        for task in self._entries.values():
+            task.cancel()
+        await asyncio.gather(*self._entries.values(), return_exceptions=True)
+        await self._client.__aexit__(*exc_info)
+
+    def add(self, page: PageInfo):
+        clean = clean_url(page.url)
+        if clean not in self._entries:
+            self._entries[clean] = asyncio.create_task(self._prepare(page, clean))
+
+    async def _prepare(self, page: PageInfo, clean: str) -> tuple[PageInfo, str, str]:
+        output_url = await self._prober.probe(clean)
+        return page, output_url, format_page_link(page, page_section(self.base_url, clean), output_url)
+
+    async def finish(self, pages: list[PageInfo]) -> tuple[LlmsTxtDocument, dict[str, str]]:
+        if not pages:
+            return LlmsTxtDocument(self.base_url, None, {}), {}
+
+        # Pages the crawler never reported (e.g. kept from a previous snapshot) start now
+        for page in pages:
+            self.add(page)
+        urls = [clean_url(page.url) for page in pages]
+        await asyncio.gather(*[self._entries[url] for url in set(urls)])
+        self._prober.save()
+
+        md_url_map = {clean: self._entries[clean].result()[1] for clean in urls}
+        document = build_llms_txt(self.base_url, pages, md_url_map, self.section_cache, self._prepared_link)
+        return document, md_url_map
+
+    def _prepared_link(self, page: PageInfo, section: str, output_url: str) -> str:
+        # Only sections missing from the render cache get here; reuse the link formatted during the crawl
+        prepared_page, prepared_url, link = self._entries[clean_url(page.url)].result()
+        if prepared_page == page and prepared_url == output_url:
+            return link
+        return format_page_link(page, section, output_url)
@@ -1,16 +1,59 @@
-import hashlib
+import httpx
 from datetime import datetime, timezone
-from crawler import LLMCrawler
+from typing import Callable
+from crawler import LLMCrawler, PageInfo, PageCache, FullTextStore, get_parse_executor, get_page_cache
 from storage import save_llms_txt
 from database import get_due_sites, update_crawl_result, update_scheduling_only
-from formatter import format_llms_txt, get_md_url_map
+from pipeline import LlmsTxtPipeline
+from formatter import llms_txt_chunks, llms_txt_sha256, iter_llms_full_txt, get_section_cache, changed_sections
+from md_cache import get_md_probe_cache
 from config import settings
-from sitemap_utils import has_sitemap_changed
+from sitemap_utils import SitemapDiscovery, discover_sitemap, has_sitemap_changed
 from scheduling import compute_next_crawl
+from incremental import (plan_incremental_crawl, merge_pages, pages_from_snapshot, pages_to_snapshot,
+                         sitemap_urls_from_snapshot)
 
 async def no_op_log(message: str):
     pass
 
+def is_sitemap_sentinel(sentinel_url: str | None) -> bool:
+    return bool(sentinel_url) and (sentinel_url.endswith('.xml') or 'sitemap' in sentinel_url)
+
+async def discover_site_sitemap(site) -> SitemapDiscovery:
+    known_url = site.sentinel_url if is_sitemap_sentinel(site.sentinel_url) else None
+    async with httpx.AsyncClient(timeout=10.0, follow_redirects=True) as client:
+        return await discover_sitemap(client, site.base_url, known_url=known_url)
+
+def full_text_lookup(store: FullTextStore, page_cache: PageCache | None) -> Callable[[str], str | None]:
+    # Pages kept by an incremental recrawl were not fetched; their text may still be in the page cache
+    def text_for(url: str) -> str | None:
+        text = store.get(url)
+        if text is None and page_cache is not None:
+            cached = page_cache.get(url)
+            text = cached.analysis.text if cached else None
+        return text
+
+    return text_for
+
+async def crawl_site_pages(site, crawler: LLMCrawler) -> list[PageInfo]:
+    previous_pages = pages_from_snapshot(site.page_snapshot)
+    sitemap = crawler.sitemap
+
+    if (settings.incremental_recrawl_enabled and previous_pages and site.last_crawled_at and
+            sitemap and sitemap.newest_lastmod):
+        plan = plan_incremental_crawl(site.base_url, previous_pages, sitemap.pages,
+                                      site.last_crawled_at, site.max_pages,
+                                      previous_sitemap_urls=sitemap_urls_from_snapshot(site.page_snapshot))
+        print(f"Incremental recrawl for {site.base_url}: {len(plan.refetch)} to fetch, "
+              f"{len(plan.kept)} unchanged, {len(plan.removed)} removed")
+
+        fetched = await crawler.crawl_urls(plan.refetch) if plan.refetch else []
+        pages = merge_pages(previous_pages, plan, fetched)
+        if pages:
+            return pages
+
+    return await crawler.run()
+
 async def recrawl_due_sites() -> dict:
     sites = await get_due_sites()
     results = {
@@ -23,16 +66,22 @@ async def recrawl_due_sites() -> dict:
     now = datetime.now(timezone.utc)
 
     for site in sites:
+        full_text = None
         try:
             sitemap_has_changed = True
             newest_lastmod = None
+            sitemap_validators = site.sitemap_validators
 
-            if site.sentinel_url and (site.sentinel_url.endswith('.xml') or 'sitemap' in site.sentinel_url):
+            if is_sitemap_sentinel(site.sentinel_url):
                 try:
-                    sitemap_has_changed, newest_lastmod = await has_sitemap_changed(
+                    check = await has_sitemap_changed(
                         site.sentinel_url,
-                        site.last_changed_at or site.last_crawled_at
+                        site.last_changed_at or site.last_crawled_at,
+                        site.sitemap_validators
                     )
+                    sitemap_has_changed = check.changed
+                    newest_lastmod = check.newest_lastmod
+                    sitemap_validators = check.validators
 
                     if not sitemap_has_changed:
                         print(f"Sitemap unchanged for {site.base_url}, skipping crawl")
@@ -49,7 +98,8 @@ async def recrawl_due_sites() -> dict:
                         await update_scheduling_only(
                             site.id,
                             next_crawl_at,
-                            newest_lastmod
+                            newest_lastmod,
+                            sitemap_validators=sitemap_validators
                         )
                         results["unchanged"] += 1
                         continue
@@ -58,39 +108,80 @@ async def recrawl_due_sites() -> dict:
                 except Exception as e:
                     print(f"Error checking sitemap for {site.base_url}: {e}")
 
-            crawler = LLMCrawler(
-                site.base_url,
-                site.max_pages,
-                site.desc_length,
-                no_op_log,
-                brightdata_api_key=settings.brightdata_api_key,
-                brightdata_enabled=settings.brightdata_enabled,
-                brightdata_zone=settings.brightdata_zone,
-                brightdata_password=settings.brightdata_password
-            )
-            pages = await crawler.run()
+            # Discovered once; the crawler's sitemap phase and incremental planning both reuse it
+            sitemap = await discover_site_sitemap(site)
 
-            # Check for .md versions (per llmstxt.org spec)
-            md_url_map = await get_md_url_map(pages)
+            page_cache = get_page_cache(settings.page_cache_dir, settings.page_cache_max_bytes)
+            # Sites saved before the opt-in was stored follow the server default
+            llms_full = site.llms_full if site.llms_full is not None else settings.llms_full_enabled
+            if llms_full:
+                full_text = FullTextStore(settings.llms_full_memory_bytes)
 
-            llms_txt = format_llms_txt(site.base_url, pages, md_url_map)
+            pipeline = LlmsTxtPipeline(
+                site.base_url,
+                cache=get_md_probe_cache(settings.md_probe_cache_path, settings.md_probe_ttl_seconds),
+                per_host_limit=settings.md_probe_per_host_limit,
+                miss_threshold=settings.md_probe_miss_threshold,
+                section_cache=get_section_cache()
+            )
+            async with pipeline:
+                crawler = LLMCrawler(
+                    site.base_url,
+                    site.max_pages,
+                    site.desc_length,
+                    no_op_log,
+                    brightdata_api_key=settings.brightdata_api_key,
+                    brightdata_enabled=settings.brightdata_enabled,
+                    brightdata_zone=settings.brightdata_zone,
+                    brightdata_password=settings.brightdata_password,
+                    brightdata_max_tabs=settings.brightdata_max_tabs,
+                    brightdata_ready_timeout_ms=settings.brightdata_ready_timeout_ms,
+                    brightdata_block_resources=settings.brightdata_block_resources,
+                    escalation_threshold=settings.browser_escalation_threshold,
+                    page_cache=page_cache,
+                    fetch_profile=site.fetch_profile,
+                    concurrency=settings.crawl_concurrency,
+                    per_host_limit=settings.crawl_per_host_limit,
+                    executor=get_parse_executor(settings.parse_workers),
+                    sitemap=sitemap,
+                    on_page=pipeline.add,
+                    full_text=full_text
+                )
+                pages = await crawl_site_pages(site, crawler)
+
+                # Check for .md versions (per llmstxt.org spec); most probes already ran during the crawl
+                llms_txt, _ = await pipeline.finish(pages)
+
+            section_hashes = llms_txt.section_hashes()
+            changed = changed_sections(site.section_hashes, section_hashes)
+            print(f"Sections changed for {site.base_url}: {', '.join(changed) if changed else 'none'}")
 
             if settings.llm_enhancement_enabled:
                 try:
                     from llm_processor import LLMProcessor
                     processor = LLMProcessor(no_op_log)
-                    result = await processor.process(llms_txt)
+                    result = await processor.process(llms_txt.text(), site_key=site.base_url)
 
                     if result.success:
                         llms_txt = result.output
                 except Exception as e:
                     print(f"LLM enhancement error for {site.base_url}: {e}")
 
-            new_hash = hashlib.sha256(llms_txt.encode()).hexdigest()
+            full_chunks = None
+            if full_text is not None:
+                text_for = full_text_lookup(full_text, page_cache)
+
+                def iter_full():
+                    return iter_llms_full_txt(site.base_url, pages, text_for)
+
+                full_chunks = iter_full
+
+            new_hash = llms_txt_sha256(llms_txt, full_chunks() if full_chunks else None)
             content_changed = (new_hash != site.latest_llms_hash)
 
             if content_changed:
-                hosted_url = await save_llms_txt(site.base_url, llms_txt, no_op_log)
+                hosted_url = await save_llms_txt(site.base_url, llms_txt_chunks(llms_txt), no_op_log,
+                                                 full_content=full_chunks() if full_chunks else None)
                 if hosted_url:
                     results["updated"] += 1
                 else:
@@ -114,8 +205,13 @@ async def recrawl_due_sites() -> dict:
                 hosted_url,
                 next_crawl_at,
                 new_last_changed,
-                newest_lastmod,
-                new_avg_interval
+                sitemap.newest_lastmod or newest_lastmod,
+                new_avg_interval,
+                fetch_profile=crawler.fetch_profile,
+                page_snapshot=pages_to_snapshot(pages, sitemap.pages),
+                sitemap_validators=sitemap_validators,
+                sentinel_url=sitemap.sitemap_url,
+                section_hashes=section_hashes
             )
 
             results["processed"] += 1
@@ -123,5 +219,8 @@ async def recrawl_due_sites() -> dict:
         except Exception as e:
             print(f"Error recrawling {site.base_url}: {e}")
             results["errors"] += 1
+        finally:
+            if full_text is not None:
+                full_text.close()
 
     return results
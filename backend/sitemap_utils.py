@@ -1,7 +1,17 @@
+import asyncio
+import zlib
 import httpx
 import xml.etree.ElementTree as ET
+from contextlib import aclosing
 from datetime import datetime
 from dataclasses import dataclass
+from typing import AsyncIterator
+
+GZIP_MAGIC = b'\x1f\x8b'
+SITEMAP_CONCURRENCY = 8
+MAX_SITEMAP_DEPTH = 3
+MAX_CHILD_SITEMAPS = 500
+SITEMAP_PATHS = ['/sitemap.xml', '/sitemap_index.xml']
 
 @dataclass
 class SitemapPage:
@@ -10,103 +20,217 @@ class SitemapPage:
     changefreq: str | None
     priority: float | None
 
+@dataclass
+class SitemapIndexEntry:
+    url: str
+    lastmod: datetime | None
+
 @dataclass
 class SitemapInfo:
     pages: list[SitemapPage]
     newest_lastmod: datetime | None
     total_pages: int
 
-async def parse_sitemap(sitemap_url: str, timeout: float = 10.0) -> SitemapInfo | None:
-    try:
-        async with httpx.AsyncClient(timeout=timeout, follow_redirects=True) as client:
-            response = await client.get(sitemap_url)
+@dataclass
+class SitemapDiscovery:
+    sitemap_url: str | None
+    pages: list[SitemapPage]
+    newest_lastmod: datetime | None
 
-            if response.status_code != 200:
-                print(f"Failed to fetch sitemap: {response.status_code}")
-                return None
+def _local_name(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1]
+
+class SitemapStreamParser:
+    # Incremental <urlset>/<sitemapindex> parser. Feed it raw (optionally gzipped)
+    # bytes as they arrive; it returns the records completed so far and drops
+    # them from the tree so memory stays flat however large the sitemap is.
+
+    def __init__(self):
+        self._parser = ET.XMLPullParser(events=('start', 'end'))
+        self._root = None
+        self._head = b''
+        self._sniffed = False
+        self._decompressor = None
+
+    def feed(self, chunk: bytes) -> list[SitemapPage | SitemapIndexEntry]:
+        if not self._sniffed:
+            self._head += chunk
+            if len(self._head) < len(GZIP_MAGIC):
+                return []
+            chunk, self._head = self._head, b''
+            self._sniffed = True
+            if chunk.startswith(GZIP_MAGIC):
+                self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+        if self._decompressor:
+            chunk = self._decompressor.decompress(chunk)
+        self._parser.feed(chunk)
+        return self._read_events()
+
+    def close(self) -> list[SitemapPage | SitemapIndexEntry]:
+        records = []
+        if not self._sniffed and self._head:
+            self._sniffed = True
+            self._parser.feed(self._head)
+        if self._decompressor:
+            self._parser.feed(self._decompressor.flush())
+        self._parser.close()
+        records.extend(self._read_events())
+        return records
+
+    def _read_events(self) -> list[SitemapPage | SitemapIndexEntry]:
+        records = []
+        for event, elem in self._parser.read_events():
+            if event == 'start':
+                if self._root is None:
+                    self._root = elem
+                continue
+
+            name = _local_name(elem.tag)
+            if name not in ('url', 'sitemap') or elem is self._root:
+                continue
+
+            fields = {_local_name(child.tag): (child.text or '').strip() for child in elem}
+            record = _build_record(name, fields)
+            if record:
+                records.append(record)
+            self._root.clear()
+        return records
+
+def _build_record(name: str, fields: dict[str, str]) -> SitemapPage | SitemapIndexEntry | None:
+    url = fields.get('loc')
+    if not url:
+        return None
+
+    lastmod = parse_lastmod(fields['lastmod']) if fields.get('lastmod') else None
 
-            root = ET.fromstring(response.content)
+    if name == 'sitemap':
+        return SitemapIndexEntry(url=url, lastmod=lastmod)
 
-            ns = {'ns': 'http://www.sitemaps.org/schemas/sitemap/0.9'}
+    priority = None
+    if fields.get('priority'):
+        try:
+            priority = float(fields['priority'])
+        except ValueError:
+            pass
 
-            sitemaps = root.findall('ns:sitemap', ns)
-            if sitemaps:
-                return await _parse_sitemap_index(root, ns, timeout)
+    return SitemapPage(
+        url=url,
+        lastmod=lastmod,
+        changefreq=fields.get('changefreq') or None,
+        priority=priority
+    )
+
+def parse_sitemap_content(content: bytes) -> list[SitemapPage | SitemapIndexEntry]:
+    parser = SitemapStreamParser()
+    return parser.feed(content) + parser.close()
+
+async def stream_sitemap(client: httpx.AsyncClient, sitemap_url: str) -> AsyncIterator[SitemapPage | SitemapIndexEntry]:
+    async with client.stream('GET', sitemap_url) as response:
+        if response.status_code != 200:
+            raise ValueError(f"Failed to fetch sitemap: {response.status_code}")
+
+        parser = SitemapStreamParser()
+        async for chunk in response.aiter_bytes():
+            for record in parser.feed(chunk):
+                yield record
+        for record in parser.close():
+            yield record
+
+async def iter_sitemap_pages(client: httpx.AsyncClient, sitemap_url: str,
+                             max_depth: int = MAX_SITEMAP_DEPTH,
+                             concurrency: int = SITEMAP_CONCURRENCY) -> AsyncIterator[SitemapPage]:
+    children = []
+    async with aclosing(stream_sitemap(client, sitemap_url)) as records:
+        async for record in records:
+            if isinstance(record, SitemapIndexEntry):
+                children.append(record)
+            else:
+                yield record
+
+    if not children:
+        return
+
+    # Child sitemaps are fetched concurrently on the shared client and their pages
+    # funnelled through one queue; nested indexes are expanded up to max_depth and
+    # each sitemap URL is visited at most once.
+    seen = {sitemap_url}
+    queue: asyncio.Queue = asyncio.Queue(maxsize=1000)
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks: set[asyncio.Task] = set()
+    done_marker = object()
+
+    def schedule(entry: SitemapIndexEntry, depth: int):
+        url = entry.url.strip()
+        if url in seen:
+            print(f"Skipping repeated sitemap {url}")
+            return
+        if depth > max_depth:
+            print(f"Skipping sitemap {url}: nested deeper than {max_depth} levels")
+            return
+        if len(seen) > MAX_CHILD_SITEMAPS:
+            print(f"Skipping sitemap {url}: more than {MAX_CHILD_SITEMAPS} child sitemaps")
+            return
+        seen.add(url)
+        tasks.add(asyncio.create_task(expand(url, depth)))
+
+    async def expand(url: str, depth: int):
+        try:
+            async with semaphore:
+                async with aclosing(stream_sitemap(client, url)) as records:
+                    async for record in records:
+                        if isinstance(record, SitemapIndexEntry):
+                            schedule(record, depth + 1)
+                        else:
+                            await queue.put(record)
+        except asyncio.CancelledError:
+            # The consumer closed early and is no longer reading; a blocking put would hang
+            raise
+        except Exception as e:
+            print(f"Error parsing sitemap {url}: {e}")
+        await queue.put(done_marker)
+
+    for entry in children:
+        schedule(entry, 1)
+
+    finished = 0
+    try:
+        while finished < len(tasks):
+            record = await queue.get()
+            if record is done_marker:
+                finished += 1
             else:
-                return _parse_regular_sitemap(root, ns)
+                yield record
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+async def parse_sitemap(sitemap_url: str, timeout: float = 10.0,
+                        client: httpx.AsyncClient | None = None) -> SitemapInfo | None:
+    try:
+        if client is None:
+            async with httpx.AsyncClient(timeout=timeout, follow_redirects=True) as own_client:
+                return await _collect_sitemap(own_client, sitemap_url)
+        return await _collect_sitemap(client, sitemap_url)
 
     except Exception as e:
         print(f"Error parsing sitemap {sitemap_url}: {e}")
         return None
 
-async def _parse_sitemap_index(root: ET.Element, ns: dict, timeout: float) -> SitemapInfo:
-    all_pages = []
-    newest_lastmod = None
-
-    sitemaps = root.findall('ns:sitemap', ns)
-
-    for sitemap_elem in sitemaps:
-        loc_elem = sitemap_elem.find('ns:loc', ns)
-        if loc_elem is None or not loc_elem.text:
-            continue
-
-        sitemap_url = loc_elem.text.strip()
-
-        sitemap_info = await parse_sitemap(sitemap_url, timeout)
-        if sitemap_info:
-            all_pages.extend(sitemap_info.pages)
-
-            if sitemap_info.newest_lastmod:
-                if newest_lastmod is None or sitemap_info.newest_lastmod > newest_lastmod:
-                    newest_lastmod = sitemap_info.newest_lastmod
-
-    return SitemapInfo(
-        pages=all_pages,
-        newest_lastmod=newest_lastmod,
-        total_pages=len(all_pages)
-    )
-
-def _parse_regular_sitemap(root: ET.Element, ns: dict) -> SitemapInfo:
+async def _collect_sitemap(client: httpx.AsyncClient, sitemap_url: str,
+                           limit: int | None = None) -> SitemapInfo:
     pages = []
     newest_lastmod = None
 
-    urls = root.findall('ns:url', ns)
-
-    for url_elem in urls:
-        loc_elem = url_elem.find('ns:loc', ns)
-        if loc_elem is None or not loc_elem.text:
-            continue
-
-        url = loc_elem.text.strip()
-
-        lastmod = None
-        lastmod_elem = url_elem.find('ns:lastmod', ns)
-        if lastmod_elem is not None and lastmod_elem.text:
-            lastmod = _parse_lastmod(lastmod_elem.text.strip())
-
-            if lastmod:
-                if newest_lastmod is None or lastmod > newest_lastmod:
-                    newest_lastmod = lastmod
-
-        changefreq = None
-        changefreq_elem = url_elem.find('ns:changefreq', ns)
-        if changefreq_elem is not None and changefreq_elem.text:
-            changefreq = changefreq_elem.text.strip()
-
-        priority = None
-        priority_elem = url_elem.find('ns:priority', ns)
-        if priority_elem is not None and priority_elem.text:
-            try:
-                priority = float(priority_elem.text.strip())
-            except ValueError:
-                pass
-
-        pages.append(SitemapPage(
-            url=url,
-            lastmod=lastmod,
-            changefreq=changefreq,
-            priority=priority
-        ))
+    # With a limit, newest_lastmod only covers the pages read; has_sitemap_changed scans the whole tree
+    async with aclosing(iter_sitemap_pages(client, sitemap_url)) as records:
+        async for page in records:
+            pages.append(page)
+            if page.lastmod and (newest_lastmod is None or page.lastmod > newest_lastmod):
+                newest_lastmod = page.lastmod
+            if limit and len(pages) >= limit:
+                break
 
     return SitemapInfo(
         pages=pages,
@@ -114,7 +238,50 @@ def _parse_regular_sitemap(root: ET.Element, ns: dict) -> SitemapInfo:
         total_pages=len(pages)
     )
 
-def _parse_lastmod(lastmod_str: str) -> datetime | None:
+async def find_robots_sitemaps(client: httpx.AsyncClient, base_url: str) -> list[str]:
+    try:
+        response = await client.get(f"{base_url.rstrip('/')}/robots.txt")
+        if response.status_code != 200:
+            return []
+    except Exception:
+        return []
+
+    sitemaps = []
+    for line in response.text.splitlines():
+        name, _, value = line.partition(':')
+        if name.strip().lower() == 'sitemap' and value.strip():
+            sitemaps.append(value.strip())
+    return sitemaps
+
+async def discover_sitemap(client: httpx.AsyncClient, base_url: str, known_url: str | None = None,
+                           limit: int | None = None) -> SitemapDiscovery:
+    # One lookup per crawl: a previously stored sentinel first, then robots.txt
+    # Sitemap: directives, then the conventional paths. robots.txt is only
+    # fetched when the stored sentinel no longer answers.
+    base_url = base_url.rstrip('/')
+    tried = set()
+
+    async def candidates():
+        if known_url:
+            yield known_url
+        for url in await find_robots_sitemaps(client, base_url):
+            yield url
+        for path in SITEMAP_PATHS:
+            yield f"{base_url}{path}"
+
+    async for candidate in candidates():
+        if candidate in tried:
+            continue
+        tried.add(candidate)
+        try:
+            info = await _collect_sitemap(client, candidate, limit)
+        except Exception:
+            continue
+        return SitemapDiscovery(sitemap_url=candidate, pages=info.pages, newest_lastmod=info.newest_lastmod)
+
+    return SitemapDiscovery(sitemap_url=None, pages=[], newest_lastmod=None)
+
+def parse_lastmod(lastmod_str: str) -> datetime | None:
     try:
         if 'T' in lastmod_str:
             if lastmod_str.endswith('Z'):
@@ -126,26 +293,126 @@ def _parse_lastmod(lastmod_str: str) -> datetime | None:
         print(f"Failed to parse lastmod '{lastmod_str}': {e}")
         return None
 
-async def has_sitemap_changed(sitemap_url: str, last_check_time: datetime | None) -> tuple[bool, datetime | None]:
-    sitemap_info = await parse_sitemap(sitemap_url)
-
-    if not sitemap_info:
-        return (True, None)
-
-    if not sitemap_info.newest_lastmod:
-        return (True, None)
-
-    if not last_check_time:
-        return (True, sitemap_info.newest_lastmod)
-
-    newest = sitemap_info.newest_lastmod
-    last_check = last_check_time
+@dataclass
+class SitemapCheck:
+    changed: bool
+    newest_lastmod: datetime | None
+    # url -> {'etag', 'last_modified'} plus 'children' ([url, lastmod]) for an index
+    validators: dict[str, dict]
+
+def _naive(value: datetime) -> datetime:
+    return value.replace(tzinfo=None) if value.tzinfo else value
+
+class _SentinelScan:
+    # Walks a sitemap tree with conditional requests and stops at the first
+    # lastmod newer than last_check. A 304 means that file is unchanged; for an
+    # index its remembered children are still revalidated, since they can change
+    # without the index changing. Only an index entry whose own lastmod predates
+    # last_check lets a child be skipped.
+
+    def __init__(self, last_check_time: datetime | None, validators: dict | None):
+        self.last_check = _naive(last_check_time) if last_check_time else None
+        self.previous = validators or {}
+        self.validators = dict(self.previous)
+        self.newest_lastmod: datetime | None = None
+        self.has_evidence = False
+        self.seen: set[str] = set()
+
+    def _is_new(self, lastmod: datetime) -> bool:
+        return self.last_check is not None and _naive(lastmod) > self.last_check
+
+    def _conditional_headers(self, url: str) -> dict[str, str]:
+        known = self.previous.get(url) or {}
+        headers = {}
+        if known.get('etag'):
+            headers['If-None-Match'] = known['etag']
+        if known.get('last_modified'):
+            headers['If-Modified-Since'] = known['last_modified']
+        return headers
+
+    def _skip_child(self, lastmod: datetime | None) -> bool:
+        return lastmod is not None and self.last_check is not None and not self._is_new(lastmod)
+
+    def _remember(self, url: str, response: httpx.Response):
+        etag = response.headers.get('etag')
+        last_modified = response.headers.get('last-modified')
+        if etag or last_modified:
+            self.validators[url] = {k: v for k, v in (('etag', etag), ('last_modified', last_modified)) if v}
+        else:
+            self.validators.pop(url, None)
+
+    async def scan(self, client: httpx.AsyncClient, url: str, depth: int = 0) -> bool:
+        if url in self.seen or depth > MAX_SITEMAP_DEPTH:
+            return False
+        self.seen.add(url)
+
+        children: list[str] = []
+        async with client.stream('GET', url, headers=self._conditional_headers(url)) as response:
+            if response.status_code == 304:
+                self.has_evidence = True
+                for child_url, lastmod in (self.previous.get(url) or {}).get('children', []):
+                    if not self._skip_child(parse_lastmod(lastmod) if lastmod else None):
+                        children.append(child_url)
+            elif response.status_code != 200:
+                print(f"Failed to fetch sitemap: {response.status_code}")
+                return False
+            else:
+                self._remember(url, response)
+
+                entries: list[SitemapIndexEntry] = []
+                parser = SitemapStreamParser()
+                async for chunk in response.aiter_bytes():
+                    if self._check_records(parser.feed(chunk), children, entries):
+                        return True
+                if self._check_records(parser.close(), children, entries):
+                    return True
+
+                # Keep the index's children so a later 304 on it can still revalidate them
+                if entries and url in self.validators:
+                    self.validators[url] = {**self.validators[url], 'children': [
+                        [entry.url.strip(), entry.lastmod.isoformat() if entry.lastmod else None] for entry in entries
+                    ]}
+
+        for child_url in children:
+            if await self.scan(client, child_url, depth + 1):
+                return True
+        return False
+
+    def _check_records(self, records: list, children: list[str], entries: list[SitemapIndexEntry]) -> bool:
+        for record in records:
+            if isinstance(record, SitemapIndexEntry):
+                entries.append(record)
+                if self._skip_child(record.lastmod):
+                    self.has_evidence = True
+                else:
+                    children.append(record.url.strip())
+                continue
+
+            if record.lastmod:
+                self.has_evidence = True
+                if self.newest_lastmod is None or _naive(record.lastmod) > _naive(self.newest_lastmod):
+                    self.newest_lastmod = record.lastmod
+                if self._is_new(record.lastmod):
+                    return True
+        return False
+
+async def has_sitemap_changed(sitemap_url: str, last_check_time: datetime | None,
+                              validators: dict | None = None,
+                              client: httpx.AsyncClient | None = None) -> SitemapCheck:
+    scan = _SentinelScan(last_check_time, validators)
 
-    if newest.tzinfo:
-        newest = newest.replace(tzinfo=None)
-    if last_check.tzinfo:
-        last_check = last_check.replace(tzinfo=None)
+    try:
+        if client is None:
+            async with httpx.AsyncClient(timeout=10.0, follow_redirects=True) as own_client:
+                changed = await scan.scan(own_client, sitemap_url)
+        else:
+            changed = await scan.scan(client, sitemap_url)
+    except Exception as e:
+        print(f"Error checking sitemap {sitemap_url}: {e}")
+        return SitemapCheck(changed=True, newest_lastmod=None, validators=scan.previous)
 
-    has_changed = newest > last_check
+    # Without any lastmod or validator we cannot tell, so assume it changed
+    if not scan.has_evidence or last_check_time is None:
+        changed = True
 
-    return (has_changed, sitemap_info.newest_lastmod)
+    return SitemapCheck(changed=changed, newest_lastmod=scan.newest_lastmod, validators=scan.validators)
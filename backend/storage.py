@@ -1,10 +1,71 @@
 import hashlib
-from typing import Callable
+from typing import Callable, Iterable
 import boto3
 from botocore.exceptions import ClientError
 from config import settings
 
-async def save_llms_txt(base_url: str, content: str, log: Callable) -> str | None:
+# S3/R2 require every multipart part except the last to be at least 5 MiB
+MULTIPART_PART_BYTES = 8 * 1024 * 1024
+
+def _upload_chunks(s3_client, object_key: str, chunks: Iterable[str]):
+    # Small files go up in one put_object; larger ones stream as multipart parts
+    # so at most one part is buffered at a time.
+    buffer = bytearray()
+    upload_id = None
+    parts = []
+
+    def upload_part():
+        response = s3_client.upload_part(
+            Bucket=settings.r2_bucket,
+            Key=object_key,
+            UploadId=upload_id,
+            PartNumber=len(parts) + 1,
+            Body=bytes(buffer)
+        )
+        parts.append({'ETag': response['ETag'], 'PartNumber': len(parts) + 1})
+        buffer.clear()
+
+    try:
+        for chunk in chunks:
+            buffer += chunk.encode()
+            if len(buffer) >= MULTIPART_PART_BYTES:
+                if upload_id is None:
+                    upload_id = s3_client.create_multipart_upload(
+                        Bucket=settings.r2_bucket,
+                        Key=object_key,
+                        ContentType='text/markdown'
+                    )['UploadId']
+                upload_part()
+
+        if upload_id is None:
+            s3_client.put_object(
+                Bucket=settings.r2_bucket,
+                Key=object_key,
+                Body=bytes(buffer),
+                ContentType='text/markdown'
+            )
+            return
+
+        if buffer:
+            upload_part()
+        s3_client.complete_multipart_upload(
+            Bucket=settings.r2_bucket,
+            Key=object_key,
+            UploadId=upload_id,
+            MultipartUpload={'Parts': parts}
+        )
+    except Exception:
+        if upload_id is not None:
+            s3_client.abort_multipart_upload(Bucket=settings.r2_bucket, Key=object_key, UploadId=upload_id)
+        raise
+
+def _public_url(object_key: str) -> str:
+    if settings.r2_public_domain:
+        return f"{settings.r2_public_domain}/{object_key}"
+    return f"{settings.r2_endpoint}/{settings.r2_bucket}/{object_key}"
+
+async def save_llms_txt(base_url: str, content: str | Iterable[str], log: Callable,
+                        full_content: Iterable[str] | None = None) -> str | None:
     if not all([settings.r2_endpoint, settings.r2_access_key, settings.r2_secret_key, settings.r2_bucket]):
         log("Storage not configured, skipping upload")
         return None
@@ -20,19 +81,19 @@ async def save_llms_txt(base_url: str, content: str, log: Callable) -> str | Non
         url_hash = hashlib.md5(base_url.encode()).hexdigest()
         object_key = f"llms/{url_hash}.txt"
 
-        s3_client.put_object(
-            Bucket=settings.r2_bucket,
-            Key=object_key,
-            Body=content.encode(),
-            ContentType='text/markdown'
-        )
+        _upload_chunks(s3_client, object_key, [content] if isinstance(content, str) else content)
+        public_url = _public_url(object_key)
+        log(f"Uploaded to {public_url}")
 
-        if settings.r2_public_domain:
-            public_url = f"{settings.r2_public_domain}/{object_key}"
-        else:
-            public_url = f"{settings.r2_endpoint}/{settings.r2_bucket}/{object_key}"
+        if full_content is not None:
+            # llms-full.txt sits next to llms.txt; its failure leaves the llms.txt upload intact
+            full_key = f"llms/{url_hash}-full.txt"
+            try:
+                _upload_chunks(s3_client, full_key, full_content)
+                log(f"Uploaded to {_public_url(full_key)}")
+            except ClientError as e:
+                log(f"Storage error for llms-full.txt: {str(e)}")
 
-        log(f"Uploaded to {public_url}")
         return public_url
 
     except ClientError as e:
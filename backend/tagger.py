@@ -1,3 +1,5 @@
+import re
+from functools import lru_cache
 from crawler.llm_crawler import PageInfo
 from urllib.parse import urlparse
 
@@ -22,57 +24,97 @@ TAG_PATTERNS = {
     'Troubleshooting': ['troubleshoot', 'debug', 'error', 'faq', 'common-issues'],
 }
 
-def assign_tags(page: PageInfo, section_name: str = "") -> list[str]:
-    parsed_url = urlparse(page.url)
-    url_path = parsed_url.path
-
-    text = f"{url_path} {page.title}".lower()
-    matched_tags = []
-
+CONTENT_TAGS = ('API', 'Guide', 'Quickstart', 'Reference', 'Example', 'SDK', 'CLI', 'Blog', 'Changelog')
+COMPLEXITY_TAGS = ('Beginner', 'Advanced')
+
+# Content tags dropped when the section name already says the same thing
+SECTION_SUPPRESSIONS = {
+    'API': ['api'],
+    'Guide': ['getting-started', 'guide', 'quickstart', 'start'],
+    'Quickstart': ['getting-started', 'guide', 'quickstart', 'start'],
+    'Example': ['example'],
+    'Blog': ['blog'],
+    'Reference': ['reference', 'docs', 'documentation'],
+    'SDK': ['sdk'],
+    'CLI': ['cli'],
+}
+BEGINNER_SUPPRESSIONS = ['getting-started', 'quickstart', 'start', 'intro']
+
+def _trie_regex(words: list[str]) -> str:
+    # Alternation factored by shared prefixes, so each position costs one
+    # character dispatch instead of a try per pattern. Optional tails are
+    # greedy, so the longest pattern starting at a position wins.
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node: dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return f'(?:{body})?' if '' in node else body
+
+    return build(trie)
+
+# Each tag is one bit, so matched sets and suppressions combine with plain integer ops
+TAG_BITS = {tag: 1 << i for i, tag in enumerate(TAG_PATTERNS)}
+
+def _compile_patterns() -> tuple[re.Pattern, dict[str, int]]:
+    pattern_tags: dict[str, int] = {}
     for tag, patterns in TAG_PATTERNS.items():
-        if any(pattern in text for pattern in patterns):
-            matched_tags.append(tag)
-
-    content_tags = [t for t in matched_tags if t in ['API', 'Guide', 'Quickstart',
-                                                       'Reference', 'Example', 'SDK',
-                                                       'CLI', 'Blog', 'Changelog']]
-    complexity_tags = [t for t in matched_tags if t in ['Beginner', 'Advanced']]
-    topic_tags = [t for t in matched_tags if t not in content_tags + complexity_tags]
-
-    section_lower = section_name.lower()
-    filtered_content = []
-
-    for tag in content_tags:
-        tag_lower = tag.lower()
-        if tag_lower == 'api' and 'api' in section_lower:
-            continue
-        if tag_lower in ['guide', 'quickstart'] and any(x in section_lower for x in ['getting-started', 'guide', 'quickstart', 'start']):
-            continue
-        if tag_lower == 'example' and 'example' in section_lower:
-            continue
-        if tag_lower == 'blog' and 'blog' in section_lower:
-            continue
-        if tag_lower == 'reference' and any(x in section_lower for x in ['reference', 'docs', 'documentation']):
-            continue
-        if tag_lower == 'sdk' and 'sdk' in section_lower:
-            continue
-        if tag_lower == 'cli' and 'cli' in section_lower:
-            continue
-
-        filtered_content.append(tag)
-
-    filtered_complexity = []
-    for tag in complexity_tags:
-        if tag == 'Beginner' and any(x in section_lower for x in ['getting-started', 'quickstart', 'start', 'intro']):
-            continue
-        filtered_complexity.append(tag)
+        for pattern in patterns:
+            pattern_tags[pattern] = pattern_tags.get(pattern, 0) | TAG_BITS[tag]
+
+    # The lookahead reports only the longest pattern starting at each position.
+    # Every other pattern matching there is a prefix of it, so each pattern
+    # carries the tags of all its prefixes.
+    implied = {}
+    for pattern in pattern_tags:
+        implied[pattern] = 0
+        for other, bits in pattern_tags.items():
+            if pattern.startswith(other):
+                implied[pattern] |= bits
+    return re.compile('(?=(' + _trie_regex(list(pattern_tags)) + '))'), implied
+
+_TAG_REGEX, _PATTERN_BITS = _compile_patterns()
+
+@lru_cache(maxsize=1024)
+def _section_suppressed(section_lower: str) -> int:
+    suppressed = 0
+    for tag, needles in SECTION_SUPPRESSIONS.items():
+        if any(x in section_lower for x in needles):
+            suppressed |= TAG_BITS[tag]
+    if any(x in section_lower for x in BEGINNER_SUPPRESSIONS):
+        suppressed |= TAG_BITS['Beginner']
+    return suppressed
+
+@lru_cache(maxsize=4096)
+def _select_tags(mask: int, suppressed: int) -> tuple[str, ...]:
+    filtered_content = [t for t in CONTENT_TAGS if mask & TAG_BITS[t] and not suppressed & TAG_BITS[t]]
+    filtered_complexity = [t for t in COMPLEXITY_TAGS if mask & TAG_BITS[t] and not suppressed & TAG_BITS[t]]
+    topic_tags = [t for t in TAG_PATTERNS if mask & TAG_BITS[t] and t not in CONTENT_TAGS and t not in COMPLEXITY_TAGS]
 
     result = filtered_complexity[:1] + topic_tags[:2]
 
     if len(result) < 3 and filtered_content:
         result += filtered_content[:3-len(result)]
 
-    return result[:3]
+    return tuple(result[:3])
+
+def assign_tags(page: PageInfo, section_name: str = "") -> list[str]:
+    text = f"{urlparse(page.url).path} {page.title}".lower()
+
+    mask = 0
+    for pattern in _TAG_REGEX.findall(text):
+        mask |= _PATTERN_BITS[pattern]
+    if not mask:
+        return []
+    suppressed = _section_suppressed(section_name.lower()) if section_name else 0
+    return list(_select_tags(mask, suppressed & mask))
 
 def format_description_with_tags(description: str, tags: list[str]) -> str:
     if not tags:
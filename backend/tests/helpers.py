@@ -0,0 +1,8 @@
+def page_html(title: str, links: list[str]) -> str:
+    anchors = ''.join(f'<a href="{link}">{link}</a>' for link in links)
+    return (f"<html><head><title>{title}</title><meta name='description' content='{title} page'></head>"
+            f"<body><p>{'Meaningful body content for the page. ' * 10}</p>{anchors}</body></html>")
+
+
+async def no_log(message: str):
+    pass
@@ -1,4 +1,6 @@
+import pytest
 from crawler.scout import normalize_url, same_domain, should_skip, extract_links
+from tests.helpers import page_html, no_log
 
 def test_normalize_url():
     assert normalize_url("https://example.com/page/") == "https://example.com/page"
@@ -28,3 +30,385 @@ def test_extract_links():
     assert "https://example.com/about" in links
     assert "https://example.com/contact" in links
     assert "https://other.com/external" not in links
+
+
+def _site_transport(pages: dict[str, str], delay: float = 0.0, stats: dict | None = None):
+    import asyncio
+    import httpx
+
+    async def handler(request):
+        url = str(request.url).rstrip('/')
+        if stats is not None:
+            stats['requests'] = stats.get('requests', 0) + 1
+            stats['active'] = stats.get('active', 0) + 1
+            stats['peak'] = max(stats.get('peak', 0), stats['active'])
+        try:
+            if delay:
+                await asyncio.sleep(delay)
+            if url in pages:
+                return httpx.Response(200, text=pages[url])
+            return httpx.Response(404, text="")
+        finally:
+            if stats is not None:
+                stats['active'] -= 1
+
+    return httpx.MockTransport(handler)
+
+
+def _patch_client(monkeypatch, transport):
+    import httpx
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(
+        "crawler.llm_crawler.httpx.AsyncClient",
+        lambda *args, **kwargs: real_client(transport=transport, **kwargs)
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("concurrency", [1, 4])
+async def test_crawl_homepage_first_and_max_pages(monkeypatch, concurrency):
+    from crawler import LLMCrawler
+
+    children = [f"/page{i}" for i in range(10)]
+    pages = {"https://example.com": page_html("Home", children)}
+    for child in children:
+        pages[f"https://example.com{child}"] = page_html(child, ["/"])
+    _patch_client(monkeypatch, _site_transport(pages, delay=0.01))
+
+    crawler = LLMCrawler("https://example.com", 5, 100, no_log, concurrency=concurrency)
+    result = await crawler.run()
+
+    assert len(result) == 5
+    assert result[0].url == "https://example.com"
+    assert len({page.url for page in result}) == 5
+
+
+@pytest.mark.asyncio
+async def test_crawl_respects_per_host_limit(monkeypatch):
+    from crawler import LLMCrawler
+
+    children = [f"/page{i}" for i in range(12)]
+    pages = {"https://example.com": page_html("Home", children)}
+    for child in children:
+        pages[f"https://example.com{child}"] = page_html(child, [])
+    stats = {}
+    _patch_client(monkeypatch, _site_transport(pages, delay=0.02, stats=stats))
+
+    crawler = LLMCrawler("https://example.com", 13, 100, no_log, concurrency=8, per_host_limit=3)
+    result = await crawler.run()
+
+    assert len(result) == 13
+    assert stats['peak'] <= 3
+    assert stats['peak'] > 1
+
+
+def test_analyze_html_parses_once(monkeypatch):
+    import crawler.analysis as analysis
+    from bs4 import BeautifulSoup
+
+    calls = []
+
+    class CountingSoup(BeautifulSoup):
+        def __init__(self, *args, **kwargs):
+            calls.append(args)
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr("crawler.parser.BeautifulSoup", CountingSoup)
+
+    html = page_html("Docs", ["/guide", "https://other.com/x"]).replace(
+        "<body>", '<body><nav><a href="/nav-only">Nav</a></nav>'
+    )
+    result = analysis.analyze_html(html, "https://example.com/docs")
+
+    assert len(calls) == 1
+    assert result.meaningful
+    assert result.title == "Docs"
+    assert "https://example.com/guide" in result.links
+    assert "https://example.com/nav-only" in result.links
+    assert "https://other.com/x" not in result.links
+    assert "Nav" not in result.text
+
+
+def test_helpers_accept_parsed_soup():
+    from bs4 import BeautifulSoup
+    from crawler import has_meaningful_content
+
+    html = page_html("Home", ["/about"])
+    soup = BeautifulSoup(html, 'html.parser')
+
+    assert has_meaningful_content(soup) == has_meaningful_content(html)
+    assert extract_links(soup, "https://example.com") == extract_links(html, "https://example.com")
+
+
+@pytest.mark.asyncio
+async def test_crawl_with_process_pool_matches_inline(monkeypatch):
+    from concurrent.futures import ProcessPoolExecutor
+    from crawler import LLMCrawler
+
+    children = [f"/page{i}" for i in range(4)]
+    pages = {"https://example.com": page_html("Home", children)}
+    for child in children:
+        pages[f"https://example.com{child}"] = page_html(child, ["/"])
+    _patch_client(monkeypatch, _site_transport(pages))
+
+    inline = await LLMCrawler("https://example.com", 5, 100, no_log).run()
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        pooled = await LLMCrawler("https://example.com", 5, 100, no_log, concurrency=3,
+                                  executor=executor).run()
+
+    assert pooled == inline
+
+
+class _BrokenExecutor:
+    def __init__(self):
+        self.shutdowns = 0
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shutdowns += 1
+
+
+@pytest.mark.asyncio
+async def test_analyze_falls_back_inline_when_pool_breaks_under_several_workers(monkeypatch):
+    import asyncio
+    from concurrent.futures.process import BrokenProcessPool
+    from crawler import LLMCrawler
+
+    executor = _BrokenExecutor()
+    crawler = LLMCrawler("https://example.com", 2, 100, no_log, executor=executor)
+    both_submitted = asyncio.Barrier(2)
+
+    # Both parses are in the pool when its worker dies, so both see BrokenProcessPool
+    async def run_in_broken_pool(pool, fn, *args):
+        await both_submitted.wait()
+        raise BrokenProcessPool("worker died")
+
+    monkeypatch.setattr(asyncio.get_running_loop(), "run_in_executor", run_in_broken_pool)
+    results = await asyncio.gather(
+        crawler._analyze(page_html("A", []), "https://example.com/a"),
+        crawler._analyze(page_html("B", []), "https://example.com/b"),
+    )
+
+    assert [page.title for page in results] == ["A", "B"]
+    assert crawler.executor is None
+    assert executor.shutdowns == 1
+
+
+class _FakeBrowserClient:
+    def __init__(self, html: str):
+        self.html = html
+        self.fetched = []
+
+    async def fetch(self, url: str) -> str:
+        self.fetched.append(url)
+        return self.html
+
+    async def close(self):
+        pass
+
+    def get_usage_stats(self) -> dict:
+        return {"requests": 0}
+
+
+@pytest.mark.asyncio
+async def test_crawl_learns_browser_strategy_per_host(monkeypatch):
+    from crawler import LLMCrawler
+
+    shell = '<html><body><div id="root"></div>' + '<script src="/app.js"></script>' * 5 + '</body></html>'
+    children = [f"/page{i}" for i in range(6)]
+    pages = {"https://example.com": shell}
+    for child in children:
+        pages[f"https://example.com{child}"] = shell
+    stats = {}
+    _patch_client(monkeypatch, _site_transport(pages, stats=stats))
+
+    crawler = LLMCrawler("https://example.com", 7, 100, no_log, escalation_threshold=2)
+    crawler.brightdata_client = _FakeBrowserClient(page_html("Rendered", children))
+    result = await crawler.run()
+
+    assert len(result) == 7
+    assert crawler.fetch_profile == {"example.com": "browser"}
+    assert len(crawler.brightdata_client.fetched) == 7
+    # robots.txt and sitemap probes plus the two httpx attempts before switching strategy
+    assert stats["requests"] == 5
+
+
+@pytest.mark.asyncio
+async def test_crawl_starts_from_persisted_profile(monkeypatch):
+    from crawler import LLMCrawler
+
+    pages = {"https://example.com": page_html("Home", [])}
+    stats = {}
+    _patch_client(monkeypatch, _site_transport(pages, stats=stats))
+
+    crawler = LLMCrawler("https://example.com", 1, 100, no_log, fetch_profile={"example.com": "browser"})
+    crawler.brightdata_client = _FakeBrowserClient(page_html("Rendered", []))
+    result = await crawler.run()
+
+    assert result[0].title == "Rendered"
+    # Only sitemap discovery goes through httpx
+    assert stats["requests"] == 3
+
+
+class _FailingBrowserClient(_FakeBrowserClient):
+    async def fetch(self, url: str) -> str:
+        self.fetched.append(url)
+        raise RuntimeError("browser unavailable")
+
+
+@pytest.mark.asyncio
+async def test_crawl_reverts_to_httpx_after_fallback_success(monkeypatch):
+    from crawler import LLMCrawler
+
+    pages = {"https://example.com": page_html("Home", ["/a"]), "https://example.com/a": page_html("A", [])}
+    _patch_client(monkeypatch, _site_transport(pages))
+
+    crawler = LLMCrawler("https://example.com", 2, 100, no_log, fetch_profile={"example.com": "browser"})
+    crawler.brightdata_client = _FailingBrowserClient("")
+    result = await crawler.run()
+
+    assert [page.title for page in result] == ["Home", "A"]
+    assert crawler.fetch_profile == {"example.com": "httpx"}
+    # Only the first page went to the browser before the host moved back
+    assert crawler.brightdata_client.fetched == ["https://example.com"]
+
+
+def test_frontier_deduplicates():
+    from crawler.state import Frontier
+
+    frontier = Frontier()
+    assert frontier.push("https://example.com")
+    assert not frontier.push("https://example.com")
+    assert len(frontier) == 1
+    assert frontier.pop() == "https://example.com"
+    assert not frontier.push("https://example.com")
+    assert "https://example.com" in frontier
+
+
+def test_frontier_orders_by_depth_priority_and_section_diversity():
+    from datetime import datetime
+    from crawler.state import Frontier
+
+    frontier = Frontier()
+    frontier.push("https://example.com/blog/deep/post", depth=3)
+    frontier.push("https://example.com/docs/a", depth=2)
+    frontier.push("https://example.com/docs/b", depth=2)
+    frontier.push("https://example.com/docs/c", depth=2)
+    frontier.push("https://example.com/api/a", depth=2)
+    frontier.push("https://example.com/pricing", depth=2, priority=0.9)
+    frontier.push("https://example.com/docs/old", depth=2, lastmod=datetime(2020, 1, 1))
+    frontier.push("https://example.com", depth=0)
+
+    order = [frontier.pop() for _ in range(len(frontier))]
+    assert order == [
+        "https://example.com",
+        "https://example.com/pricing",
+        "https://example.com/docs/a",
+        "https://example.com/api/a",
+        "https://example.com/docs/b",
+        "https://example.com/docs/c",
+        "https://example.com/docs/old",
+        "https://example.com/blog/deep/post",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_crawl_uses_sitemap_priority(monkeypatch):
+    from crawler import LLMCrawler
+
+    sitemap = '''<?xml version="1.0" encoding="UTF-8"?>
+    <urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+      <url><loc>https://example.com/</loc></url>
+      <url><loc>https://example.com/legal/terms</loc><priority>0.1</priority></url>
+      <url><loc>https://example.com/docs/intro</loc><priority>0.9</priority></url>
+    </urlset>'''
+    pages = {
+        "https://example.com": page_html("Home", ["/legal/terms", "/docs/intro"] * 20),
+        "https://example.com/sitemap.xml": sitemap,
+        "https://example.com/legal/terms": page_html("Terms", []),
+        "https://example.com/docs/intro": page_html("Intro", []),
+    }
+    _patch_client(monkeypatch, _site_transport(pages))
+
+    crawler = LLMCrawler("https://example.com", 2, 100, no_log)
+    result = await crawler.run()
+
+    assert [page.url for page in result] == ["https://example.com", "https://example.com/docs/intro"]
+    assert crawler.discovered_sitemap_url == "https://example.com/sitemap.xml"
+
+
+@pytest.mark.asyncio
+async def test_crawl_prefers_nested_sitemap_pages_over_footer_links(monkeypatch):
+    from crawler import LLMCrawler
+
+    sitemap = '''<?xml version="1.0" encoding="UTF-8"?>
+    <urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+      <url><loc>https://example.com/docs/guide/install</loc><priority>1.0</priority></url>
+      <url><loc>https://example.com/docs/guide/config</loc><priority>1.0</priority></url>
+    </urlset>'''
+    pages = {
+        "https://example.com": page_html("Home", ["/careers", "/press", "/legal"]),
+        "https://example.com/sitemap.xml": sitemap,
+        "https://example.com/docs/guide/install": page_html("Install", []),
+        "https://example.com/docs/guide/config": page_html("Config", []),
+        "https://example.com/careers": page_html("Careers", []),
+        "https://example.com/press": page_html("Press", []),
+        "https://example.com/legal": page_html("Legal", []),
+    }
+    _patch_client(monkeypatch, _site_transport(pages))
+
+    crawler = LLMCrawler("https://example.com", 3, 100, no_log)
+    result = await crawler.run()
+
+    assert [page.url for page in result] == [
+        "https://example.com",
+        "https://example.com/docs/guide/install",
+        "https://example.com/docs/guide/config",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_crawl_reuses_provided_sitemap_discovery(monkeypatch):
+    import httpx
+    from crawler import LLMCrawler
+    from sitemap_utils import SitemapDiscovery, SitemapPage
+
+    pages = {
+        "https://example.com": page_html("Home", []),
+        "https://example.com/docs": page_html("Docs", []),
+    }
+    requested = []
+    transport = _site_transport(pages)
+
+    async def handler(request):
+        requested.append(str(request.url).rstrip('/'))
+        return await transport.handle_async_request(request)
+
+    _patch_client(monkeypatch, httpx.MockTransport(handler))
+
+    sitemap = SitemapDiscovery("https://example.com/sitemap.xml",
+                               [SitemapPage("https://example.com/docs", None, None, None)], None)
+    crawler = LLMCrawler("https://example.com", 2, 100, no_log, sitemap=sitemap)
+    result = await crawler.run()
+
+    assert [page.url for page in result] == ["https://example.com", "https://example.com/docs"]
+    assert requested == ["https://example.com", "https://example.com/docs"]
+    assert crawler.discovered_sitemap_url == "https://example.com/sitemap.xml"
+
+
+@pytest.mark.asyncio
+async def test_crawl_urls_fetches_only_given_urls(monkeypatch):
+    from crawler import LLMCrawler
+
+    pages = {
+        "https://example.com/a": page_html("A", ["/b", "/c"]),
+        "https://example.com/b": page_html("B", ["/c"]),
+        "https://example.com/c": page_html("C", []),
+    }
+    stats = {}
+    _patch_client(monkeypatch, _site_transport(pages, stats=stats))
+
+    crawler = LLMCrawler("https://example.com", 50, 100, no_log)
+    result = await crawler.crawl_urls(["https://example.com/a", "https://example.com/b", "https://example.com/missing"])
+
+    assert sorted(page.title for page in result) == ["A", "B"]
+    assert stats["requests"] == 3
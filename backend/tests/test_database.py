@@ -0,0 +1,60 @@
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import MagicMock, patch
+from database import get_due_sites, save_site_metadata, update_scheduling_only, update_crawl_result
+
+def _written(client) -> dict:
+    return client.table.return_value.update.call_args.args[0]
+
+@pytest.mark.asyncio
+async def test_update_crawl_result_writes_section_hashes():
+    client = MagicMock()
+    now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    with patch('database.get_supabase_client', return_value=client):
+        assert await update_crawl_result("site-1", "hash", "https://cdn/x.txt", now, now, None, 60.0,
+                                         section_hashes={"## Docs": "abc"})
+
+    assert _written(client)["section_hashes"] == {"## Docs": "abc"}
+
+@pytest.mark.asyncio
+async def test_update_scheduling_only_advances_next_crawl():
+    client = MagicMock()
+    next_crawl_at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    with patch('database.get_supabase_client', return_value=client):
+        assert await update_scheduling_only("site-1", next_crawl_at, None, sitemap_validators={"u": {"etag": "e"}})
+
+    data = _written(client)
+    assert data["next_crawl_at"] == next_crawl_at.isoformat()
+    assert data["sitemap_validators"] == {"u": {"etag": "e"}}
+    client.table.return_value.update.return_value.eq.assert_called_once_with("id", "site-1")
+
+@pytest.mark.asyncio
+async def test_update_crawl_result_writes_sentinel_url():
+    client = MagicMock()
+    now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    with patch('database.get_supabase_client', return_value=client):
+        assert await update_crawl_result("site-1", "hash", "https://cdn/x.txt", now, now, None, 60.0,
+                                         sentinel_url="https://example.com/sitemap.xml")
+
+    assert _written(client)["sentinel_url"] == "https://example.com/sitemap.xml"
+
+
+@pytest.mark.asyncio
+async def test_llms_full_opt_in_round_trips():
+    client = MagicMock()
+    client.table.return_value.select.return_value.lte.return_value.execute.return_value.data = [
+        {"id": "site-1", "base_url": "https://a.example", "recrawl_interval_minutes": 60, "max_pages": 10,
+         "desc_length": 100, "llms_full": True},
+        {"id": "site-2", "base_url": "https://b.example", "recrawl_interval_minutes": 60, "max_pages": 10,
+         "desc_length": 100},
+    ]
+
+    with patch('database.get_supabase_client', return_value=client):
+        assert await save_site_metadata("https://a.example", 60, 10, 100, "hash", "https://cdn/x.txt", llms_full=True)
+        sites = await get_due_sites()
+
+    assert client.table.return_value.upsert.call_args.args[0]["llms_full"] is True
+    assert [site.llms_full for site in sites] == [True, None]
@@ -454,3 +454,172 @@ class TestMarkdownVersions:
 
         # Should use .md URL because content-type is text/plain
         assert result["https://example.com/docs"] == "https://example.com/docs.md"
+
+    @staticmethod
+    def _patch_md_client(monkeypatch, md_urls: set, stats: dict):
+        import asyncio
+        import httpx
+
+        async def handler(request):
+            stats['requests'] = stats.get('requests', 0) + 1
+            stats['active'] = stats.get('active', 0) + 1
+            stats['peak'] = max(stats.get('peak', 0), stats['active'])
+            try:
+                await asyncio.sleep(0.01)
+                if str(request.url) in md_urls:
+                    return httpx.Response(200, headers={'content-type': 'text/markdown'})
+                return httpx.Response(404)
+            finally:
+                stats['active'] -= 1
+
+        real_client = httpx.AsyncClient
+        monkeypatch.setattr(
+            "formatter.httpx.AsyncClient",
+            lambda *args, **kwargs: real_client(transport=httpx.MockTransport(handler), **kwargs)
+        )
+
+    @pytest.mark.asyncio
+    async def test_get_md_url_map_limits_concurrency_per_host(self, monkeypatch):
+        """Probes against one host should never exceed the per-host limit."""
+        pages = [PageInfo(f"https://example.com/docs/{i}", "Doc", "", "") for i in range(20)]
+        md_urls = {f"https://example.com/docs/{i}.md" for i in range(20)}
+        stats = {}
+        self._patch_md_client(monkeypatch, md_urls, stats)
+
+        result = await get_md_url_map(pages, per_host_limit=3)
+
+        assert stats['requests'] == 20
+        assert stats['peak'] <= 3
+        assert all(md.endswith('.md') for md in result.values())
+
+    @pytest.mark.asyncio
+    async def test_get_md_url_map_stops_probing_host_after_misses(self, monkeypatch):
+        """A host whose first probes all miss should not be probed further."""
+        pages = [PageInfo(f"https://example.com/page{i}", "Page", "", "") for i in range(50)]
+        stats = {}
+        self._patch_md_client(monkeypatch, set(), stats)
+
+        result = await get_md_url_map(pages, per_host_limit=1, miss_threshold=5)
+
+        assert stats['requests'] == 5
+        assert result == {page.url: page.url for page in pages}
+
+    @pytest.mark.asyncio
+    async def test_get_md_url_map_reuses_persisted_results(self, monkeypatch, tmp_path):
+        """Cached probe results should survive a reload and skip the network."""
+        from md_cache import MdProbeCache
+
+        pages = [
+            PageInfo("https://example.com/docs", "Docs", "", ""),
+            PageInfo("https://example.com/api", "API", "", ""),
+        ]
+        stats = {}
+        self._patch_md_client(monkeypatch, {"https://example.com/docs.md"}, stats)
+        path = str(tmp_path / "md_probes.json")
+
+        first = await get_md_url_map(pages, cache=MdProbeCache(path))
+        assert stats['requests'] == 2
+
+        second = await get_md_url_map(pages, cache=MdProbeCache(path))
+        assert stats['requests'] == 2
+        assert second == first == {
+            "https://example.com/docs": "https://example.com/docs.md",
+            "https://example.com/api": "https://example.com/api",
+        }
+
+        expired = await get_md_url_map(pages, cache=MdProbeCache(path, ttl_seconds=-1))
+        assert stats['requests'] == 4
+        assert expired == first
+
+
+class TestStreamingRender:
+
+    def test_chunks_concatenate_to_formatted_text(self):
+        """Section chunks should join to exactly the formatted llms.txt."""
+        import hashlib
+        from formatter import build_llms_txt, llms_txt_sha256
+
+        pages = [
+            PageInfo("https://example.com", "Home", "Homepage", ""),
+            PageInfo("https://example.com/docs/a", "A", "Doc A", ""),
+            PageInfo("https://example.com/api/b", "B", "", ""),
+            PageInfo("https://example.com/privacy", "Privacy", "Policy", ""),
+            PageInfo("https://example.com/terms", "Terms", "", ""),
+        ]
+        document = build_llms_txt("https://example.com", pages)
+
+        expected = format_llms_txt("https://example.com", pages)
+        chunks = list(document.chunks())
+        assert len(chunks) == 4  # header, API, Docs, Optional
+        assert "".join(chunks) == expected
+        assert llms_txt_sha256(document) == hashlib.sha256(expected.encode()).hexdigest()
+        assert llms_txt_sha256(expected) == llms_txt_sha256(document)
+
+    def test_empty_document_matches_fallback(self):
+        from formatter import LlmsTxtDocument
+        assert LlmsTxtDocument("https://example.com", None, {}).text() == format_llms_txt("https://example.com", [])
+
+
+class TestSectionRenderCache:
+
+    PAGES = [
+        PageInfo("https://example.com", "Home", "Homepage", ""),
+        PageInfo("https://example.com/docs/a", "Guide A", "Doc A", ""),
+        PageInfo("https://example.com/docs/b", "Guide B", "Doc B", ""),
+        PageInfo("https://example.com/blog/post", "Post", "News", ""),
+        PageInfo("https://example.com/privacy", "Privacy", "Policy", ""),
+    ]
+
+    def test_only_dirty_sections_are_rendered(self):
+        """Unchanged sections should come from the cache, changed ones re-render."""
+        from formatter import SectionRenderCache, build_llms_txt, format_page_link
+
+        cache = SectionRenderCache()
+        rendered = []
+
+        def counting_format(page, section, output_url):
+            rendered.append(page.url)
+            return format_page_link(page, section, output_url)
+
+        first = build_llms_txt("https://example.com", self.PAGES, cache=cache, format_link=counting_format)
+        assert len(rendered) == 4
+
+        rendered.clear()
+        changed = list(self.PAGES)
+        changed[3] = PageInfo("https://example.com/blog/post", "Post", "Updated news", "")
+        second = build_llms_txt("https://example.com", changed, {"https://example.com/docs/a": "https://example.com/docs/a.md"},
+                                cache=cache, format_link=counting_format)
+
+        assert sorted(rendered) == ["https://example.com/blog/post", "https://example.com/docs/a",
+                                    "https://example.com/docs/b"]
+        assert second.text() == format_llms_txt("https://example.com", changed,
+                                                {"https://example.com/docs/a": "https://example.com/docs/a.md"})
+        assert second.sections["privacy"].digest == first.sections["privacy"].digest
+
+    def test_section_hashes_report_changed_sections(self):
+        """Persisted section hashes should pinpoint which sections changed."""
+        from formatter import HEADER_SECTION, build_llms_txt, changed_sections
+
+        before = build_llms_txt("https://example.com", self.PAGES).section_hashes()
+        assert set(before) == {HEADER_SECTION, "docs", "blog", "privacy"}
+        assert changed_sections(before, before) == []
+        assert changed_sections(None, before) == sorted(before)
+
+        pages = list(self.PAGES)
+        pages[0] = PageInfo("https://example.com", "Home", "New summary", "")
+        pages[2] = PageInfo("https://example.com/docs/b", "Guide B", "Doc B v2", "")
+        del pages[4]
+        after = build_llms_txt("https://example.com", pages).section_hashes()
+
+        assert changed_sections(before, after) == [HEADER_SECTION, "docs", "privacy"]
+
+    def test_cache_evicts_least_recently_used(self):
+        from formatter import SectionRenderCache
+
+        cache = SectionRenderCache(max_entries=2)
+        cache.put("a", "\n- a")
+        cache.put("b", "\n- b")
+        assert cache.get("a") == "\n- a"
+        cache.put("c", "\n- c")
+        assert cache.get("b") is None
+        assert cache.get("a") == "\n- a" and cache.get("c") == "\n- c"
@@ -0,0 +1,63 @@
+import httpx
+import pytest
+from crawler import FullTextStore, LLMCrawler, FilePageCache
+from formatter import iter_llms_full_txt
+from recrawl import full_text_lookup
+
+
+def test_store_round_trips_and_spills_to_disk():
+    with FullTextStore(max_memory_bytes=64) as store:
+        store.add("https://example.com", "short")
+        assert not store.spilled
+        store.add("https://example.com/long", "é" * 100)
+        assert store.spilled
+        assert store.get("https://example.com") == "short"
+        assert store.get("https://example.com/long") == "é" * 100
+        assert store.get("https://example.com/missing") is None
+        assert len(store) == 2
+
+
+@pytest.mark.asyncio
+async def test_crawl_keeps_text_for_llms_full(monkeypatch):
+    body = 'Meaningful body content for the page. ' * 10
+    site = {
+        "https://example.com": f"<html><head><title>Home</title></head><body><p>{body}</p><a href='/docs'>d</a></body></html>",
+        "https://example.com/docs": f"<html><head><title>Docs</title></head><body><nav>menu</nav><p>Docs {body}</p></body></html>",
+    }
+
+    def handler(request):
+        url = str(request.url).rstrip('/')
+        return httpx.Response(200, text=site[url]) if url in site else httpx.Response(404)
+
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(
+        "crawler.llm_crawler.httpx.AsyncClient",
+        lambda *args, **kwargs: real_client(transport=httpx.MockTransport(handler), **kwargs)
+    )
+
+    async def log(message: str):
+        pass
+
+    with FullTextStore() as store:
+        pages = await LLMCrawler("https://example.com", 2, 20, log, full_text=store).run()
+        full = "".join(iter_llms_full_txt("https://example.com", pages, store.get))
+
+    assert len(pages[1].snippet) < 30
+    assert f"\n## Docs\n\nSource: https://example.com/docs\n\nDocs Docs {body.strip()}\n" in full
+    assert "menu" not in full
+    assert full.startswith("# Example\n\n> ")
+
+
+def test_lookup_falls_back_to_page_cache(tmp_path):
+    from crawler.analysis import PageAnalysis
+    from crawler.page_cache import CachedPage
+
+    cache = FilePageCache(str(tmp_path))
+    cache.put(CachedPage("https://example.com/kept", '"v1"', None, PageAnalysis(True, "Kept", "", "kept text", [])))
+
+    with FullTextStore() as store:
+        store.add("https://example.com/fresh", "fresh text")
+        text_for = full_text_lookup(store, cache)
+        assert text_for("https://example.com/fresh") == "fresh text"
+        assert text_for("https://example.com/kept") == "kept text"
+        assert text_for("https://example.com/unknown") is None
@@ -0,0 +1,102 @@
+from datetime import datetime, timezone
+from crawler import PageInfo
+from incremental import (plan_incremental_crawl, merge_pages, pages_from_snapshot, pages_to_snapshot,
+                         sitemap_urls_from_snapshot)
+from sitemap_utils import SitemapPage
+
+LAST_CRAWL = datetime(2024, 6, 1, tzinfo=timezone.utc)
+OLD = datetime(2024, 5, 1)
+NEW = datetime(2024, 6, 15)
+
+
+def _page(path: str, title: str = "Old") -> PageInfo:
+    return PageInfo(f"https://example.com{path}", title, "", "")
+
+
+def _entry(path: str, lastmod: datetime | None) -> SitemapPage:
+    return SitemapPage(url=f"https://example.com{path}", lastmod=lastmod, changefreq=None, priority=None)
+
+
+PREVIOUS = [_page(""), _page("/docs/a"), _page("/docs/b"), _page("/blog/gone")]
+# Every previous page came from the sitemap unless a test says otherwise
+PREVIOUS_SITEMAP = {page.url for page in PREVIOUS}
+
+
+def test_plan_refetches_only_changed_and_new_urls():
+    sitemap = [_entry("/", OLD), _entry("/docs/a", OLD), _entry("/docs/b", NEW), _entry("/docs/c", NEW)]
+
+    plan = plan_incremental_crawl("https://example.com", PREVIOUS, sitemap, LAST_CRAWL, max_pages=10,
+                                  previous_sitemap_urls=PREVIOUS_SITEMAP)
+
+    assert [page.url for page in plan.kept] == ["https://example.com", "https://example.com/docs/a"]
+    assert plan.refetch == ["https://example.com/docs/b", "https://example.com/docs/c"]
+    assert plan.removed == ["https://example.com/blog/gone"]
+
+
+def test_plan_refetches_urls_without_lastmod():
+    sitemap = [_entry("/docs/a", None), _entry("/docs/b", OLD)]
+    plan = plan_incremental_crawl("https://example.com", PREVIOUS, sitemap, LAST_CRAWL, max_pages=10,
+                                  previous_sitemap_urls=PREVIOUS_SITEMAP)
+    assert plan.refetch == ["https://example.com/docs/a"]
+
+
+def test_plan_limits_new_urls_to_page_budget():
+    sitemap = [_entry("/docs/a", OLD), _entry("/docs/b", OLD),
+               _entry("/new/older", datetime(2024, 6, 2)), _entry("/new/newest", NEW)]
+    plan = plan_incremental_crawl("https://example.com", PREVIOUS, sitemap, LAST_CRAWL, max_pages=4,
+                                  previous_sitemap_urls=PREVIOUS_SITEMAP)
+    assert plan.refetch == ["https://example.com/new/newest"]
+
+
+def test_merge_keeps_order_replaces_changed_and_appends_new():
+    sitemap = [_entry("/docs/a", OLD), _entry("/docs/b", NEW), _entry("/docs/c", NEW)]
+    plan = plan_incremental_crawl("https://example.com", PREVIOUS, sitemap, LAST_CRAWL, max_pages=10,
+                                  previous_sitemap_urls=PREVIOUS_SITEMAP)
+    fetched = [_page("/docs/c", "New C"), _page("/docs/b", "New B")]
+
+    merged = merge_pages(PREVIOUS, plan, fetched)
+
+    assert [(page.url, page.title) for page in merged] == [
+        ("https://example.com", "Old"),
+        ("https://example.com/docs/a", "Old"),
+        ("https://example.com/docs/b", "New B"),
+        ("https://example.com/docs/c", "New C"),
+    ]
+
+
+def test_merge_keeps_previous_version_when_refetch_fails():
+    sitemap = [_entry("/docs/a", NEW), _entry("/docs/b", OLD)]
+    plan = plan_incremental_crawl("https://example.com", PREVIOUS, sitemap, LAST_CRAWL, max_pages=10,
+                                  previous_sitemap_urls=PREVIOUS_SITEMAP)
+    merged = merge_pages(PREVIOUS, plan, [])
+    assert [page.url for page in merged] == [
+        "https://example.com", "https://example.com/docs/a", "https://example.com/docs/b"
+    ]
+
+
+def test_plan_refetches_link_only_pages_instead_of_removing_them():
+    previous = PREVIOUS + [_page("/careers")]
+    sitemap = [_entry("/docs/a", OLD), _entry("/docs/b", OLD)]
+
+    plan = plan_incremental_crawl("https://example.com", previous, sitemap, LAST_CRAWL, max_pages=10,
+                                  previous_sitemap_urls=PREVIOUS_SITEMAP)
+
+    assert plan.removed == ["https://example.com/blog/gone"]
+    assert plan.refetch == ["https://example.com/careers"]
+    assert [page.url for page in merge_pages(previous, plan, [])] == [
+        "https://example.com", "https://example.com/docs/a",
+        "https://example.com/docs/b", "https://example.com/careers"
+    ]
+
+
+def test_snapshot_round_trip():
+    assert pages_from_snapshot(pages_to_snapshot(PREVIOUS)) == PREVIOUS
+    assert pages_from_snapshot(None) == []
+
+
+def test_snapshot_records_sitemap_membership():
+    snapshot = pages_to_snapshot(PREVIOUS, [_entry("/docs/a/", OLD), _entry("/blog/gone", OLD)])
+
+    assert pages_from_snapshot(snapshot) == PREVIOUS
+    assert sitemap_urls_from_snapshot(snapshot) == {"https://example.com/docs/a", "https://example.com/blog/gone"}
+    assert sitemap_urls_from_snapshot(pages_to_snapshot(PREVIOUS)) == set()
@@ -0,0 +1,480 @@
+import asyncio
+import json
+import os
+import time
+import httpx
+import pytest
+from unittest.mock import AsyncMock, patch
+from llm_processor import LLMProcessor
+from llm_processor.cache import FileResultCache, result_cache_key
+from llm_processor.client import OpenRouterClient, OpenRouterPool, TokenBucket
+from llm_processor.delta import plan_delta, apply_delta
+from llm_processor.sharding import split_document, merge_shards
+from llm_processor.validator import IncrementalValidator, extract_urls, validate_llms_txt
+
+def _document(sections: dict[str, int]) -> str:
+    lines = ["# Example", "", "> Example site", ""]
+    for name, count in sections.items():
+        lines += [f"## {name}", ""]
+        lines += [f"- [{name} {i}](https://example.com/{name.lower()}/{i}): {name} page {i}" for i in range(count)]
+        lines.append("")
+    return '\n'.join(lines)
+
+def _configured(mock_settings, min_links=1, max_links=40):
+    mock_settings.openrouter_api_key = "key"
+    mock_settings.openrouter_model = "test-model"
+    mock_settings.llm_timeout_seconds = 1.0
+    mock_settings.llm_max_retries = 1
+    mock_settings.llm_temperature = 0.3
+    mock_settings.llm_requests_per_minute = 20
+    mock_settings.llm_rate_burst = 5
+    mock_settings.llm_max_in_flight = 20
+    mock_settings.llm_shard_min_links = min_links
+    mock_settings.llm_shard_max_links = max_links
+    mock_settings.llm_cache_dir = None
+    mock_settings.llm_delta_enabled = True
+    mock_settings.llm_streaming_enabled = False
+
+def _section_input(messages: list[dict]) -> str:
+    content = messages[-1]['content']
+    return content.rsplit("INPUT:\n```markdown\n", 1)[1].split("\n```", 1)[0]
+
+def test_split_document_header_and_sections():
+    shards = split_document(_document({"Docs": 2, "Optional": 1}))
+
+    assert [shard.heading for shard in shards] == [None, "## Docs", "## Optional"]
+    assert shards[0].urls == set()
+    assert shards[1].urls == {"https://example.com/docs/0", "https://example.com/docs/1"}
+
+def test_split_document_cuts_large_sections_into_parts():
+    shards = split_document(_document({"Docs": 5}), max_links=2)
+
+    assert [shard.heading for shard in shards] == [None] + ["## Docs"] * 3
+    assert sum(len(shard.urls) for shard in shards) == 5
+
+def test_merge_shards_round_trips_document():
+    llms_txt = _document({"Docs": 5, "API": 3})
+    shards = split_document(llms_txt, max_links=2)
+
+    merged = merge_shards(shards, [shard.text for shard in shards])
+
+    assert merged.count("## Docs") == 1
+    assert extract_urls(merged) == extract_urls(llms_txt)
+    assert validate_llms_txt(merged, extract_urls(llms_txt))[0]
+
+def test_validate_section_rejects_header():
+    section = "# Title\n\n## Docs\n\n- [A](https://example.com/a): A page"
+
+    is_valid, errors = validate_llms_txt(section, {"https://example.com/a"}, require_header=False)
+
+    assert not is_valid
+    assert any("H2 heading" in error for error in errors)
+    assert any("Unexpected H1" in error for error in errors)
+
+@pytest.mark.asyncio
+async def test_sharded_enhancement_improves_each_section():
+    llms_txt = _document({"Docs": 3, "API": 3})
+
+    async def complete(self, messages):
+        section = _section_input(messages)
+        if section.startswith("# "):
+            return "# Example Docs\n\n> Documentation for the Example platform"
+        return section.replace(" page ", " guide ")
+
+    with patch('llm_processor.processor.settings') as mock_settings, \
+            patch.object(OpenRouterClient, 'complete', complete):
+        _configured(mock_settings)
+        result = await LLMProcessor().process(llms_txt)
+
+    assert result.success
+    assert result.output.startswith("# Example Docs\n")
+    assert "Docs guide 0" in result.output and "API guide 2" in result.output
+    assert result.stats["shards"] == 3
+    assert result.stats["shards_failed"] == 0
+
+@pytest.mark.asyncio
+async def test_failed_shard_falls_back_individually():
+    llms_txt = _document({"Docs": 3, "API": 3})
+
+    async def complete(self, messages):
+        section = _section_input(messages)
+        if section.startswith("## API"):
+            # Drops a URL, so this shard fails validation
+            return section.rsplit('\n', 1)[0]
+        if section.startswith("## Docs"):
+            raise RuntimeError("boom")
+        return section.replace("Example site", "The Example site")
+
+    with patch('llm_processor.processor.settings') as mock_settings, \
+            patch.object(OpenRouterClient, 'complete', complete):
+        _configured(mock_settings)
+        result = await LLMProcessor().process(llms_txt)
+
+    assert result.success
+    assert "> The Example site" in result.output
+    assert extract_urls(result.output) == extract_urls(llms_txt)
+    assert result.stats["shards_failed"] == 2
+
+@pytest.mark.asyncio
+async def test_optional_heading_is_kept():
+    llms_txt = _document({"Docs": 2, "Optional": 2})
+
+    async def complete(self, messages):
+        section = _section_input(messages)
+        return section.replace("## Optional", "## Extras")
+
+    with patch('llm_processor.processor.settings') as mock_settings, \
+            patch.object(OpenRouterClient, 'complete', complete):
+        _configured(mock_settings)
+        result = await LLMProcessor().process(llms_txt)
+
+    assert "## Optional" in result.output
+    assert "## Extras" not in result.output
+
+@pytest.mark.asyncio
+async def test_small_documents_use_single_call():
+    llms_txt = _document({"Docs": 2})
+    calls = []
+
+    async def complete(self, messages):
+        calls.append(messages)
+        return llms_txt
+
+    with patch('llm_processor.processor.settings') as mock_settings, \
+            patch.object(OpenRouterClient, 'complete', complete):
+        _configured(mock_settings, min_links=60)
+        result = await LLMProcessor().process(llms_txt)
+
+    assert result.success
+    assert len(calls) == 1
+    assert "shards" not in result.stats
+
+def test_result_cache_round_trip_and_persistence(tmp_path):
+    cache = FileResultCache(str(tmp_path))
+    key = result_cache_key([{"role": "user", "content": "x"}], "model", 0.3)
+    cache.put(key, "# Output")
+
+    assert cache.get(key) == "# Output"
+    assert FileResultCache(str(tmp_path)).get(key) == "# Output"
+
+def test_result_cache_key_covers_model_temperature_and_prompt_version():
+    messages = [{"role": "user", "content": "x"}]
+    key = result_cache_key(messages, "a", 0.3)
+
+    assert key != result_cache_key(messages, "b", 0.3)
+    assert key != result_cache_key(messages, "a", 0.5)
+    with patch('llm_processor.cache.PROMPT_VERSION', 999):
+        assert key != result_cache_key(messages, "a", 0.3)
+
+def test_result_cache_expires_entries(tmp_path):
+    cache = FileResultCache(str(tmp_path), ttl_seconds=60)
+    cache.put("old", "# Old")
+
+    with patch('llm_processor.cache.time.time', return_value=time.time() + 120):
+        assert cache.get("old") is None
+    assert not os.path.exists(tmp_path / "old.json")
+
+def test_result_cache_evicts_least_recently_used(tmp_path):
+    cache = FileResultCache(str(tmp_path), max_bytes=1000)
+    cache.put("a", "x" * 300)
+    cache.put("b", "x" * 300)
+    # Make "a" the most recently used entry
+    time.sleep(0.01)
+    assert cache.get("a") is not None
+    cache.put("c", "x" * 300)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+@pytest.mark.asyncio
+async def test_identical_input_is_served_from_cache(tmp_path):
+    llms_txt = _document({"Docs": 2})
+    calls = []
+
+    async def complete(self, messages):
+        calls.append(messages)
+        return llms_txt.replace("page", "guide")
+
+    with patch('llm_processor.processor.settings') as mock_settings, \
+            patch.object(OpenRouterClient, 'complete', complete):
+        _configured(mock_settings, min_links=60)
+        processor = LLMProcessor(cache=FileResultCache(str(tmp_path)))
+        first = await processor.process(llms_txt)
+        second = await processor.process(llms_txt)
+
+    assert len(calls) == 1
+    assert second.output == first.output
+    assert (first.stats["cache_hits"], first.stats["cache_misses"]) == (0, 1)
+    assert (second.stats["cache_hits"], second.stats["cache_misses"]) == (1, 0)
+
+@pytest.mark.asyncio
+async def test_sharded_enhancement_only_sends_changed_sections(tmp_path):
+    calls = []
+
+    async def complete(self, messages):
+        calls.append(messages)
+        return _section_input(messages)
+
+    with patch('llm_processor.processor.settings') as mock_settings, \
+            patch.object(OpenRouterClient, 'complete', complete):
+        _configured(mock_settings)
+        processor = LLMProcessor(cache=FileResultCache(str(tmp_path)))
+        await processor.process(_document({"Docs": 3, "API": 3}))
+        calls.clear()
+        result = await processor.process(_document({"Docs": 3, "API": 4}))
+
+    assert [_section_input(messages).split('\n')[0] for messages in calls] == ["## API"]
+    assert result.stats["cache_hits"] == 2
+    assert result.stats["cache_misses"] == 1
+
+def _enhance(llms_txt: str) -> str:
+    # Stand-in for the model: renames sections and rewrites descriptions
+    return llms_txt.replace("## Docs", "## Guides").replace(" page ", " guide ")
+
+def test_delta_keeps_unchanged_entries_and_places_new_ones():
+    previous = _document({"Docs": 3, "API": 2})
+    enhanced = _enhance(previous)
+    current = previous.replace(
+        "- [API 1](https://example.com/api/1): API page 1\n",
+        "- [API 1](https://example.com/api/1): API page 1\n- [API 2](https://example.com/api/2): API page 2\n"
+    ).replace("- [Docs 2](https://example.com/docs/2): Docs page 2\n", "")
+    current = current.replace("Docs page 0", "Docs page zero")
+
+    plan = plan_delta(previous, enhanced, current)
+
+    assert plan.groups == {
+        "## Guides": ["- [Docs 0](https://example.com/docs/0): Docs page zero"],
+        "## API": ["- [API 2](https://example.com/api/2): API page 2"],
+    }
+    rewritten = {
+        "https://example.com/docs/0": "- [Docs 0](https://example.com/docs/0): Start here",
+        "https://example.com/api/2": "- [API 2](https://example.com/api/2): Third API",
+    }
+    merged = apply_delta(enhanced, plan, rewritten, "# Example\n\n> Example site")
+
+    assert merged.index("Start here") < merged.index("Docs guide 1")
+    assert "docs/2" not in merged
+    assert merged.index("API guide 1") < merged.index("Third API")
+    assert extract_urls(merged) == extract_urls(current)
+
+def test_delta_puts_new_sections_before_optional():
+    previous = _document({"Docs": 1, "Optional": 1})
+    current = _document({"Docs": 1, "Blog": 1, "Optional": 1})
+
+    plan = plan_delta(previous, previous, current)
+    merged = apply_delta(previous, plan, {"https://example.com/blog/0": "- [Blog 0](https://example.com/blog/0): Post"}, "# Example")
+
+    assert merged.index("## Blog") < merged.index("## Optional")
+
+def test_delta_apply_gives_up_when_a_rewritten_line_is_missing():
+    previous = _document({"Docs": 1})
+    current = _document({"Docs": 1, "Blog": 1})
+
+    plan = plan_delta(previous, previous, current)
+
+    assert apply_delta(previous, plan, {}, "# Example") is None
+
+@pytest.mark.asyncio
+async def test_delta_falls_back_to_full_pass_on_malformed_rewritten_line(tmp_path):
+    calls = []
+
+    async def complete(self, messages):
+        calls.append(messages)
+        output = _enhance(_section_input(messages))
+        # The second run's delta call comes back with a bullet link_lines does not recognise
+        return output.replace("- [Docs 3]", "* [Docs 3]") if len(calls) == 2 else output
+
+    with patch('llm_processor.processor.settings') as mock_settings, \
+            patch.object(OpenRouterClient, 'complete', complete):
+        _configured(mock_settings, min_links=60)
+        processor = LLMProcessor(cache=FileResultCache(str(tmp_path)))
+        await processor.process(_document({"Docs": 3, "API": 2}), site_key="https://example.com")
+        second = await processor.process(_document({"Docs": 4, "API": 2}), site_key="https://example.com")
+
+    assert len(calls) == 3
+    assert second.success
+    assert "mode" not in second.stats
+    assert "https://example.com/docs/3" in extract_urls(second.output)
+
+@pytest.mark.asyncio
+async def test_recrawl_only_sends_changed_entries(tmp_path):
+    calls = []
+
+    async def complete(self, messages):
+        calls.append(messages)
+        return _enhance(_section_input(messages))
+
+    with patch('llm_processor.processor.settings') as mock_settings, \
+            patch.object(OpenRouterClient, 'complete', complete):
+        _configured(mock_settings, min_links=60)
+        processor = LLMProcessor(cache=FileResultCache(str(tmp_path)))
+        first = await processor.process(_document({"Docs": 3, "API": 2}), site_key="https://example.com")
+        calls.clear()
+        second = await processor.process(_document({"Docs": 4, "API": 2}), site_key="https://example.com")
+
+    assert len(calls) == 1
+    assert extract_urls(_section_input(calls[0])) == {"https://example.com/docs/3"}
+    assert second.stats["mode"] == "delta"
+    assert (second.stats["entries_sent"], second.stats["entries_reused"]) == (1, 5)
+    # Previously enhanced lines are carried over verbatim
+    assert first.output.split("\n- [Docs 2]")[0] in second.output
+    assert "Docs guide 3" in second.output
+
+@pytest.mark.asyncio
+async def test_delta_requires_site_key(tmp_path):
+    calls = []
+
+    async def complete(self, messages):
+        calls.append(messages)
+        return _enhance(_section_input(messages))
+
+    with patch('llm_processor.processor.settings') as mock_settings, \
+            patch.object(OpenRouterClient, 'complete', complete):
+        _configured(mock_settings, min_links=60)
+        processor = LLMProcessor(cache=FileResultCache(str(tmp_path)))
+        await processor.process(_document({"Docs": 3}))
+        result = await processor.process(_document({"Docs": 4}))
+
+    assert len(calls) == 2
+    assert "mode" not in result.stats
+
+def _completion(content: str) -> httpx.Response:
+    return httpx.Response(200, json={"choices": [{"message": {"content": content}}]})
+
+@pytest.mark.asyncio
+async def test_clients_share_pooled_connection_and_counters():
+    seen = []
+
+    def handler(request):
+        seen.append(pool.stats())
+        return _completion("```markdown\n# Done\n```")
+
+    pool = OpenRouterPool(requests_per_minute=600, burst=10, transport=httpx.MockTransport(handler))
+    first = OpenRouterClient("key", "model", pool=pool)
+    second = OpenRouterClient("key", "model", pool=pool)
+
+    results = await asyncio.gather(first.complete([]), second.complete([]))
+    http_client = pool.client
+    await pool.aclose()
+
+    assert results == ["# Done", "# Done"]
+    assert all(stats["in_flight"] >= 1 for stats in seen)
+    assert pool.stats() == {"queued": 0, "in_flight": 0, "throttled": 0}
+    assert http_client.is_closed
+
+@pytest.mark.asyncio
+async def test_retry_after_pauses_every_client():
+    responses = [httpx.Response(429, headers={"retry-after": "0"}), _completion("# Done")]
+    pool = OpenRouterPool(requests_per_minute=600, burst=10,
+                          transport=httpx.MockTransport(lambda request: responses.pop(0)))
+
+    with patch.object(pool.limiter, 'block_for', wraps=pool.limiter.block_for) as block_for:
+        result = await OpenRouterClient("key", "model", pool=pool).complete([])
+    await pool.aclose()
+
+    assert result == "# Done"
+    assert pool.throttled == 1
+    block_for.assert_called_once_with(0)
+
+@pytest.mark.asyncio
+async def test_token_bucket_blocks_all_callers_after_throttle():
+    bucket = TokenBucket(requests_per_minute=6000, burst=10)
+    bucket.block_for(0.05)
+
+    start = time.monotonic()
+    await asyncio.gather(bucket.acquire(), bucket.acquire())
+
+    assert time.monotonic() - start >= 0.05
+
+@pytest.mark.asyncio
+async def test_token_bucket_limits_rate_after_burst():
+    bucket = TokenBucket(requests_per_minute=1200, burst=2)
+
+    start = time.monotonic()
+    for _ in range(4):
+        await bucket.acquire()
+
+    # Two tokens come from the burst, the other two refill at 20/s
+    assert time.monotonic() - start >= 0.09
+
+def _sse(lines: list[str], sent: list[str]):
+    async def body():
+        yield b": OPENROUTER PROCESSING\n\n"
+        for line in lines:
+            sent.append(line)
+            # Split each line across two deltas, as streaming models do
+            for piece in (line[:5], line[5:] + "\n"):
+                yield f"data: {json.dumps({'choices': [{'delta': {'content': piece}}]})}\n\n".encode()
+        yield b"data: [DONE]\n\n"
+    return body()
+
+@pytest.mark.asyncio
+async def test_streaming_completion_reports_each_line():
+    lines = ["```markdown", "# Example", "", "> Example site", "```"]
+    pool = OpenRouterPool(transport=httpx.MockTransport(lambda request: httpx.Response(200, content=_sse(lines, []))))
+    seen = []
+
+    async def on_line(line):
+        seen.append(line)
+        return None
+
+    result = await OpenRouterClient("key", "model", pool=pool).complete_streaming([], on_line)
+    await pool.aclose()
+
+    assert result == "# Example\n\n> Example site"
+    assert seen == lines
+    assert pool.stats()["in_flight"] == 0
+
+@pytest.mark.asyncio
+async def test_streaming_aborts_on_first_invalid_line():
+    llms_txt = _document({"Docs": 3})
+    output = llms_txt.replace("https://example.com/docs/0", "https://example.com/made-up").split('\n')
+    sent, partials = [], []
+    pool = OpenRouterPool(transport=httpx.MockTransport(lambda request: httpx.Response(200, content=_sse(output, sent))))
+
+    async def partial(line):
+        partials.append(line)
+
+    with patch('llm_processor.processor.settings') as mock_settings, \
+            patch('llm_processor.processor.get_openrouter_pool', return_value=pool):
+        _configured(mock_settings, min_links=60)
+        mock_settings.llm_streaming_enabled = True
+        result = await LLMProcessor(partial_fn=partial).process(llms_txt)
+    await pool.aclose()
+
+    assert not result.success
+    assert "New URLs added" in result.error
+    assert result.output == llms_txt
+    # The request was cancelled before the rest of the section was generated
+    assert len(sent) < len(output)
+    assert [line for line in partials if line] == ["# Example", "> Example site", "## Docs"]
+
+def test_incremental_validator_section_checks():
+    validator = IncrementalValidator({"https://example.com/a"}, require_header=False)
+
+    assert validator.feed("## Docs") is None
+    assert validator.feed("- [A](https://example.com/a): A page") is None
+    assert "Invalid header level" in validator.feed("### Deep")
+    assert "Invalid link format" in validator.feed("- [A](https://example.com/a)")
+    assert "Unexpected H1" in validator.feed("# Title")
+    assert "H2 heading" in IncrementalValidator(set(), require_header=False).feed("# Title")
+
+
+@pytest.mark.asyncio
+async def test_streaming_retries_malformed_event():
+    bodies = [
+        httpx.Response(200, content=b"data: {not json\n\n"),
+        httpx.Response(200, content=_sse(["# Example"], [])),
+    ]
+    pool = OpenRouterPool(transport=httpx.MockTransport(lambda request: bodies.pop(0)))
+
+    async def on_line(line):
+        return None
+
+    with patch('llm_processor.client.asyncio.sleep', new=AsyncMock()):
+        result = await OpenRouterClient("key", "model", pool=pool).complete_streaming([], on_line)
+    await pool.aclose()
+
+    assert result == "# Example"
+    assert bodies == []
@@ -0,0 +1,78 @@
+import httpx
+import pytest
+from crawler import LLMCrawler, FilePageCache
+from crawler.analysis import PageAnalysis
+from crawler.page_cache import CachedPage
+
+HOME = "<html><head><title>Home</title></head><body><p>" + "Welcome to the documentation. " * 20 + "</p><a href='/docs'>Docs</a></body></html>"
+DOCS = "<html><head><title>Docs</title></head><body><p>" + "Reference material for the API. " * 20 + "</p></body></html>"
+
+
+def _cached(url: str, text: str = "body") -> CachedPage:
+    return CachedPage(url=url, etag='"v1"', last_modified=None,
+                      analysis=PageAnalysis(meaningful=True, title="T", description="", text=text, links=[]))
+
+
+def test_file_cache_round_trip_and_persistence(tmp_path):
+    cache = FilePageCache(str(tmp_path))
+    cache.put(_cached("https://example.com/a"))
+
+    reopened = FilePageCache(str(tmp_path))
+    entry = reopened.get("https://example.com/a")
+    assert entry.etag == '"v1"'
+    assert entry.analysis.title == "T"
+    assert reopened.get("https://example.com/missing") is None
+
+
+def test_file_cache_evicts_least_recently_used(tmp_path):
+    import os
+    import time
+
+    cache = FilePageCache(str(tmp_path), max_bytes=1000)
+    cache.put(_cached("https://example.com/a", "x" * 300))
+    cache.put(_cached("https://example.com/b", "x" * 300))
+    # Make "a" the most recently used entry
+    time.sleep(0.01)
+    assert cache.get("https://example.com/a") is not None
+    cache.put(_cached("https://example.com/c", "x" * 300))
+
+    assert cache.get("https://example.com/b") is None
+    assert cache.get("https://example.com/a") is not None
+    assert cache.get("https://example.com/c") is not None
+    assert sum(os.path.getsize(tmp_path / name) for name in os.listdir(tmp_path)) <= 1000
+
+
+@pytest.mark.asyncio
+async def test_recrawl_reuses_cached_pages_on_304(tmp_path, monkeypatch):
+    site = {"https://example.com": HOME, "https://example.com/docs": DOCS}
+    requests = []
+
+    def handler(request):
+        url = str(request.url).rstrip('/')
+        requests.append((url, request.headers.get('if-none-match')))
+        if url not in site:
+            return httpx.Response(404)
+        etag = f'"{hash(site[url])}"'
+        if request.headers.get('if-none-match') == etag:
+            return httpx.Response(304, headers={'etag': etag})
+        return httpx.Response(200, text=site[url], headers={'etag': etag})
+
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(
+        "crawler.llm_crawler.httpx.AsyncClient",
+        lambda *args, **kwargs: real_client(transport=httpx.MockTransport(handler), **kwargs)
+    )
+
+    async def log(message: str):
+        pass
+
+    cache = FilePageCache(str(tmp_path))
+    first = await LLMCrawler("https://example.com", 2, 100, log, page_cache=cache).run()
+
+    requests.clear()
+    crawler = LLMCrawler("https://example.com", 2, 100, log, page_cache=cache)
+    second = await crawler.run()
+
+    assert second == first
+    assert crawler.cache_hits == 2
+    assert all(etag is not None for url, etag in requests if not url.endswith(('.xml', '.txt')))
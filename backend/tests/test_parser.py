@@ -0,0 +1,130 @@
+import pytest
+from bs4 import BeautifulSoup
+import crawler.parser as parser
+from crawler.analysis import analyze_html
+from crawler.parser import resolve_parser, FALLBACK_PARSER
+from crawler.scout import extract_links
+from crawler.scraping_browser_client import has_meaningful_content
+from crawler.text import extract_title, extract_description, extract_text
+
+FAST_PARSER = 'lxml'
+
+CRAWLER_FIXTURE = '''
+    <html>
+        <body>
+            <a href="/about">About</a>
+            <a href="https://example.com/contact">Contact</a>
+            <a href="https://other.com/external">External</a>
+        </body>
+    </html>
+    '''
+
+DOCS_PAGE = '''<!DOCTYPE html>
+<html lang="en">
+<head>
+  <meta charset="utf-8">
+  <title>Quickstart &mdash; Example Docs</title>
+  <meta name="description" content="  Get up and running with the Example SDK in five minutes.  ">
+  <meta property="og:description" content="OG fallback">
+  <link rel="stylesheet" href="/static/site.css">
+  <style>body { font-family: sans-serif; }</style>
+  <script>window.__DATA__ = {"a": "<b>not text</b>"};</script>
+</head>
+<body>
+  <header><a href="/">Home</a><a href="/docs/">Docs</a></header>
+  <nav>
+    <ul><li><a href="/docs/install">Install</a><li><a href="/docs/config#env">Config</a></ul>
+  </nav>
+  <main>
+    <h1>Quickstart</h1>
+    <p>Install the package with <code>pip install example</code> and import it.&nbsp;It works on
+       Python&nbsp;3.11+.</p>
+    <table><tr><td>Option<td>Default</tr><tr><td>timeout<td>30</table>
+    <p>Read the <a href="../api/reference.html?lang=py">API reference</a> or the
+       <a href="https://github.com/example/sdk">source</a>.</p>
+    <a href="/files/guide.pdf">PDF</a>
+    <a href="/login">Sign in</a>
+  </main>
+  <footer><a href="/privacy">Privacy</a> &copy; 2024 Example</footer>
+</body>
+</html>'''
+
+BLOG_PAGE = '''<html><head><meta property="og:description" content="Release notes for v2">
+<title>
+   What's new in v2
+</title></head>
+<body><div class="post"><h2>Highlights</h2><p>Faster builds, smaller bundles and a new plugin API.
+<p>Unclosed paragraphs are common in hand-written HTML.<div>Nested <span>inline <em>markup</em></span></div>
+<a href=/blog/v1>Previous release</a> <a href='/blog/v3'>Next release</a>
+<img src="/cover.png"><br/>
+''' + '<p>Filler sentence to push the page over the content threshold.</p>' * 6 + '''
+</div></body></html>'''
+
+NO_TITLE_PAGE = '''<html><body><h1> Fallback Heading </h1>
+<p>''' + 'Plenty of body text without a title element. ' * 10 + '''</p></body></html>'''
+
+BLOCKED_PAGE = '''<html><head><title>Just a moment...</title></head><body>
+<p>Checking your browser before accessing the site. Cloudflare security check in progress.</p>
+''' + '<p>Please wait while we verify your connection.</p>' * 5 + '</body></html>'
+
+TEMPLATE_PAGE = '''<html><body><div id="app">{{ message }}</div>''' + '<p>shell</p>' * 60 + '</body></html>'
+
+PAGES = [CRAWLER_FIXTURE, DOCS_PAGE, BLOG_PAGE, NO_TITLE_PAGE, BLOCKED_PAGE, TEMPLATE_PAGE]
+
+requires_fast_parser = pytest.mark.skipif(
+    resolve_parser(FAST_PARSER) != FAST_PARSER, reason=f"{FAST_PARSER} not installed"
+)
+
+@pytest.fixture
+def use_parser(monkeypatch):
+    def select(name: str):
+        monkeypatch.setattr(parser, "_resolved_parser", name)
+    return select
+
+def _extract_all(soup: BeautifulSoup, url: str) -> dict:
+    return {
+        "meaningful": has_meaningful_content(soup),
+        "title": extract_title(soup),
+        "description": extract_description(soup),
+        "links": sorted(extract_links(soup, url)),
+        "text": extract_text(soup),
+    }
+
+def test_unknown_parser_falls_back():
+    assert resolve_parser("no-such-parser") == FALLBACK_PARSER
+    assert resolve_parser(FALLBACK_PARSER) == FALLBACK_PARSER
+
+def test_parse_html_uses_selected_parser(use_parser):
+    use_parser(FALLBACK_PARSER)
+    assert parser.parse_html("<p>x</p>").builder.NAME == FALLBACK_PARSER
+
+@requires_fast_parser
+@pytest.mark.parametrize("html", PAGES)
+def test_extractors_match_fallback_parser(html):
+    url = "https://example.com/docs/quickstart"
+    expected = _extract_all(BeautifulSoup(html, FALLBACK_PARSER), url)
+    actual = _extract_all(BeautifulSoup(html, FAST_PARSER), url)
+    assert actual == expected
+
+@requires_fast_parser
+@pytest.mark.parametrize("html", PAGES)
+def test_analyze_html_matches_fallback_parser(html, use_parser):
+    url = "https://example.com/docs/quickstart"
+    use_parser(FALLBACK_PARSER)
+    expected = analyze_html(html, url)
+    use_parser(FAST_PARSER)
+    actual = analyze_html(html, url)
+    assert actual.meaningful == expected.meaningful
+    assert actual.title == expected.title
+    assert actual.description == expected.description
+    assert actual.text == expected.text
+    assert sorted(actual.links) == sorted(expected.links)
+
+@requires_fast_parser
+def test_raw_html_helpers_match_fallback_parser(use_parser):
+    url = "https://example.com"
+    use_parser(FALLBACK_PARSER)
+    expected = [(has_meaningful_content(html), sorted(extract_links(html, url))) for html in PAGES]
+    use_parser(FAST_PARSER)
+    actual = [(has_meaningful_content(html), sorted(extract_links(html, url))) for html in PAGES]
+    assert actual == expected
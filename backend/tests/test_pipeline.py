@@ -0,0 +1,88 @@
+import asyncio
+import httpx
+import pytest
+from crawler import LLMCrawler, PageInfo
+from formatter import format_llms_txt, get_md_url_map
+from pipeline import LlmsTxtPipeline
+from tests.helpers import page_html, no_log
+
+
+SITE = {
+    "https://example.com": page_html("Home", ["/docs/intro", "/docs/api", "/blog/post", "/privacy"]),
+    "https://example.com/docs/intro": page_html("Getting Started", ["/docs/api"]),
+    "https://example.com/docs/api": page_html("API Reference", []),
+    "https://example.com/blog/post": page_html("Post", []),
+    "https://example.com/privacy": page_html("Privacy", []),
+}
+MD_URLS = {"https://example.com/docs/intro.md", "https://example.com/docs/api.md"}
+
+
+def _patch_site(monkeypatch, events: list):
+    async def handler(request):
+        url = str(request.url).rstrip('/')
+        events.append((request.method, url))
+        await asyncio.sleep(0.01)
+        if request.method == 'HEAD':
+            if url in MD_URLS:
+                return httpx.Response(200, headers={'content-type': 'text/markdown'})
+            return httpx.Response(404)
+        if url in SITE:
+            return httpx.Response(200, text=SITE[url])
+        return httpx.Response(404)
+
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(
+        "httpx.AsyncClient",
+        lambda *args, **kwargs: real_client(transport=httpx.MockTransport(handler), **kwargs)
+    )
+
+
+@pytest.mark.asyncio
+async def test_pipeline_matches_staged_formatting(monkeypatch):
+    events = []
+    _patch_site(monkeypatch, events)
+
+    async with LlmsTxtPipeline("https://example.com", miss_threshold=0) as pipeline:
+        crawler = LLMCrawler("https://example.com", 5, 100, no_log, on_page=pipeline.add)
+        pages = await crawler.run()
+        document, md_url_map = await pipeline.finish(pages)
+
+    staged_map = await get_md_url_map(pages, miss_threshold=0)
+    assert md_url_map == staged_map
+    assert document.text() == format_llms_txt("https://example.com", pages, staged_map)
+    assert "https://example.com/docs/api.md" in document.text()
+
+
+@pytest.mark.asyncio
+async def test_pipeline_probes_while_crawl_continues(monkeypatch):
+    events = []
+    _patch_site(monkeypatch, events)
+
+    async with LlmsTxtPipeline("https://example.com") as pipeline:
+        crawler = LLMCrawler("https://example.com", 5, 100, no_log, on_page=pipeline.add)
+        pages = await crawler.run()
+        crawl_done = len(events)
+        await pipeline.finish(pages)
+
+    first_probe = next(i for i, (method, _) in enumerate(events) if method == 'HEAD')
+    last_fetch = max(i for i, (method, url) in enumerate(events) if method == 'GET' and url in SITE)
+    assert first_probe < last_fetch
+    # At most the probe for the final page is left once the crawl returns
+    assert len(events) - crawl_done <= 1
+
+
+@pytest.mark.asyncio
+async def test_pipeline_formats_pages_it_was_not_handed(monkeypatch):
+    events = []
+    _patch_site(monkeypatch, events)
+    pages = [
+        PageInfo("https://example.com", "Home", "Homepage", ""),
+        PageInfo("https://example.com/docs/api", "API Reference", "Endpoints", ""),
+    ]
+
+    async with LlmsTxtPipeline("https://example.com") as pipeline:
+        pipeline.add(PageInfo("https://example.com/docs/api", "Old title", "", ""))
+        document, _ = await pipeline.finish(pages)
+
+    assert document.text() == format_llms_txt("https://example.com", pages,
+                                     {"https://example.com/docs/api": "https://example.com/docs/api.md"})
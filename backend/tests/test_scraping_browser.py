@@ -0,0 +1,173 @@
+import pytest
+from playwright.async_api import Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError
+from crawler.scraping_browser_client import ScrapingBrowserClient
+
+PAGE_HTML = "<html><body><p>" + "Rendered content from the browser. " * 20 + "</p></body></html>"
+
+
+class FakePage:
+    def __init__(self, browser):
+        self.browser = browser
+        self.closed = False
+        self.visits = []
+        self.route_handler = None
+        self.ready_waits = []
+
+    async def goto(self, url, **kwargs):
+        if not self.browser.connected:
+            raise PlaywrightError("Target page, context or browser has been closed")
+        if self.browser.drop_next:
+            self.browser.drop_next = False
+            self.browser.connected = False
+            raise PlaywrightError("Browser has been disconnected")
+        self.visits.append(url)
+
+    async def route(self, pattern, handler):
+        self.route_handler = handler
+
+    async def wait_for_function(self, expression, arg=None, timeout=None):
+        self.ready_waits.append(("function", arg, timeout))
+
+    async def wait_for_selector(self, selector, timeout=None):
+        if selector == "#never":
+            raise PlaywrightTimeoutError("Timeout exceeded")
+        self.ready_waits.append(("selector", selector, timeout))
+
+    async def content(self):
+        return PAGE_HTML
+
+    def is_closed(self):
+        return self.closed or not self.browser.connected
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.connected = True
+        self.drop_next = False
+        self.pages = []
+
+    def is_connected(self):
+        return self.connected
+
+    async def new_page(self):
+        page = FakePage(self)
+        self.pages.append(page)
+        return page
+
+    async def close(self):
+        self.connected = False
+
+
+class FakePlaywright:
+    def __init__(self):
+        self.browsers = []
+        self.stopped = False
+        self.chromium = self
+
+    async def connect_over_cdp(self, endpoint):
+        browser = FakeBrowser()
+        self.browsers.append(browser)
+        return browser
+
+    async def start(self):
+        return self
+
+    async def stop(self):
+        self.stopped = True
+
+
+@pytest.fixture
+def fake_playwright(monkeypatch):
+    playwright = FakePlaywright()
+    monkeypatch.setattr("crawler.scraping_browser_client.async_playwright", lambda: playwright)
+    return playwright
+
+
+@pytest.mark.asyncio
+async def test_fetch_reuses_connection_and_tab(fake_playwright):
+    client = ScrapingBrowserClient("customer", max_tabs=2)
+
+    for i in range(3):
+        assert await client.fetch(f"https://example.com/{i}") == PAGE_HTML
+
+    assert len(fake_playwright.browsers) == 1
+    assert len(fake_playwright.browsers[0].pages) == 1
+    stats = client.get_usage_stats()
+    assert stats["requests"] == 3
+    assert stats["successful"] == 3
+    assert stats["connections"] == 1
+
+    await client.close()
+    assert fake_playwright.stopped
+    assert not fake_playwright.browsers[0].connected
+
+
+@pytest.mark.asyncio
+async def test_fetch_reconnects_after_disconnect(fake_playwright):
+    client = ScrapingBrowserClient("customer")
+
+    await client.fetch("https://example.com/a")
+    fake_playwright.browsers[0].drop_next = True
+    assert await client.fetch("https://example.com/b") == PAGE_HTML
+
+    assert len(fake_playwright.browsers) == 2
+    assert fake_playwright.browsers[1].pages[0].visits == ["https://example.com/b"]
+    assert client.get_usage_stats()["requests"] == 2
+
+
+@pytest.mark.asyncio
+async def test_fetch_bounds_open_tabs(fake_playwright):
+    import asyncio
+
+    client = ScrapingBrowserClient("customer", max_tabs=2)
+    await asyncio.gather(*[client.fetch(f"https://example.com/{i}") for i in range(6)])
+
+    assert len(fake_playwright.browsers[0].pages) <= 2
+
+
+class FakeRoute:
+    def __init__(self, resource_type):
+        self.request = type("Request", (), {"resource_type": resource_type})()
+        self.outcome = None
+
+    async def abort(self):
+        self.outcome = "aborted"
+
+    async def continue_(self):
+        self.outcome = "continued"
+
+
+@pytest.mark.asyncio
+async def test_fetch_blocks_unneeded_resources(fake_playwright):
+    client = ScrapingBrowserClient("customer")
+    await client.fetch("https://example.com")
+
+    handler = fake_playwright.browsers[0].pages[0].route_handler
+    routes = {kind: FakeRoute(kind) for kind in ["image", "font", "media", "stylesheet", "document", "script"]}
+    for route in routes.values():
+        await handler(route)
+
+    assert routes["image"].outcome == "aborted"
+    assert routes["stylesheet"].outcome == "aborted"
+    assert routes["document"].outcome == "continued"
+    assert routes["script"].outcome == "continued"
+    assert client.get_usage_stats()["blocked_requests"] == 4
+
+
+@pytest.mark.asyncio
+async def test_fetch_waits_for_readiness_instead_of_fixed_delay(fake_playwright):
+    client = ScrapingBrowserClient("customer", ready_timeout_ms=1500)
+    await client.fetch("https://example.com/a")
+    await client.fetch("https://example.com/b", ready_selector="main")
+    assert await client.fetch("https://example.com/c", ready_selector="#never") == PAGE_HTML
+
+    page = fake_playwright.browsers[0].pages[0]
+    assert page.ready_waits == [("function", 200, 1500), ("selector", "main", 1500)]
+
+    stats = client.get_usage_stats()
+    assert stats["requests"] == 3
+    assert stats["cost_per_page_usd"] == 0.02
+    assert stats["avg_latency_seconds"] >= 0
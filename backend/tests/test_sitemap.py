@@ -0,0 +1,349 @@
+import gzip
+import httpx
+import pytest
+from datetime import datetime
+from sitemap_utils import (SitemapPage, SitemapIndexEntry, SitemapStreamParser, discover_sitemap,
+                           parse_sitemap, parse_sitemap_content)
+
+
+def _urlset(count: int, start: int = 0, namespaced: bool = True) -> bytes:
+    ns = ' xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"' if namespaced else ''
+    urls = ''.join(
+        f"<url><loc>https://example.com/page{i}</loc><lastmod>2024-01-{(i % 28) + 1:02d}</lastmod>"
+        f"<priority>0.{i % 10}</priority></url>"
+        for i in range(start, start + count)
+    )
+    return f'<?xml version="1.0" encoding="UTF-8"?><urlset{ns}>{urls}</urlset>'.encode()
+
+
+def _index(children: list[str]) -> bytes:
+    entries = ''.join(f"<sitemap><loc>{child}</loc><lastmod>2024-02-01</lastmod></sitemap>" for child in children)
+    return (f'<?xml version="1.0" encoding="UTF-8"?>'
+            f'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</sitemapindex>').encode()
+
+
+def test_parses_pages_and_index_entries():
+    pages = parse_sitemap_content(_urlset(3))
+    assert pages[0] == SitemapPage("https://example.com/page0", datetime(2024, 1, 1), None, 0.0)
+    assert len(pages) == 3
+
+    entries = parse_sitemap_content(_index(["https://example.com/a.xml"]))
+    assert entries == [SitemapIndexEntry("https://example.com/a.xml", datetime(2024, 2, 1))]
+
+
+def test_parses_sitemaps_without_namespace():
+    assert [page.url for page in parse_sitemap_content(_urlset(2, namespaced=False))] == [
+        "https://example.com/page0", "https://example.com/page1"
+    ]
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_streams_records_in_small_chunks(compress):
+    content = _urlset(200)
+    if compress:
+        content = gzip.compress(content)
+
+    parser = SitemapStreamParser()
+    records = []
+    max_buffered = 0
+    for i in range(0, len(content), 7):
+        records.extend(parser.feed(content[i:i + 7]))
+        max_buffered = max(max_buffered, len(parser._root) if parser._root is not None else 0)
+    records.extend(parser.close())
+
+    assert [page.url for page in records] == [f"https://example.com/page{i}" for i in range(200)]
+    # Completed <url> elements are dropped as soon as they are read
+    assert max_buffered <= 2
+
+
+@pytest.mark.asyncio
+async def test_parse_sitemap_follows_gzipped_children(monkeypatch):
+    responses = {
+        "https://example.com/sitemap_index.xml": _index([
+            "https://example.com/docs.xml.gz", "https://example.com/blog.xml", "https://example.com/missing.xml"
+        ]),
+        "https://example.com/docs.xml.gz": gzip.compress(_urlset(3)),
+        "https://example.com/blog.xml": _urlset(2, start=3),
+    }
+
+    def handler(request):
+        body = responses.get(str(request.url))
+        return httpx.Response(200, content=body) if body else httpx.Response(404)
+
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(
+        "sitemap_utils.httpx.AsyncClient",
+        lambda *args, **kwargs: real_client(transport=httpx.MockTransport(handler), **kwargs)
+    )
+
+    info = await parse_sitemap("https://example.com/sitemap_index.xml")
+
+    assert info.total_pages == 5
+    assert sorted(page.url for page in info.pages) == [f"https://example.com/page{i}" for i in range(5)]
+    assert info.newest_lastmod == datetime(2024, 1, 5)
+
+
+def _patch_sitemap_client(monkeypatch, responses: dict, delay: float = 0.0, stats: dict | None = None):
+    import asyncio
+    stats = stats if stats is not None else {}
+    stats.setdefault('clients', 0)
+
+    async def handler(request):
+        stats.setdefault('requested', []).append(str(request.url))
+        stats['active'] = stats.get('active', 0) + 1
+        stats['peak'] = max(stats.get('peak', 0), stats['active'])
+        try:
+            await asyncio.sleep(delay)
+            body = responses.get(str(request.url))
+            return httpx.Response(200, content=body) if body else httpx.Response(404)
+        finally:
+            stats['active'] -= 1
+
+    real_client = httpx.AsyncClient
+
+    def make_client(*args, **kwargs):
+        stats['clients'] += 1
+        return real_client(transport=httpx.MockTransport(handler), **kwargs)
+
+    monkeypatch.setattr("sitemap_utils.httpx.AsyncClient", make_client)
+    return stats
+
+
+@pytest.mark.asyncio
+async def test_parse_sitemap_expands_children_concurrently_on_one_client(monkeypatch):
+    import sitemap_utils
+
+    children = [f"https://example.com/child{i}.xml" for i in range(20)]
+    responses = {"https://example.com/sitemap.xml": _index(children)}
+    for i, child in enumerate(children):
+        responses[child] = _urlset(2, start=i * 2)
+    stats = _patch_sitemap_client(monkeypatch, responses, delay=0.01)
+
+    info = await parse_sitemap("https://example.com/sitemap.xml")
+
+    assert info.total_pages == 40
+    assert stats['clients'] == 1
+    assert 1 < stats['peak'] <= sitemap_utils.SITEMAP_CONCURRENCY
+
+
+@pytest.mark.asyncio
+async def test_iter_sitemap_pages_closes_early_with_full_queue():
+    import asyncio
+    from contextlib import aclosing
+    from sitemap_utils import iter_sitemap_pages
+
+    children = [f"https://example.com/child{i}.xml" for i in range(6)]
+    responses = {"https://example.com/sitemap.xml": _index(children)}
+    for i, child in enumerate(children):
+        responses[child] = _urlset(400, start=i * 400)
+
+    def handler(request):
+        return httpx.Response(200, content=responses[str(request.url)])
+
+    async def consume_ten():
+        seen = 0
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            async with aclosing(iter_sitemap_pages(client, "https://example.com/sitemap.xml")) as pages:
+                async for _ in pages:
+                    # Let the producers fill the bounded queue before closing
+                    await asyncio.sleep(0.01)
+                    seen += 1
+                    if seen == 10:
+                        break
+        return seen
+
+    assert await asyncio.wait_for(consume_ten(), timeout=5) == 10
+
+
+@pytest.mark.asyncio
+async def test_parse_sitemap_stops_cycles_and_deep_nesting(monkeypatch):
+    responses = {
+        "https://example.com/sitemap.xml": _index(["https://example.com/a.xml", "https://example.com/sitemap.xml"]),
+        "https://example.com/a.xml": _index(["https://example.com/b.xml", "https://example.com/sitemap.xml"]),
+        "https://example.com/b.xml": _index(["https://example.com/c.xml", "https://example.com/b-pages.xml",
+                                             "https://example.com/a.xml"]),
+        "https://example.com/b-pages.xml": _urlset(1),
+        "https://example.com/c.xml": _index(["https://example.com/d.xml"]),
+        "https://example.com/d.xml": _urlset(1, start=50),
+    }
+    stats = _patch_sitemap_client(monkeypatch, responses)
+
+    info = await parse_sitemap("https://example.com/sitemap.xml")
+
+    # d.xml sits four levels below the root and is never fetched
+    assert [page.url for page in info.pages] == ["https://example.com/page0"]
+    assert info.total_pages == 1
+    # Each sitemap is fetched once even though a.xml and b.xml link back up the tree
+    assert sorted(stats['requested']) == sorted([
+        "https://example.com/sitemap.xml", "https://example.com/a.xml", "https://example.com/b.xml",
+        "https://example.com/b-pages.xml", "https://example.com/c.xml",
+    ])
+
+
+def _sentinel_client(responses: dict, etags: dict | None = None, log: list | None = None):
+    etags = etags or {}
+    log = log if log is not None else []
+
+    def handler(request):
+        url = str(request.url)
+        log.append((url, request.headers.get('if-none-match')))
+        if url in etags and request.headers.get('if-none-match') == etags[url]:
+            return httpx.Response(304)
+        body = responses.get(url)
+        if body is None:
+            return httpx.Response(404)
+        headers = {'etag': etags[url]} if url in etags else {}
+        return httpx.Response(200, content=body, headers=headers)
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+@pytest.mark.asyncio
+async def test_sentinel_uses_conditional_get():
+    from sitemap_utils import has_sitemap_changed
+
+    url = "https://example.com/sitemap.xml"
+    log = []
+    async with _sentinel_client({url: _urlset(3)}, etags={url: '"v1"'}, log=log) as client:
+        first = await has_sitemap_changed(url, datetime(2024, 6, 1), client=client)
+        second = await has_sitemap_changed(url, datetime(2024, 6, 1), first.validators, client=client)
+
+    assert not first.changed
+    assert first.validators == {url: {'etag': '"v1"'}}
+    assert not second.changed
+    assert second.validators == first.validators
+    assert log[1] == (url, '"v1"')
+
+
+@pytest.mark.asyncio
+async def test_sentinel_stops_at_first_newer_lastmod():
+    from sitemap_utils import has_sitemap_changed
+
+    root = "https://example.com/sitemap.xml"
+    children = [f"https://example.com/child{i}.xml" for i in range(3)]
+    responses = {root: _index(children)}
+    for child in children:
+        responses[child] = _urlset(3)
+    log = []
+    async with _sentinel_client(responses, log=log) as client:
+        result = await has_sitemap_changed(root, datetime(2024, 1, 2), client=client)
+
+    assert result.changed
+    assert result.newest_lastmod == datetime(2024, 1, 3)
+    assert [url for url, _ in log] == [root, children[0]]
+
+
+@pytest.mark.asyncio
+async def test_sentinel_skips_children_older_than_last_check():
+    from sitemap_utils import has_sitemap_changed
+
+    root = "https://example.com/sitemap.xml"
+    child = "https://example.com/child.xml"
+    log = []
+    async with _sentinel_client({root: _index([child]), child: _urlset(3)}, log=log) as client:
+        result = await has_sitemap_changed(root, datetime(2024, 3, 1), client=client)
+
+    assert not result.changed
+    assert [url for url, _ in log] == [root]
+
+
+@pytest.mark.asyncio
+async def test_sentinel_without_lastmod_reports_change():
+    from sitemap_utils import has_sitemap_changed
+
+    url = "https://example.com/sitemap.xml"
+    body = b'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"><url><loc>https://example.com/a</loc></url></urlset>'
+    async with _sentinel_client({url: body}) as client:
+        result = await has_sitemap_changed(url, datetime(2024, 3, 1), client=client)
+
+    assert result.changed
+    assert result.newest_lastmod is None
+
+
+def _recording_client(responses: dict, requested: list):
+    def handler(request):
+        requested.append(str(request.url))
+        body = responses.get(str(request.url))
+        return httpx.Response(200, content=body) if body else httpx.Response(404)
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+@pytest.mark.asyncio
+async def test_discover_sitemap_follows_robots_directive():
+    responses = {
+        "https://example.com/robots.txt": b"User-agent: *\nDisallow: /admin\nSitemap: https://example.com/maps/main.xml\n",
+        "https://example.com/maps/main.xml": _urlset(3),
+        "https://example.com/sitemap.xml": _urlset(1, start=10),
+    }
+    requested = []
+    async with _recording_client(responses, requested) as client:
+        discovery = await discover_sitemap(client, "https://example.com/")
+
+    assert discovery.sitemap_url == "https://example.com/maps/main.xml"
+    assert [page.url for page in discovery.pages] == [f"https://example.com/page{i}" for i in range(3)]
+    assert discovery.newest_lastmod == datetime(2024, 1, 3)
+    assert "https://example.com/sitemap.xml" not in requested
+
+
+@pytest.mark.asyncio
+async def test_discover_sitemap_tries_known_url_before_robots():
+    responses = {"https://example.com/sitemap_index.xml": _urlset(2)}
+    requested = []
+    async with _recording_client(responses, requested) as client:
+        known = await discover_sitemap(client, "https://example.com",
+                                       known_url="https://example.com/sitemap_index.xml")
+        assert requested == ["https://example.com/sitemap_index.xml"]
+
+        requested.clear()
+        fallback = await discover_sitemap(client, "https://example.com", limit=1)
+        missing = await discover_sitemap(client, "https://other.example")
+
+    assert known.sitemap_url == fallback.sitemap_url == "https://example.com/sitemap_index.xml"
+    assert len(fallback.pages) == 1
+    assert requested[:2] == ["https://example.com/robots.txt", "https://example.com/sitemap.xml"]
+    assert missing.sitemap_url is None and missing.pages == []
+
+
+@pytest.mark.asyncio
+async def test_discover_sitemap_stops_at_limit_and_full_scan_finds_newest_lastmod():
+    from sitemap_utils import has_sitemap_changed
+
+    url = "https://example.com/sitemap.xml"
+    responses = {url: _index(["https://example.com/a.xml", "https://example.com/b.xml"]),
+                 "https://example.com/a.xml": _urlset(5),
+                 "https://example.com/b.xml": _urlset(5, start=5)}
+    async with _recording_client(responses, []) as client:
+        discovery = await discover_sitemap(client, "https://example.com", limit=2)
+        check = await has_sitemap_changed(url, None, client=client)
+
+    assert len(discovery.pages) == 2
+    assert discovery.newest_lastmod == datetime(2024, 1, 2)
+    assert check.newest_lastmod == datetime(2024, 1, 10)
+
+
+@pytest.mark.asyncio
+async def test_sentinel_revalidates_children_of_unchanged_index():
+    from sitemap_utils import has_sitemap_changed
+
+    root = "https://example.com/sitemap_index.xml"
+    child = "https://example.com/child.xml"
+    index = (b'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+             b'<sitemap><loc>https://example.com/child.xml</loc></sitemap></sitemapindex>')
+    responses = {root: index, child: _urlset(3)}
+    etags = {root: '"index-v1"', child: '"child-v1"'}
+    log = []
+    async with _sentinel_client(responses, etags=etags, log=log) as client:
+        first = await has_sitemap_changed(root, datetime(2024, 6, 1), client=client)
+        unchanged = await has_sitemap_changed(root, datetime(2024, 6, 1), first.validators, client=client)
+
+        # The child changes while the static index keeps returning 304
+        responses[child] = _urlset(1, start=27).replace(b"2024-01-28", b"2024-07-01")
+        etags[child] = '"child-v2"'
+        changed = await has_sitemap_changed(root, datetime(2024, 6, 1), unchanged.validators, client=client)
+
+    assert not first.changed
+    assert first.validators[root]['children'] == [[child, None]]
+    assert not unchanged.changed
+    assert log[2:4] == [(root, '"index-v1"'), (child, '"child-v1"')]
+    assert changed.changed
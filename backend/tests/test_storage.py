@@ -10,3 +10,70 @@ async def test_save_llms_txt_no_config():
         result = await save_llms_txt("https://example.com", "content", log)
         assert result is None
         log.assert_called_once()
+
+def _configured(mock_settings):
+    mock_settings.r2_endpoint = "https://r2.example.com"
+    mock_settings.r2_access_key = "key"
+    mock_settings.r2_secret_key = "secret"
+    mock_settings.r2_bucket = "bucket"
+    mock_settings.r2_public_domain = "https://cdn.example.com"
+
+@pytest.mark.asyncio
+async def test_save_llms_txt_small_content_uses_single_put():
+    s3 = Mock()
+    with patch('storage.settings') as mock_settings, patch('storage.boto3.client', return_value=s3):
+        _configured(mock_settings)
+        result = await save_llms_txt("https://example.com", iter(["# Title\n", "## Docs\n"]), Mock())
+
+    assert result.startswith("https://cdn.example.com/llms/")
+    assert s3.put_object.call_args.kwargs['Body'] == b"# Title\n## Docs\n"
+    s3.create_multipart_upload.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_save_llms_txt_streams_large_content_as_multipart():
+    s3 = Mock()
+    s3.create_multipart_upload.return_value = {'UploadId': 'upload-1'}
+    s3.upload_part.side_effect = lambda **kwargs: {'ETag': f"etag-{kwargs['PartNumber']}"}
+    chunks = ["x" * 3_000_000 for _ in range(7)]
+
+    with patch('storage.settings') as mock_settings, patch('storage.boto3.client', return_value=s3), \
+            patch('storage.MULTIPART_PART_BYTES', 5 * 1024 * 1024):
+        _configured(mock_settings)
+        result = await save_llms_txt("https://example.com", iter(chunks), Mock())
+
+    assert result is not None
+    sizes = [len(call.kwargs['Body']) for call in s3.upload_part.call_args_list]
+    assert sum(sizes) == 21_000_000
+    assert all(size >= 5 * 1024 * 1024 for size in sizes[:-1])
+    parts = s3.complete_multipart_upload.call_args.kwargs['MultipartUpload']['Parts']
+    assert parts == [{'ETag': f"etag-{i}", 'PartNumber': i} for i in range(1, len(sizes) + 1)]
+    s3.put_object.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_save_llms_txt_aborts_failed_multipart():
+    from botocore.exceptions import ClientError
+
+    s3 = Mock()
+    s3.create_multipart_upload.return_value = {'UploadId': 'upload-1'}
+    s3.upload_part.side_effect = ClientError({'Error': {'Code': '500', 'Message': 'boom'}}, 'UploadPart')
+
+    with patch('storage.settings') as mock_settings, patch('storage.boto3.client', return_value=s3), \
+            patch('storage.MULTIPART_PART_BYTES', 10):
+        _configured(mock_settings)
+        result = await save_llms_txt("https://example.com", iter(["a" * 20]), Mock())
+
+    assert result is None
+    s3.abort_multipart_upload.assert_called_once_with(Bucket="bucket", Key=s3.create_multipart_upload.call_args.kwargs['Key'],
+                                                      UploadId='upload-1')
+
+@pytest.mark.asyncio
+async def test_save_llms_txt_uploads_full_text_next_to_llms_txt():
+    s3 = Mock()
+    with patch('storage.settings') as mock_settings, patch('storage.boto3.client', return_value=s3):
+        _configured(mock_settings)
+        result = await save_llms_txt("https://example.com", "# Title\n", Mock(), full_content=iter(["# Title\n", "text"]))
+
+    keys = [call.kwargs['Key'] for call in s3.put_object.call_args_list]
+    assert result == f"https://cdn.example.com/{keys[0]}"
+    assert keys[1] == keys[0].replace(".txt", "-full.txt")
+    assert s3.put_object.call_args_list[1].kwargs['Body'] == b"# Title\ntext"
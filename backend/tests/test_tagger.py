@@ -0,0 +1,23 @@
+import pytest
+from benchmarks.tagger_benchmark import SECTIONS, legacy_assign_tags, sample_pages
+from crawler import PageInfo
+from tagger import assign_tags
+
+
+def test_matches_legacy_tagger_on_sample_corpus():
+    for page, section in sample_pages(5000, seed=7):
+        assert assign_tags(page, section) == legacy_assign_tags(page, section), (page.url, page.title, section)
+
+
+@pytest.mark.parametrize("url,title", [
+    ("https://example.com/client-library", "Client Library"),  # 'cli' is a prefix of 'client-library'
+    ("https://example.com/docs/getting-started", "Getting Started"),
+    ("https://example.com/api/rest-api/authentication", "Auth"),
+    ("https://example.com/releases", "What's new: Release Notes"),
+    ("https://example.com/x;params", "Introduction to Advanced Performance"),
+    ("https://example.com/", ""),
+])
+@pytest.mark.parametrize("section", SECTIONS)
+def test_matches_legacy_tagger_on_overlapping_patterns(url, title, section):
+    page = PageInfo(url, title, "", "")
+    assert assign_tags(page, section) == legacy_assign_tags(page, section)
@@ -10,6 +10,7 @@ interface CrawlPayload {
   recrawlIntervalMinutes?: number
   llmEnhance?: boolean
   useBrightdata?: boolean
+  llmsFull?: boolean
 }
 
 export function useCrawler() {
@@ -41,7 +42,7 @@ export function useCrawler() {
 
     ws.onopen = () => {
       setLogs((prev) => [...prev, `Starting crawl of ${payload.url}...`])
-      ws.send(JSON.stringify(payload))
+      ws.send(JSON.stringify({ ...payload, streamResult: true }))
     }
 
     ws.onmessage = (event) => {
@@ -49,6 +50,8 @@ export function useCrawler() {
 
       if (data.type === "log") {
         setLogs((prev) => [...prev, data.content])
+      } else if (data.type === "result_chunk") {
+        setResult((prev) => prev + data.content)
       } else if (data.type === "result") {
         setResult(data.content)
       } else if (data.type === "url") {